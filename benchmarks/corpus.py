@@ -0,0 +1,292 @@
+import os
+import io
+import json
+import zlib
+import random
+from datetime import date, timedelta
+
+MANIFEST_NAME = 'manifest.json'
+
+# Página A4 em pontos
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+
+COMPANIES = [
+    "Comercial Alvorada Ltda", "Distribuidora Horizonte S.A.", "Mercantil Serra Azul Ltda",
+    "Indústria Vale Verde S.A.", "Atacadão Ponte Nova Ltda", "Transportes Rio Claro Ltda"
+]
+PRODUCTS = [
+    "Parafuso sextavado", "Cabo de cobre 2,5mm", "Tinta acrílica 18L", "Luva nitrílica",
+    "Papel A4 500 folhas", "Disjuntor 32A", "Fita isolante", "Cimento CP-II 50kg"
+]
+
+def _escape_text(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+class PDFWriter:
+    """Escreve PDFs simples (texto Helvetica, linhas e imagens) sem dependências externas
+    
+    Cada página é um content stream; imagens são XObjects em escala de cinza
+    comprimidos com Flate. A tabela xref é montada com os offsets reais, de
+    modo que o arquivo é lido por PyPDF2, pdfplumber e pelos extratores de
+    tabelas.
+    """
+    
+    def __init__(self):
+        self.pages = []
+    
+    def add_page(self, lines=(), rules=(), image=None, font_size=10):
+        """Adiciona uma página
+        
+        lines: lista de (x, y, texto); rules: lista de (x1, y1, x2, y2);
+        image: (largura, altura, bytes em escala de cinza) ocupando a página toda.
+        """
+        ops = []
+        if image is not None:
+            ops.append(f"q {PAGE_WIDTH} 0 0 {PAGE_HEIGHT} 0 0 cm /Im1 Do Q")
+        if rules:
+            ops.append("0.5 w")
+            ops.extend(f"{x1} {y1} m {x2} {y2} l S" for x1, y1, x2, y2 in rules)
+        if lines:
+            ops.append(f"BT /F1 {font_size} Tf")
+            for x, y, text in lines:
+                ops.append(f"1 0 0 1 {x} {y} Tm ({_escape_text(text)}) Tj")
+            ops.append("ET")
+        content = '\n'.join(ops).encode('cp1252', errors='replace')
+        self.pages.append((content, image))
+    
+    def write(self, path):
+        """Grava o documento em path"""
+        objects = []
+        
+        def add(body):
+            objects.append(body)
+            return len(objects)
+        
+        catalog = add(None)
+        pages_node = add(None)
+        font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        
+        page_ids = []
+        for content, image in self.pages:
+            resources = f"/Font << /F1 {font} 0 R >>"
+            if image is not None:
+                width, height, pixels = image
+                data = zlib.compress(pixels, 6)
+                image_id = add(
+                    f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+                    f"/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /FlateDecode "
+                    f"/Length {len(data)} >>\nstream\n".encode('ascii') + data + b"\nendstream"
+                )
+                resources += f" /XObject << /Im1 {image_id} 0 R >>"
+            data = zlib.compress(content, 6)
+            content_id = add(
+                f"<< /Length {len(data)} /Filter /FlateDecode >>\nstream\n".encode('ascii') + data + b"\nendstream"
+            )
+            page_ids.append(add(
+                f"<< /Type /Page /Parent {pages_node} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+                f"/Resources << {resources} >> /Contents {content_id} 0 R >>".encode('ascii')
+            ))
+        
+        kids = ' '.join(f"{page_id} 0 R" for page_id in page_ids)
+        objects[catalog - 1] = f"<< /Type /Catalog /Pages {pages_node} 0 R >>".encode('ascii')
+        objects[pages_node - 1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode('ascii')
+        
+        buffer = io.BytesIO()
+        buffer.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(buffer.tell())
+            buffer.write(f"{number} 0 obj\n".encode('ascii') + body + b"\nendobj\n")
+        xref = buffer.tell()
+        buffer.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('ascii'))
+        for offset in offsets:
+            buffer.write(f"{offset:010d} 00000 n \n".encode('ascii'))
+        buffer.write(
+            f"trailer\n<< /Size {len(objects) + 1} /Root {catalog} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('ascii')
+        )
+        
+        with open(path, 'wb') as f:
+            f.write(buffer.getvalue())
+        return path
+
+def _cnpj(rng):
+    digits = [rng.randint(0, 9) for _ in range(8)] + [0, 0, 0, 1]
+    for weights in ([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2], [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]):
+        remainder = sum(d * w for d, w in zip(digits, weights)) % 11
+        digits.append(0 if remainder < 2 else 11 - remainder)
+    s = ''.join(map(str, digits))
+    return f"{s[:2]}.{s[2:5]}.{s[5:8]}/{s[8:12]}-{s[12:]}"
+
+def _money(value):
+    return f"{value:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+
+def make_invoice(rng, number):
+    """Gera os campos de uma nota fiscal fictícia (compatíveis com invoice_schema)"""
+    items = []
+    for _ in range(rng.randint(3, 12)):
+        quantity = rng.randint(1, 50)
+        unit_price = round(rng.uniform(1, 500), 2)
+        items.append((rng.choice(PRODUCTS), quantity, unit_price, round(quantity * unit_price, 2)))
+    products_value = round(sum(item[3] for item in items), 2)
+    tax_value = round(products_value * 0.18, 2)
+    shipping_value = round(rng.uniform(0, 80), 2)
+    issuer, recipient = rng.sample(COMPANIES, 2)
+    return {
+        'invoice_number': str(number),
+        'issue_date': (date(2024, 1, 1) + timedelta(days=rng.randint(0, 364))).strftime('%d/%m/%Y'),
+        'total_value': round(products_value + tax_value + shipping_value, 2),
+        'issuer_name': issuer,
+        'issuer_document': _cnpj(rng),
+        'recipient_name': recipient,
+        'recipient_document': _cnpj(rng),
+        'tax_value': tax_value,
+        'discount_value': 0.0,
+        'shipping_value': shipping_value,
+        'access_key': ''.join(str(rng.randint(0, 9)) for _ in range(44)),
+        'items': items
+    }
+
+def invoice_lines(invoice, page_number, page_count):
+    """Texto de uma página no leiaute de um DANFE"""
+    lines = [
+        "DANFE",
+        "DOCUMENTO AUXILIAR DA NOTA FISCAL ELETRÔNICA",
+        f"NF-e nº {invoice['invoice_number']}    Folha {page_number}/{page_count}",
+        f"Chave de Acesso: {invoice['access_key']}",
+        "NATUREZA DA OPERAÇÃO: VENDA DE MERCADORIA",
+        "IDENTIFICAÇÃO DO EMITENTE",
+        f"{invoice['issuer_name']}    CNPJ: {invoice['issuer_document']}",
+        "DESTINATÁRIO/REMETENTE",
+        f"{invoice['recipient_name']}    CNPJ: {invoice['recipient_document']}",
+        f"DATA DE EMISSÃO: {invoice['issue_date']}",
+        "DADOS DOS PRODUTOS / SERVIÇOS"
+    ]
+    for description, quantity, unit_price, total in invoice['items']:
+        lines.append(f"{description:<24} {quantity:>4} UN  {_money(unit_price):>10}  {_money(total):>12}")
+    lines.extend([
+        f"VALOR DO ICMS: {_money(invoice['tax_value'])}",
+        f"VALOR DO FRETE: {_money(invoice['shipping_value'])}",
+        f"VALOR TOTAL DA NOTA: {_money(invoice['total_value'])}"
+    ])
+    return [(40, PAGE_HEIGHT - 50 - i * 16, text) for i, text in enumerate(lines)]
+
+def table_page(rng, rows=30, columns=5):
+    """Texto e linhas de grade de uma página com uma tabela"""
+    left, top, width, row_height = 40, PAGE_HEIGHT - 60, PAGE_WIDTH - 80, 22
+    column_width = width / columns
+    header = ["Código", "Descrição", "Quantidade", "Valor unit.", "Total"][:columns]
+    lines, rules = [], []
+    for row in range(rows + 1):
+        y = top - row * row_height
+        if row == 0:
+            cells = header
+        else:
+            quantity = rng.randint(1, 99)
+            price = rng.uniform(1, 999)
+            cells = [f"{rng.randint(1000, 9999)}", rng.choice(PRODUCTS)[:18], str(quantity),
+                     _money(price), _money(quantity * price)][:columns]
+        for column, cell in enumerate(cells):
+            lines.append((round(left + column * column_width + 4, 1), y - 15, cell))
+    for row in range(rows + 2):
+        y = top - row * row_height
+        rules.append((left, y, left + width, y))
+    bottom = top - (rows + 1) * row_height
+    for column in range(columns + 1):
+        x = round(left + column * column_width, 1)
+        rules.append((x, top, x, bottom))
+    return lines, rules
+
+def render_scan(lines, dpi, rng):
+    """Rasteriza o texto de uma página como uma digitalização em escala de cinza (requer Pillow)"""
+    from PIL import Image, ImageDraw, ImageFont
+    
+    scale = dpi / 72
+    width, height = int(PAGE_WIDTH * scale), int(PAGE_HEIGHT * scale)
+    image = Image.new('L', (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    try:
+        font = ImageFont.load_default(size=int(10 * scale))
+    except TypeError:
+        font = ImageFont.load_default()
+    for x, y, text in lines:
+        draw.text((x * scale, (PAGE_HEIGHT - y - 10) * scale), text, fill=0, font=font)
+    # Leve inclinação e pontos de sujeira, como em uma digitalização real
+    image = image.rotate(rng.uniform(-1.0, 1.0), fillcolor=255)
+    pixels = image.load()
+    for _ in range(width * height // 1000):
+        pixels[rng.randrange(width), rng.randrange(height)] = rng.randint(0, 160)
+    return width, height, image.tobytes()
+
+def generate_corpus(output_dir, seed=42, page_counts=(1, 10, 100, 1000), scan_dpis=(100, 200, 300),
+                    table_pages=(1, 10), scan_pages=2):
+    """Gera um corpus sintético e determinístico de PDFs em output_dir
+    
+    Para a mesma semente e os mesmos parâmetros os arquivos gerados são
+    idênticos. O manifest.json lista cada documento (tipo, páginas, DPI e os
+    campos das notas, usados na etapa de validação); se já existir um
+    manifesto com os mesmos parâmetros, o corpus é reaproveitado.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    params = {
+        'seed': seed,
+        'page_counts': list(page_counts),
+        'scan_dpis': list(scan_dpis),
+        'table_pages': list(table_pages),
+        'scan_pages': scan_pages
+    }
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('params') == params and all(
+                os.path.exists(os.path.join(output_dir, doc['file'])) for doc in manifest['documents']):
+            return manifest
+    
+    rng = random.Random(seed)
+    documents = []
+    
+    # Notas fiscais com texto pesquisável (uma nota por página)
+    for page_count in page_counts:
+        writer = PDFWriter()
+        invoices = []
+        for page in range(page_count):
+            invoice = make_invoice(rng, 1000 + len(documents) * 10000 + page)
+            invoices.append({key: value for key, value in invoice.items() if key != 'items'})
+            writer.add_page(invoice_lines(invoice, page + 1, page_count))
+        filename = f"invoice_{page_count:04d}p.pdf"
+        writer.write(os.path.join(output_dir, filename))
+        documents.append({'file': filename, 'kind': 'invoice', 'pages': page_count, 'records': invoices[:10]})
+    
+    # Documentos com tabelas
+    for page_count in table_pages:
+        writer = PDFWriter()
+        for _ in range(page_count):
+            lines, rules = table_page(rng)
+            writer.add_page(lines, rules, font_size=9)
+        filename = f"tables_{page_count:04d}p.pdf"
+        writer.write(os.path.join(output_dir, filename))
+        documents.append({'file': filename, 'kind': 'tables', 'pages': page_count})
+    
+    # Digitalizações (somente imagem) em diferentes resoluções
+    try:
+        import PIL  # noqa: F401
+        has_pillow = True
+    except ImportError:
+        has_pillow = False
+    
+    for dpi in scan_dpis if has_pillow else ():
+        writer = PDFWriter()
+        for page in range(scan_pages):
+            invoice = make_invoice(rng, 900000 + dpi * 10 + page)
+            writer.add_page(image=render_scan(invoice_lines(invoice, page + 1, scan_pages), dpi, rng))
+        filename = f"scan_{dpi}dpi.pdf"
+        writer.write(os.path.join(output_dir, filename))
+        documents.append({'file': filename, 'kind': 'scan', 'pages': scan_pages, 'dpi': dpi})
+    
+    manifest = {'params': params, 'documents': documents}
+    if not has_pillow and scan_dpis:
+        manifest['skipped'] = "Pillow não instalado: digitalizações não geradas"
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
@@ -0,0 +1,315 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import concurrent.futures
+import numpy as np
+
+from .corpus import generate_corpus
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Tipos de documento em que cada método de extração é medido por padrão
+METHOD_KINDS = {
+    'text': ('invoice', 'tables'),
+    'tables': ('tables', 'invoice'),
+    'ocr': ('scan',)
+}
+# Documentos maiores que isto não são medidos com o método (OCR de 1.000 páginas levaria horas)
+METHOD_MAX_PAGES = {
+    'text': None,
+    'tables': 100,
+    'ocr': 10
+}
+
+def _read_rss():
+    """RSS atual do processo em bytes (None se não for possível medir)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def _max_rss():
+    """Pico de RSS do processo desde o início, em bytes"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+class RSSSampler:
+    """Amostra o RSS em uma thread enquanto um trecho é executado e guarda o pico"""
+    
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def _sample(self):
+        rss = _read_rss()
+        if rss is not None:
+            self.peak = max(self.peak, rss)
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+    
+    def __enter__(self):
+        self._sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        if not self.peak:
+            self.peak = _max_rss() or 0
+
+def run_stage(name, tasks, workers, method=None):
+    """Executa as tarefas com `workers` threads e mede vazão, latências e pico de RSS
+    
+    tasks: lista de (rótulo, páginas, função sem argumentos).
+    """
+    latencies = []
+    pages = 0
+    errors = []
+    
+    def timed(task):
+        label, task_pages, fn = task
+        start = time.perf_counter()
+        fn()
+        return label, task_pages, time.perf_counter() - start
+    
+    with RSSSampler() as sampler:
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(timed, task) for task in tasks]
+            for future, task in zip(futures, tasks):
+                try:
+                    _, task_pages, latency = future.result()
+                    latencies.append(latency)
+                    pages += task_pages
+                except Exception as e:
+                    errors.append(f"{task[0]}: {str(e)}")
+        wall_time = time.perf_counter() - start
+    
+    result = {
+        'stage': name,
+        'method': method,
+        'workers': workers,
+        'docs': len(latencies),
+        'pages': pages,
+        'errors': len(errors),
+        'wall_time': wall_time,
+        'docs_per_s': len(latencies) / wall_time if wall_time else None,
+        'pages_per_s': pages / wall_time if wall_time and pages else None,
+        'peak_rss_mb': sampler.peak / (1024 * 1024)
+    }
+    if latencies:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        result['latency'] = {
+            'mean': float(np.mean(latencies)),
+            'p50': float(p50),
+            'p95': float(p95),
+            'p99': float(p99),
+            'max': float(max(latencies))
+        }
+    if errors:
+        result['error_samples'] = errors[:5]
+    return result
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def _environment(args):
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': args.seed,
+        'workers': args.workers,
+        'repeat': args.repeat
+    }
+
+def run_benchmarks(args):
+    """Gera (ou reaproveita) o corpus e mede cada etapa em cada nível de concorrência"""
+    from src.core.extractor import PDFExtractor
+    from src.core.document_classifier import DocumentClassifier
+    from src.core.validator import DataValidator
+    from src.core.exporter import DataExporter
+    
+    manifest = generate_corpus(
+        args.corpus_dir, seed=args.seed, page_counts=args.pages, scan_dpis=args.dpis
+    )
+    documents = [dict(doc, path=os.path.join(args.corpus_dir, doc['file'])) for doc in manifest['documents']]
+    
+    extractor = PDFExtractor()
+    classifier = DocumentClassifier(patterns_dir=os.path.join(ROOT_DIR, 'templates'))
+    validator = DataValidator(schema_dir=os.path.join(ROOT_DIR, 'schemas'))
+    export_dir = tempfile.mkdtemp(prefix='pdf_extractor_bench_')
+    exporter = DataExporter(export_dir)
+    
+    results = []
+    
+    def record(result):
+        results.append(result)
+        latency = result.get('latency', {})
+        print(
+            f"{result['stage']:<9} {result['method'] or '-':<8} workers={result['workers']:<3} "
+            f"docs/s={result['docs_per_s'] or 0:8.2f} pages/s={result['pages_per_s'] or 0:8.2f} "
+            f"p95={latency.get('p95', 0):7.3f}s rss={result['peak_rss_mb']:7.1f}MB errors={result['errors']}",
+            file=sys.stderr
+        )
+    
+    try:
+        # Extração, com cada método nos documentos em que faz sentido
+        extracted = {}
+        for method in args.methods:
+            max_pages = METHOD_MAX_PAGES.get(method)
+            docs = [doc for doc in documents if doc['kind'] in METHOD_KINDS.get(method, ())
+                    and (max_pages is None or doc['pages'] <= max_pages)]
+            if not docs:
+                continue
+            
+            def extract(doc, method=method):
+                data = extractor.extract_data(doc['path'], method)
+                if data is None:
+                    raise RuntimeError("nenhum dado extraído")
+                extracted.setdefault((doc['file'], method), data)
+            
+            for workers in args.workers:
+                tasks = [(doc['file'], doc['pages'], lambda doc=doc: extract(doc)) for doc in docs] * args.repeat
+                record(run_stage('extract', tasks, workers, method))
+        
+        # Classificação
+        if 'classify' in args.stages:
+            for workers in args.workers:
+                tasks = [(doc['file'], doc['pages'], lambda doc=doc: classifier.classify_document(doc['path']))
+                         for doc in documents] * args.repeat
+                record(run_stage('classify', tasks, workers))
+        
+        # Validação dos campos das notas contra o invoice_schema
+        if 'validate' in args.stages:
+            records = [record_data for doc in documents for record_data in doc.get('records', [])]
+            if records:
+                for workers in args.workers:
+                    tasks = [(f"record_{i}", 0, lambda data=data: validator.validate_data(data, 'invoice_schema'))
+                             for i, data in enumerate(records)] * args.repeat
+                    record(run_stage('validate', tasks, workers))
+        
+        # Exportação dos dados extraídos por texto
+        if 'export' in args.stages:
+            payloads = [(name, data) for (name, method), data in extracted.items() if method == 'text']
+            for export_format in args.formats:
+                export = getattr(exporter, f"export_to_{export_format}", None)
+                if export is None or not payloads:
+                    continue
+                for workers in args.workers:
+                    tasks = [
+                        (name, 0, lambda name=name, data=data, i=i: export(
+                            data, f"{os.path.splitext(name)[0]}_{i}.{export_format}"
+                        ))
+                        for i, (name, data) in enumerate(payloads * args.repeat)
+                    ]
+                    record(run_stage('export', tasks, workers, export_format))
+    finally:
+        shutil.rmtree(export_dir, ignore_errors=True)
+    
+    return {
+        'environment': _environment(args),
+        'corpus': {
+            'dir': os.path.abspath(args.corpus_dir),
+            'params': manifest['params'],
+            'documents': [{key: doc[key] for key in ('file', 'kind', 'pages', 'dpi') if key in doc}
+                          for doc in documents],
+            'skipped': manifest.get('skipped')
+        },
+        'results': results,
+        'peak_rss_mb': (_max_rss() or 0) / (1024 * 1024)
+    }
+
+def compare(baseline, current):
+    """Compara a vazão de duas execuções; retorna a razão atual/base por etapa"""
+    def key(result):
+        return result['stage'], result['method'], result['workers']
+    
+    base = {key(result): result for result in baseline.get('results', [])}
+    comparison = []
+    for result in current.get('results', []):
+        previous = base.get(key(result))
+        if not previous or not previous.get('docs_per_s') or not result.get('docs_per_s'):
+            continue
+        entry = {
+            'stage': result['stage'],
+            'method': result['method'],
+            'workers': result['workers'],
+            'docs_per_s_ratio': result['docs_per_s'] / previous['docs_per_s']
+        }
+        if previous.get('latency') and result.get('latency'):
+            entry['p95_ratio'] = result['latency']['p95'] / previous['latency']['p95']
+        comparison.append(entry)
+    return comparison
+
+def _int_list(value):
+    return [int(item) for item in value.split(',') if item]
+
+def _str_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de extração, classificação, validação e exportação")
+    parser.add_argument('--corpus-dir', default=os.path.join(tempfile.gettempdir(), 'pdf_extractor_benchmark_corpus'))
+    parser.add_argument('--output', help="Arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument('--baseline', help="JSON de uma execução anterior para comparação")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--pages', type=_int_list, default=[1, 10, 100, 1000],
+                        help="Tamanhos (em páginas) das notas fiscais geradas")
+    parser.add_argument('--dpis', type=_int_list, default=[100, 200, 300],
+                        help="Resoluções das digitalizações geradas")
+    parser.add_argument('--methods', type=_str_list, default=['text', 'tables', 'ocr'])
+    parser.add_argument('--stages', type=_str_list, default=['classify', 'validate', 'export'])
+    parser.add_argument('--formats', type=_str_list, default=['csv', 'json'])
+    parser.add_argument('--workers', type=_int_list, default=[1, 4])
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args(argv)
+    
+    report = run_benchmarks(args)
+    
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            report['comparison'] = compare(json.load(f), report)
+    
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+    return report
+
+if __name__ == '__main__':
+    main()
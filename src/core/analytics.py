@@ -1,155 +1,416 @@
 import os
-import json
-import glob
-from datetime import datetime
+import bisect
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
 import pandas as pd
 from ..utils.logger import get_logger
+from .analytics_store import AnalyticsStore
 
 logger = get_logger(__name__)
 
+
+class ErrorSketch:
+    """Contagem aproximada dos erros mais frequentes com memória limitada
+    
+    Algoritmo Space-Saving: guarda no máximo `capacity` mensagens; ao chegar
+    uma mensagem nova com o sketch cheio, ela substitui a de menor contagem
+    e herda essa contagem + 1. Os erros realmente frequentes são sempre
+    mantidos, com contagem possivelmente superestimada.
+    """
+    
+    def __init__(self, capacity=20):
+        self.capacity = capacity
+        self.counts = {}
+    
+    def add(self, error, count=1):
+        if error in self.counts:
+            self.counts[error] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[error] = count
+        else:
+            victim = min(self.counts, key=self.counts.get)
+            self.counts[error] = self.counts.pop(victim) + count
+    
+    def merge(self, other):
+        for error, count in other.counts.items():
+            self.add(error, count)
+    
+    def top(self, n=10):
+        return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+
+
+class RollupBucket:
+    """Agregados de um par (dia, tipo de documento)"""
+    
+    __slots__ = ('count', 'success_count', 'confidence_sum', 'confidence_count',
+                 'processing_time_sum', 'processing_time_count', 'errors')
+    
+    def __init__(self):
+        self.count = 0
+        self.success_count = 0
+        self.confidence_sum = 0.0
+        self.confidence_count = 0
+        self.processing_time_sum = 0.0
+        self.processing_time_count = 0
+        self.errors = ErrorSketch()
+    
+    def add(self, record):
+        self.count += 1
+        success = bool(record.get('success', False))
+        if success:
+            self.success_count += 1
+        confidence = record.get('confidence')
+        if isinstance(confidence, (int, float)) and confidence == confidence:
+            self.confidence_sum += confidence
+            self.confidence_count += 1
+        processing_time = record.get('processing_time')
+        if isinstance(processing_time, (int, float)) and processing_time == processing_time:
+            self.processing_time_sum += processing_time
+            self.processing_time_count += 1
+        if not success and record.get('error'):
+            self.errors.add(str(record['error']))
+
+
 class DataAnalytics:
     """Analisa dados de documentos processados para o dashboard"""
     
-    def __init__(self, analytics_dir):
+    FRAME_COLUMNS = ['doc_type', 'success', 'confidence', 'processing_time', 'error', 'record']
+    
+    def __init__(self, analytics_dir, query_cache_size=128):
         self.analytics_dir = analytics_dir
         os.makedirs(analytics_dir, exist_ok=True)
+        self.store = AnalyticsStore(os.path.join(analytics_dir, 'analytics.db'))
         self.data = []
+        self._last_id = 0
+        self._frame = self._build_frame([])
+        self._n_dated = 0
+        self._pending = []
+        self._rollups = {}
+        self._rollup_days = []
+        self.data_version = 0
+        self.query_cache_size = query_cache_size
+        self._query_cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Protege o estado em memória: o dashboard consulta em uma thread de fundo
+        self._lock = threading.RLock()
         self.load_data()
     
     def load_data(self):
-        """Carrega dados de análise do diretório de analytics"""
+        """Carrega todos os dados de análise do banco de analytics"""
         try:
-            self.data = []
+            # Arquivos JSON do formato antigo são importados uma única vez
+            self.store.import_legacy_files(self.analytics_dir)
             
-            # Procura por arquivos de log de processamento
-            log_files = glob.glob(os.path.join(self.analytics_dir, "*.json"))
-            
-            for log_file in log_files:
-                try:
-                    with open(log_file, 'r', encoding='utf-8') as f:
-                        log_data = json.load(f)
-                        
-                        # Verifica se é um log individual ou um lote
-                        if 'details' in log_data:
-                            # Log de lote
-                            for item in log_data.get('details', []):
-                                if isinstance(item, dict):
-                                    self.data.append(item)
-                        elif isinstance(log_data, dict):
-                            # Log individual
-                            self.data.append(log_data)
-                except Exception as e:
-                    logger.error(f"Erro ao carregar arquivo de log {log_file}: {str(e)}")
+            with self._lock:
+                self._reset()
+                self._append_rows(self.store.fetch_since(0))
             
             logger.info(f"Carregados dados de {len(self.data)} documentos processados")
         except Exception as e:
             logger.error(f"Erro ao carregar dados de análise: {str(e)}")
     
+    def _reset(self):
+        """Descarta os dados em memória"""
+        self.data = []
+        self._last_id = 0
+        self._frame = self._build_frame([])
+        self._n_dated = 0
+        self._pending = []
+        self._rollups = {}
+        self._rollup_days = []
+        self.data_version += 1
+    
     def refresh_data(self):
-        """Atualiza os dados de análise"""
-        self.load_data()
+        """Atualiza os dados de análise lendo apenas os registros novos"""
+        try:
+            self.store.import_legacy_files(self.analytics_dir)
+            with self._lock:
+                self._append_rows(self.store.fetch_since(self._last_id))
+        except Exception as e:
+            logger.error(f"Erro ao atualizar dados de análise: {str(e)}")
+    
+    def _append_rows(self, rows):
+        """Adiciona linhas (id, registro) lidas do banco aos dados em memória"""
+        for row_id, record in rows:
+            self.data.append(record)
+            self._pending.append(record)
+            self._update_rollups(record)
+            self._last_id = max(self._last_id, row_id)
+        if rows:
+            # Invalida os resultados memorizados
+            self.data_version += 1
+    
+    def _cached(self, metric, start_date, end_date, doc_type, compute):
+        """Memoriza o resultado de uma consulta do dashboard
+        
+        A chave é (start_date, end_date, doc_type, métrica) e cada entrada guarda
+        a data_version em que foi calculada; entradas de versões anteriores são
+        recalculadas. O cache é limitado por LRU a query_cache_size entradas.
+        """
+        key = (start_date, end_date, doc_type, metric)
+        with self._lock:
+            entry = self._query_cache.get(key)
+            if entry is not None and entry[0] == self.data_version:
+                self._query_cache.move_to_end(key)
+                self.cache_hits += 1
+                return entry[1]
+            
+            self.cache_misses += 1
+            value = compute()
+            self._query_cache[key] = (self.data_version, value)
+            self._query_cache.move_to_end(key)
+            while len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+            return value
+    
+    def _update_rollups(self, record):
+        """Atualiza incrementalmente os agregados diários com um registro"""
+        timestamp = self._parse_timestamp(record.get('timestamp'))
+        day = timestamp.date() if timestamp is not None else None
+        
+        buckets = self._rollups.get(day)
+        if buckets is None:
+            buckets = self._rollups[day] = {}
+            if day is not None:
+                bisect.insort(self._rollup_days, day)
+        
+        doc_type = record.get('doc_type') or 'Desconhecido'
+        bucket = buckets.get(doc_type)
+        if bucket is None:
+            bucket = buckets[doc_type] = RollupBucket()
+        bucket.add(record)
+    
+    def get_rollup_summary(self, start_date=None, end_date=None, doc_type=None):
+        """Retorna os indicadores do dashboard a partir dos agregados diários
+        
+        O resultado é memorizado (ver _cached); não deve ser modificado.
+        """
+        return self._cached('summary', start_date, end_date, doc_type,
+                            lambda: self._rollup_summary(start_date, end_date, doc_type))
+    
+    def _rollup_summary(self, start_date=None, end_date=None, doc_type=None):
+        """Calcula os indicadores do dashboard a partir dos agregados diários
+        
+        O custo é proporcional ao número de dias do período, não ao número de
+        documentos. A granularidade é o dia: start_date e end_date incluem os
+        dias inteiros em que caem.
+        """
+        lo = bisect.bisect_left(self._rollup_days, start_date.date()) if start_date else 0
+        hi = bisect.bisect_right(self._rollup_days, end_date.date()) if end_date else len(self._rollup_days)
+        days = self._rollup_days[lo:hi]
+        if None in self._rollups:
+            days = days + [None]
+        
+        total = success = confidence_count = processing_time_count = 0
+        confidence_sum = processing_time_sum = 0.0
+        by_day = {}
+        by_type = {}
+        confidence_by_type = {}
+        errors = ErrorSketch(capacity=50)
+        
+        for day in days:
+            for bucket_type, bucket in self._rollups[day].items():
+                if doc_type and bucket_type != doc_type:
+                    continue
+                total += bucket.count
+                success += bucket.success_count
+                confidence_sum += bucket.confidence_sum
+                confidence_count += bucket.confidence_count
+                processing_time_sum += bucket.processing_time_sum
+                processing_time_count += bucket.processing_time_count
+                if day is not None:
+                    by_day[day] = by_day.get(day, 0) + bucket.count
+                by_type[bucket_type] = by_type.get(bucket_type, 0) + bucket.count
+                conf = confidence_by_type.setdefault(bucket_type, [0.0, 0])
+                conf[0] += bucket.confidence_sum
+                conf[1] += bucket.confidence_count
+                errors.merge(bucket.errors)
+        
+        today = datetime.now().date()
+        return {
+            'total': total,
+            'success_count': success,
+            'success_rate': (success / total) * 100 if total else 0,
+            'avg_confidence': confidence_sum / confidence_count if confidence_count else None,
+            'avg_processing_time': processing_time_sum / processing_time_count if processing_time_count else None,
+            'today_count': by_day.get(today, 0),
+            'by_day': pd.Series(by_day, dtype='int64').sort_index(),
+            'by_type': pd.Series(by_type, dtype='int64').sort_values(ascending=False),
+            'confidence_by_type': pd.Series(
+                {t: c[0] / c[1] for t, c in confidence_by_type.items() if c[1]}, dtype=float
+            ).sort_values(ascending=False),
+            'top_errors': errors.top(10)
+        }
+    
+    def get_recent_records(self, start_date=None, end_date=None, doc_type=None, limit=20):
+        """Retorna os registros mais recentes do período (mais novos primeiro)"""
+        return self._cached(('recent', limit), start_date, end_date, doc_type,
+                            lambda: self._recent_records(start_date, end_date, doc_type, limit))
+    
+    def get_dashboard_snapshot(self, start_date=None, end_date=None, doc_type=None, limit=20):
+        """Retorna, de forma consistente, tudo o que o dashboard exibe
+        
+        Pode ser chamado de uma thread de fundo; o resumo e os registros recentes
+        são calculados sobre a mesma data_version.
+        """
+        with self._lock:
+            return {
+                'data_version': self.data_version,
+                'summary': self.get_rollup_summary(start_date, end_date, doc_type),
+                'recent': self.get_recent_records(start_date, end_date, doc_type, limit)
+            }
+    
+    def _recent_records(self, start_date, end_date, doc_type, limit):
+        frame = self._filter_frame(start_date, end_date, doc_type, include_undated=False)
+        return frame['record'].iloc[::-1][:limit].tolist()
+    
+    @staticmethod
+    def _parse_timestamp(value):
+        """Converte um timestamp ISO em datetime sem fuso (em UTC se tiver fuso), ou None
+        
+        É o único parser usado pelo frame e pelos agregados diários, para que
+        ambos coloquem cada registro no mesmo dia.
+        """
+        try:
+            timestamp = datetime.fromisoformat(value)
+        except (ValueError, TypeError):
+            return None
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        return timestamp
+    
+    @classmethod
+    def _parse_timestamps(cls, values):
+        """Converte timestamps ISO em datetime64 (inválidos viram NaT)"""
+        parsed = pd.to_datetime(pd.Series([cls._parse_timestamp(value) for value in values], dtype=object),
+                                errors='coerce')
+        return pd.DatetimeIndex(parsed.astype('datetime64[ns]'), name='timestamp')
+    
+    def _build_frame(self, records):
+        """Monta o frame colunar (índice de tempo ordenado) a partir de registros"""
+        frame = pd.DataFrame({
+            'doc_type': pd.Series([r.get('doc_type') for r in records], dtype=object),
+            'success': pd.Series([bool(r.get('success', False)) for r in records], dtype=bool),
+            'confidence': pd.to_numeric(pd.Series([r.get('confidence') for r in records], dtype=object), errors='coerce').astype(float),
+            'processing_time': pd.to_numeric(pd.Series([r.get('processing_time') for r in records], dtype=object), errors='coerce').astype(float),
+            'error': pd.Series([r.get('error') for r in records], dtype=object),
+            'record': pd.Series(records, dtype=object),
+        }, columns=self.FRAME_COLUMNS)
+        frame.index = self._parse_timestamps([r.get('timestamp') for r in records])
+        return frame
+    
+    def get_frame(self):
+        """Retorna o frame colunar com todos os registros
+        
+        O índice é o timestamp (datetime64) em ordem crescente, com os registros
+        sem data válida (NaT) ao final. Registros novos são incorporados aqui,
+        de forma preguiçosa, na primeira consulta após a gravação.
+        """
+        with self._lock:
+            if self._pending:
+                # Ordenação estável mantém a ordem de inserção para timestamps iguais
+                new = self._build_frame(self._pending).sort_index(kind='mergesort', na_position='last')
+                self._pending = []
+                new_dated = int(new.index.notna().sum())
+                dated = self._frame.iloc[:self._n_dated]
+                
+                # Só os registros antigos posteriores ao mais antigo dos novos são reordenados;
+                # no caso comum (registros novos mais recentes) o bloco é apenas anexado
+                start = dated.index.searchsorted(new.index[0], side='right') if new_dated else len(dated)
+                merged = new.iloc[:new_dated]
+                if start < len(dated):
+                    merged = pd.concat([dated.iloc[start:], merged]).sort_index(kind='mergesort')
+                frame = pd.concat([dated.iloc[:start], merged, self._frame.iloc[self._n_dated:], new.iloc[new_dated:]])
+                frame['doc_type'] = frame['doc_type'].astype('category')
+                self._frame = frame
+                self._n_dated += new_dated
+            return self._frame
+    
+    def _filter_frame(self, start_date=None, end_date=None, doc_type=None, include_undated=True):
+        """Filtra o frame por período (busca binária no índice) e tipo"""
+        with self._lock:
+            frame = self.get_frame()
+            n_dated = self._n_dated
+        dated = frame.iloc[:n_dated]
+        
+        lo = dated.index.searchsorted(pd.Timestamp(start_date), side='left') if start_date else 0
+        hi = dated.index.searchsorted(pd.Timestamp(end_date), side='right') if end_date else len(dated)
+        result = dated.iloc[lo:hi]
+        
+        # Registros sem timestamp válido não são excluídos pelo filtro de período
+        if include_undated and n_dated < len(frame):
+            result = pd.concat([result, frame.iloc[n_dated:]])
+        
+        if doc_type:
+            result = result[result['doc_type'] == doc_type]
+        return result
     
     def get_document_types(self):
         """Retorna a lista de tipos de documentos únicos"""
-        doc_types = set()
-        for item in self.data:
-            doc_type = item.get('doc_type')
-            if doc_type:
-                doc_types.add(doc_type)
-        return sorted(list(doc_types))
+        doc_types = self.get_frame()['doc_type'].dropna().unique()
+        return sorted(doc_type for doc_type in doc_types if doc_type)
     
     def get_filtered_data(self, start_date=None, end_date=None, doc_type=None):
         """Retorna dados filtrados por período e tipo de documento"""
-        filtered_data = []
+        return self._filter_frame(start_date, end_date, doc_type)['record'].tolist()
+    
+    def _success_rate(self, start_date=None, end_date=None, doc_type=None):
+        frame = self._filter_frame(start_date, end_date, doc_type)
         
-        for item in self.data:
-            # Filtra por data
-            include = True
-            
-            if 'timestamp' in item:
-                try:
-                    item_date = datetime.fromisoformat(item['timestamp'])
-                    if start_date and item_date < start_date:
-                        include = False
-                    if end_date and item_date > end_date:
-                        include = False
-                except (ValueError, TypeError):
-                    pass
-            
-            # Filtra por tipo de documento
-            if include and doc_type and item.get('doc_type') != doc_type:
-                include = False
-            
-            if include:
-                filtered_data.append(item)
+        if frame.empty:
+            return 0
         
-        return filtered_data
+        return float(frame['success'].mean()) * 100
     
-    def get_success_rate(self, start_date=None, end_date=None, doc_type=None):
-        """Calcula a taxa de sucesso dos documentos processados"""
-        data = self.get_filtered_data(start_date, end_date, doc_type)
+    def _avg_confidence(self, start_date=None, end_date=None, doc_type=None):
+        confidence = self._filter_frame(start_date, end_date, doc_type)['confidence'].dropna()
         
-        if not data:
+        if confidence.empty:
             return 0
         
-        success_count = sum(1 for item in data if item.get('success', False))
-        return (success_count / len(data)) * 100
+        return float(confidence.mean())
     
-    def get_avg_confidence(self, start_date=None, end_date=None, doc_type=None):
-        """Calcula a confiança média dos documentos processados"""
-        data = self.get_filtered_data(start_date, end_date, doc_type)
+    def _count_by_date(self, start_date=None, end_date=None, doc_type=None):
+        frame = self._filter_frame(start_date, end_date, doc_type)
+        dates = frame.index[frame.index.notna()].normalize()
         
-        confidence_values = [item.get('confidence', 0) for item in data if 'confidence' in item]
+        if len(dates):
+            counts = pd.Series(1, index=dates).groupby(level=0).sum()
+            return pd.DataFrame({'date': counts.index, 'count': counts.values})
         
-        if not confidence_values:
-            return 0
+        return pd.DataFrame(columns=['date', 'count'])
+    
+    def _count_by_type(self, start_date=None, end_date=None):
+        frame = self._filter_frame(start_date, end_date)
         
-        return sum(confidence_values) / len(confidence_values)
+        if not frame.empty:
+            doc_types = frame['doc_type'].astype(object).fillna('Desconhecido')
+            counts = doc_types.value_counts()
+            return pd.DataFrame({'doc_type': counts.index, 'count': counts.values})
+        
+        return pd.DataFrame(columns=['doc_type', 'count'])
+    
+    def get_success_rate(self, start_date=None, end_date=None, doc_type=None):
+        """Calcula a taxa de sucesso dos documentos processados"""
+        return self._cached('success_rate', start_date, end_date, doc_type,
+                            lambda: self._success_rate(start_date, end_date, doc_type))
+    
+    def get_avg_confidence(self, start_date=None, end_date=None, doc_type=None):
+        """Calcula a confiança média dos documentos processados"""
+        return self._cached('avg_confidence', start_date, end_date, doc_type,
+                            lambda: self._avg_confidence(start_date, end_date, doc_type))
     
     def get_document_count_by_date(self, start_date=None, end_date=None, doc_type=None):
         """Retorna contagem de documentos agrupados por data"""
-        data = self.get_filtered_data(start_date, end_date, doc_type)
-        
-        date_counts = {}
-        for item in data:
-            if 'timestamp' in item:
-                try:
-                    date_str = datetime.fromisoformat(item['timestamp']).strftime('%Y-%m-%d')
-                    date_counts[date_str] = date_counts.get(date_str, 0) + 1
-                except (ValueError, TypeError):
-                    pass
-        
-        # Converte para DataFrame
-        if date_counts:
-            df = pd.DataFrame({
-                'date': list(date_counts.keys()),
-                'count': list(date_counts.values())
-            })
-            df['date'] = pd.to_datetime(df['date'])
-            df = df.sort_values('date')
-            return df
-        
-        return pd.DataFrame(columns=['date', 'count'])
+        return self._cached('count_by_date', start_date, end_date, doc_type,
+                            lambda: self._count_by_date(start_date, end_date, doc_type))
     
     def get_document_count_by_type(self, start_date=None, end_date=None):
         """Retorna contagem de documentos agrupados por tipo"""
-        data = self.get_filtered_data(start_date, end_date)
-        
-        type_counts = {}
-        for item in data:
-            doc_type = item.get('doc_type', 'Desconhecido')
-            type_counts[doc_type] = type_counts.get(doc_type, 0) + 1
-        
-        # Converte para DataFrame
-        if type_counts:
-            df = pd.DataFrame({
-                'doc_type': list(type_counts.keys()),
-                'count': list(type_counts.values())
-            })
-            df = df.sort_values('count', ascending=False)
-            return df
-        
-        return pd.DataFrame(columns=['doc_type', 'count'])
+        return self._cached('count_by_type', start_date, end_date, None,
+                            lambda: self._count_by_type(start_date, end_date))
     
     def log_processing_result(self, result):
         """Registra o resultado de um processamento para análise futura"""
@@ -161,19 +422,14 @@ class DataAnalytics:
             if 'timestamp' not in result:
                 result['timestamp'] = datetime.now().isoformat()
             
-            # Gera nome de arquivo único
-            filename = f"doc_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{id(result)}.json"
-            file_path = os.path.join(self.analytics_dir, filename)
-            
-            # Salva o resultado
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(result, f, indent=4)
+            record_id = self.store.insert(result)
             
-            # Adiciona aos dados em memória
-            self.data.append(result)
+            # Adiciona aos dados em memória (inclui linhas gravadas por outros processos)
+            with self._lock:
+                self._append_rows(self.store.fetch_since(self._last_id))
             
-            logger.info(f"Resultado de processamento registrado: {file_path}")
-            return file_path
+            logger.info(f"Resultado de processamento registrado: {record_id}")
+            return record_id
         
         except Exception as e:
             logger.error(f"Erro ao registrar resultado de processamento: {str(e)}")
@@ -185,32 +441,23 @@ class DataAnalytics:
             if not results:
                 return
             
-            # Gera nome de arquivo único
-            filename = f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            file_path = os.path.join(self.analytics_dir, filename)
-            
-            # Prepara dados para salvar
-            data_to_save = {
-                'timestamp': datetime.now().isoformat(),
-                'details': results
-            }
-            
-            # Adiciona estatísticas se fornecidas
-            if stats:
-                data_to_save['stats'] = stats
-            
-            # Salva os resultados
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data_to_save, f, indent=4)
-            
-            # Adiciona aos dados em memória
+            timestamp = datetime.now().isoformat()
+            records = []
             for result in results:
                 if isinstance(result, dict):
-                    self.data.append(result)
+                    if 'timestamp' not in result:
+                        result['timestamp'] = timestamp
+                    records.append(result)
+            
+            count = self.store.insert_many(records)
             
-            logger.info(f"Resultados de lote registrados: {file_path}")
-            return file_path
+            # Lê de volta apenas as linhas novas (inclui as gravadas por outros processos)
+            with self._lock:
+                self._append_rows(self.store.fetch_since(self._last_id))
+            
+            logger.info(f"Resultados de lote registrados: {count} documentos")
+            return count
         
         except Exception as e:
             logger.error(f"Erro ao registrar resultados de lote: {str(e)}")
-            return None
\ No newline at end of file
+            return None
@@ -0,0 +1,159 @@
+import os
+import json
+import glob
+import shutil
+import sqlite3
+import threading
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _json_default(value):
+    """Converte valores que o json não serializa (ex.: escalares numpy)"""
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class AnalyticsStore:
+    """Armazena os registros de processamento em um banco SQLite embutido
+
+    Cada registro é uma linha na tabela records, com as colunas usadas pelo
+    dashboard já tipadas e o dicionário original em payload. A chave
+    autoincremental permite ler apenas as linhas novas desde a última carga.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT,
+            pdf_path TEXT,
+            doc_type TEXT,
+            success INTEGER,
+            confidence REAL,
+            processing_time REAL,
+            error TEXT,
+            payload TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_records_timestamp ON records(timestamp);
+        CREATE TABLE IF NOT EXISTS imported_files (
+            filename TEXT PRIMARY KEY
+        );
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+
+    def close(self):
+        """Fecha a conexão com o banco"""
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_row(record):
+        success = record.get('success')
+        return (
+            record.get('timestamp'),
+            record.get('pdf_path'),
+            record.get('doc_type'),
+            None if success is None else int(bool(success)),
+            record.get('confidence'),
+            record.get('processing_time'),
+            record.get('error'),
+            json.dumps(record, ensure_ascii=False, default=_json_default)
+        )
+
+    def insert(self, record):
+        """Insere um registro e retorna seu id"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO records (timestamp, pdf_path, doc_type, success, confidence, processing_time, error, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                self._to_row(record)
+            )
+            return cursor.lastrowid
+
+    def insert_many(self, records):
+        """Insere vários registros em uma única transação"""
+        rows = [self._to_row(record) for record in records if isinstance(record, dict)]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO records (timestamp, pdf_path, doc_type, success, confidence, processing_time, error, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def fetch_since(self, last_id=0):
+        """Retorna (id, registro) de todas as linhas com id maior que last_id"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, payload FROM records WHERE id > ? ORDER BY id", (last_id,)
+            ).fetchall()
+        return [(row_id, json.loads(payload)) for row_id, payload in rows]
+
+    def count(self):
+        """Retorna o número total de registros"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def import_legacy_files(self, directory):
+        """Importa uma única vez os arquivos JSON do formato antigo (um por documento/lote)
+
+        Os arquivos importados são movidos para a subpasta imported/, de modo
+        que as próximas varreduras do diretório fiquem baratas.
+        """
+        imported_dir = os.path.join(directory, 'imported')
+        imported = 0
+
+        for log_file in glob.glob(os.path.join(directory, "*.json")):
+            filename = os.path.basename(log_file)
+            with self._lock:
+                already = self._conn.execute(
+                    "SELECT 1 FROM imported_files WHERE filename = ?", (filename,)
+                ).fetchone()
+            if already:
+                continue
+
+            try:
+                with open(log_file, 'r', encoding='utf-8') as f:
+                    log_data = json.load(f)
+
+                # Verifica se é um log individual ou um lote
+                if isinstance(log_data, dict) and 'details' in log_data:
+                    records = [item for item in log_data.get('details', []) if isinstance(item, dict)]
+                elif isinstance(log_data, dict):
+                    records = [log_data]
+                else:
+                    records = []
+
+                rows = [self._to_row(record) for record in records]
+                with self._lock, self._conn:
+                    self._conn.executemany(
+                        "INSERT INTO records (timestamp, pdf_path, doc_type, success, confidence, processing_time, error, payload) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        rows
+                    )
+                    self._conn.execute("INSERT INTO imported_files (filename) VALUES (?)", (filename,))
+                imported += len(rows)
+            except Exception as e:
+                logger.error(f"Erro ao importar arquivo de log {log_file}: {str(e)}")
+                continue
+
+            try:
+                os.makedirs(imported_dir, exist_ok=True)
+                shutil.move(log_file, os.path.join(imported_dir, filename))
+            except OSError as e:
+                logger.warning(f"Não foi possível mover {log_file} após a importação: {str(e)}")
+
+        if imported:
+            logger.info(f"Importados {imported} registros de arquivos JSON antigos")
+        return imported
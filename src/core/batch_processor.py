@@ -1,12 +1,32 @@
 import os
-import glob
+import json
+import fnmatch
+import itertools
 import concurrent.futures
+import threading
 import time
+from collections import Counter
+from datetime import datetime
 from tqdm import tqdm
 from ..utils.logger import get_logger
+from ..utils.timing import StageTimer
+from ..utils.metrics import MetricsRegistry
+from ..utils.profiling import DocumentProfiler, summarize_profiles
 from .document_classifier import DocumentClassifier
 from .extractor import PDFExtractor
-from .exporter import DataExporter
+from .downloader import PDFDownloader
+from .exporter import DataExporter, StreamingExcelWriter
+from .batch_sink import SQLiteBatchSink
+from .cancellation import BatchCancelled
+from .job_journal import JobJournal
+from .deduplicator import DocumentDeduplicator
+from .analytics_store import AnalyticsStore
+from .concurrency import ConcurrencyController
+from .fallback import FallbackChain, DEFAULT_FALLBACK_CHAIN
+from .isolation import (IsolatedWorkerPool, DocumentTimeout, _extract_in_worker, _classify_in_worker,
+                        _profile_in_worker)
+from .scheduler import (count_pages, estimate_cost, iter_longest_first, split_page_ranges, merge_extractions,
+                        DEFAULT_LOOKAHEAD)
 
 logger = get_logger(__name__)
 
@@ -20,114 +40,990 @@ class BatchProcessor:
             patterns_dir=config.get('patterns_dir')
         )
         self.extractor = PDFExtractor()
-        self.exporter = DataExporter(config.get('export_dir'))
+        self.exporter = DataExporter(config.get('export_dir'), sql_chunksize=config.get('sql_chunksize', 1000))
         self.max_workers = config.get('max_workers', 4)
+        # Número máximo de arquivos submetidos ao pool ao mesmo tempo
+        self.max_in_flight = config.get('max_in_flight', self.max_workers * 2)
+        # Documentos com mais de split_pages páginas são extraídos em intervalos paralelos
+        self.split_pages = config.get('split_pages')
+        self.pages_per_task = config.get('pages_per_task', 50)
+        self.metrics = MetricsRegistry()
+        self._create_metrics()
+        self.profiler = self.create_profiler()
+        # Marca a thread que processa um documento perfilado
+        self._profiling = threading.local()
+        # Tempos limite (em segundos) por documento e por etapa ('classify', 'extract')
+        self.document_timeout = config.get('document_timeout')
+        self.stage_timeouts = config.get('stage_timeouts') or {}
+        # Pool de processos auxiliares ativo durante process_batch
+        self.isolated_pool = None
+        self.fallback_chain = self.create_fallback_chain()
+        # Método usado quando nenhum é especificado ('auto' = cadeia de métodos)
+        self.default_method = 'auto' if self.fallback_chain is not None else 'text'
+    
+    def _create_metrics(self):
+        """Registra as métricas operacionais do processamento em lote"""
+        self.documents_total = self.metrics.counter(
+            'pdf_extractor_documents_total', "Documentos processados por método e status", ('method', 'status')
+        )
+        self.pages_total = self.metrics.counter(
+            'pdf_extractor_pages_total', "Páginas processadas por método e status", ('method', 'status')
+        )
+        self.stage_seconds = self.metrics.histogram(
+            'pdf_extractor_stage_seconds', "Tempo de cada etapa do processamento de um documento", ('stage',)
+        )
+        self.in_flight_jobs = self.metrics.gauge(
+            'pdf_extractor_in_flight_jobs', "Documentos em processamento no momento"
+        )
+        self.queue_depth = self.metrics.gauge(
+            'pdf_extractor_queue_depth', "Documentos submetidos ao pool aguardando um worker"
+        )
+        self.concurrency_limit = self.metrics.gauge(
+            'pdf_extractor_concurrency_limit', "Orçamento de concorrência atual (em unidades de peso)"
+        )
+        self.cache_hit_ratio = self.metrics.gauge(
+            'pdf_extractor_cache_hit_ratio', "Fração dos arquivos descobertos atendida sem extração", ('cache',)
+        )
+    
+    def start_metrics_server(self):
+        """Serve as métricas na porta metrics_port da config, se configurada
+        
+        Retorna o servidor iniciado, ou None se não houver porta configurada ou
+        se o servidor já estiver ativo. process_batch encerra ao final o
+        servidor que iniciou; um servidor iniciado antes (por exemplo, chamando
+        este método ao abrir a aplicação) continua ativo entre os lotes e deve
+        ser encerrado com metrics.stop_server().
+        """
+        port = self.config.get('metrics_port')
+        if not port or self.metrics.server is not None:
+            return None
+        try:
+            server = self.metrics.start_server(port, host=self.config.get('metrics_host', '127.0.0.1'))
+            logger.info(f"Métricas disponíveis em http://{server.server_address[0]}:{server.server_address[1]}/metrics")
+            return server
+        except Exception as e:
+            logger.error(f"Erro ao iniciar o servidor de métricas: {str(e)}")
+            return None
+    
+    def record_metrics(self, result, extraction_method):
+        """Atualiza contadores e histogramas com o resultado de um documento"""
+        method = extraction_method or self.default_method
+        if result.get('success', True):
+            status = 'success'
+        else:
+            status = 'timeout' if result.get('error_class') == 'timeout' else 'failed'
+        self.documents_total.inc(method=method, status=status)
+        if result.get('pages_processed'):
+            self.pages_total.inc(result['pages_processed'], method=method, status=status)
+        for stage, seconds in (result.get('stage_timings') or {}).items():
+            self.stage_seconds.observe(seconds, stage=stage)
+        if result.get('processing_time') is not None:
+            self.stage_seconds.observe(result['processing_time'], stage='total')
+        for seconds in result.get('ocr_page_times') or []:
+            self.stage_seconds.observe(seconds, stage='ocr_page')
+    
+    def create_profiler(self):
+        """Cria o perfilador de documentos se profile_sample_rate for maior que zero
+        
+        Só um documento é perfilado por vez; os que forem sorteados enquanto
+        outro está sendo perfilado são processados sem perfil.
+        """
+        sample_rate = self.config.get('profile_sample_rate', 0)
+        if not sample_rate:
+            return None
+        profile_dir = self.config.get('profile_dir') or os.path.join(self.config.get('export_dir') or '.', 'profiles')
+        return DocumentProfiler(profile_dir, sample_rate=sample_rate, top_n=self.config.get('profile_top_n', 20))
+    
+    def profiled_process_pdf(self, pdf_path, *args, **kwargs):
+        """Processa um PDF, perfilando-o se fizer parte da amostra do perfilador
+        
+        O resumo do perfil (hotspots, alocações e caminhos dos arquivos .prof e
+        .tracemalloc) fica em result['profile']. Com o pool de processos
+        auxiliares ativo, a classificação e a extração rodam perfiladas no
+        processo auxiliar, com os mesmos tempos limite, e esses perfis são
+        juntados ao do documento. Documentos perfilados não são divididos em
+        intervalos de páginas.
+        """
+        if self.profiler is None or not self.profiler.should_profile(pdf_path):
+            return self.process_pdf(pdf_path, *args, **kwargs)
+        
+        worker_profiles = []
+        
+        def run(pdf_path, *args, **kwargs):
+            self._profiling.worker_profiles = worker_profiles
+            try:
+                return self.process_pdf(pdf_path, *args, **kwargs)
+            finally:
+                self._profiling.worker_profiles = None
+        
+        # Não espera outro documento terminar de ser perfilado: isso prenderia
+        # a thread e a vaga de concorrência do documento
+        profiled = self.profiler.try_profile(pdf_path, run, *args, **kwargs)
+        if profiled is None:
+            logger.info(f"Outro documento está sendo perfilado, processando {pdf_path} sem perfil")
+            return self.process_pdf(pdf_path, *args, **kwargs)
+        
+        result, profile = profiled
+        profile = self.profiler.merge_worker_profiles(profile, worker_profiles)
+        if result:
+            result['profile'] = profile
+        return result
     
     def find_pdfs(self, input_path):
         """Encontra todos os PDFs em um diretório ou retorna um único arquivo"""
-        if os.path.isdir(input_path):
-            return glob.glob(os.path.join(input_path, "**", "*.pdf"), recursive=True)
-        elif os.path.isfile(input_path) and input_path.lower().endswith('.pdf'):
-            return [input_path]
-        return []
-    
-    def process_pdf(self, pdf_path, extraction_method=None, template=None, export_format='csv'):
-        """Processa um único PDF"""
+        return list(self.iter_pdfs(input_path))
+    
+    @staticmethod
+    def _matches(rel_path, name, patterns):
+        return any(fnmatch.fnmatch(rel_path, pattern) or fnmatch.fnmatch(name, pattern) for pattern in patterns)
+    
+    def iter_pdfs(self, input_path, include=None, exclude=None):
+        """Percorre o diretório com os.scandir e gera os PDFs à medida que os encontra
+        
+        A extensão é comparada sem diferenciar maiúsculas. include/exclude são
+        padrões glob (padrão: config 'include_patterns'/'exclude_patterns')
+        comparados com o nome e com o caminho relativo; diretórios excluídos não
+        são percorridos.
+        """
+        include = include if include is not None else self.config.get('include_patterns') or []
+        exclude = exclude if exclude is not None else self.config.get('exclude_patterns') or []
+        
+        if os.path.isfile(input_path):
+            if input_path.lower().endswith('.pdf'):
+                yield input_path
+            return
+        if not os.path.isdir(input_path):
+            return
+        
+        stack = [input_path]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    subdirs = []
+                    for entry in entries:
+                        rel_path = os.path.relpath(entry.path, input_path).replace(os.sep, '/')
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        
+                        if is_dir:
+                            # Poda: diretórios excluídos não são percorridos
+                            if not self._matches(rel_path, entry.name, exclude):
+                                subdirs.append(entry.path)
+                        elif entry.name.lower().endswith('.pdf'):
+                            if include and not self._matches(rel_path, entry.name, include):
+                                continue
+                            if exclude and self._matches(rel_path, entry.name, exclude):
+                                continue
+                            yield entry.path
+            except OSError as e:
+                logger.warning(f"Não foi possível listar {directory}: {str(e)}")
+                continue
+            
+            # Percorre os subdiretórios na ordem em que foram listados
+            stack.extend(reversed(subdirs))
+    
+    def process_pdf(self, pdf_path, extraction_method=None, template=None, export_format='csv', sink=None,
+                    cancel_token=None):
+        """Processa um único PDF
+        
+        Se um sink for informado (lotes com export_format 'sql' ou 'excel'), os
+        dados são gravados no banco/planilha consolidados do lote em vez de um
+        arquivo por PDF. O cancel_token é consultado entre as etapas; se o
+        cancelamento foi solicitado, BatchCancelled é levantada.
+        
+        O resultado traz success, processing_time, o tempo de cada etapa
+        (stage_timings), pages_processed e bytes_read; em caso de falha, success
+        é False, error descreve o problema e error_class o classifica
+        ('timeout', 'no_data', 'unsupported_format', 'export_failed' ou 'error').
+        
+        Durante um lote com processos auxiliares (isolate_backends), a
+        classificação e a extração rodam nesses processos e respeitam
+        document_timeout e stage_timeouts.
+        """
+        doc_type, confidence = None, None
+        timer = StageTimer()
+        extraction = {}
+        deadline = time.monotonic() + self.document_timeout if self.document_timeout else None
         try:
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            
             logger.info(f"Processando arquivo: {pdf_path}")
+            extraction['bytes_read'] = os.path.getsize(pdf_path)
             
             # Classifica o documento se não houver template específico
             if not template:
-                doc_type, confidence = self.document_classifier.classify_document(pdf_path)
+                with timer.stage('classify'):
+                    doc_type, confidence = self.classify_document(pdf_path, deadline)
                 if doc_type and confidence > 0.5:
                     logger.info(f"Documento classificado como {doc_type} com confiança {confidence:.2f}")
                     # Carrega o template correspondente
-                    template_path = os.path.join(self.config.get('template_dir', ''), f"{doc_type}_template.json")
-                    if os.path.exists(template_path):
-                        with open(template_path, 'r') as f:
-                            template = json.load(f)
+                    with timer.stage('template'):
+                        template_path = os.path.join(self.config.get('template_dir', ''), f"{doc_type}_template.json")
+                        if os.path.exists(template_path):
+                            with open(template_path, 'r') as f:
+                                template = json.load(f)
             
-            # Determina o método de extração se não for especificado
-            if not extraction_method:
-                extraction_method = 'text'  # Método padrão
+            # Sem método especificado, usa a cadeia de métodos (ou o método padrão)
+            if not extraction_method or extraction_method == 'auto':
+                extraction_method = self.default_method
+            
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
             
             # Extrai dados do PDF
-            extracted_data = self.extractor.extract_data(pdf_path, extraction_method, 'all', template)
+            with timer.stage('extract'):
+                if extraction_method == 'auto':
+                    extracted_data = self.extract_with_fallback(pdf_path, template, deadline)
+                else:
+                    extracted_data = self.extract_document(pdf_path, extraction_method, template, deadline=deadline)
             
             if not extracted_data:
                 logger.warning(f"Nenhum dado extraído de {pdf_path}")
-                return None
+                return self._failure_result(pdf_path, "Nenhum dado extraído", doc_type, confidence, timer, extraction,
+                                            error_class='no_data')
+            
+            # Tempos da extração ficam no resultado, não nos dados exportados
+            metadata = extracted_data.get('_metadata')
+            if isinstance(metadata, dict):
+                timer.merge(metadata.pop('timings', None))
+                extraction['pages_processed'] = metadata.pop('pages_processed', None)
+                ocr_page_times = metadata.pop('ocr_page_times', None)
+                if ocr_page_times:
+                    extraction['ocr_page_times'] = ocr_page_times
+            
+            # Última verificação: a exportação, uma vez iniciada, é concluída
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
             
             # Exporta os dados
             filename = os.path.splitext(os.path.basename(pdf_path))[0] + f".{export_format}"
             
-            if export_format == 'csv':
-                result = self.exporter.export_to_csv(extracted_data, filename)
-            elif export_format == 'json':
-                result = self.exporter.export_to_json(extracted_data, filename)
-            elif export_format == 'sql':
-                result = self.exporter.export_to_sql(extracted_data, filename)
-            else:
-                logger.error(f"Formato de exportação não suportado: {export_format}")
-                return None
-            
-            return {
-                'pdf_path': pdf_path,
-                'export_path': result,
-                'doc_type': doc_type if 'doc_type' in locals() else None,
-                'confidence': confidence if 'confidence' in locals() else None
-            }
+            with timer.stage('export'):
+                if sink is not None:
+                    try:
+                        result = sink.write(pdf_path, extracted_data, doc_type, confidence)
+                    except Exception as e:
+                        logger.error(f"Erro ao gravar {pdf_path} no destino do lote: {str(e)}")
+                        return self._failure_result(pdf_path, str(e), doc_type, confidence, timer, extraction,
+                                                    error_class='export_failed')
+                elif export_format == 'csv':
+                    result = self.exporter.export_to_csv(extracted_data, filename)
+                elif export_format == 'json':
+                    result = self.exporter.export_to_json(extracted_data, filename)
+                elif export_format == 'ndjson':
+                    result = self.exporter.export_to_ndjson(
+                        extracted_data, filename, compression=self.config.get('ndjson_compression')
+                    )
+                elif export_format == 'sql':
+                    result = self.exporter.export_to_sql(extracted_data, filename)
+                elif export_format == 'excel':
+                    result = self.exporter.export_to_excel(extracted_data, os.path.splitext(filename)[0] + '.xlsx', streaming=True)
+                elif export_format == 'parquet':
+                    result = self.exporter.export_to_parquet(extracted_data, filename, doc_type=doc_type)
+                elif export_format == 'feather':
+                    result = self.exporter.export_to_feather(extracted_data, filename)
+                else:
+                    logger.error(f"Formato de exportação não suportado: {export_format}")
+                    return self._failure_result(
+                        pdf_path, f"Formato de exportação não suportado: {export_format}",
+                        doc_type, confidence, timer, extraction, error_class='unsupported_format'
+                    )
+            
+            if not result:
+                return self._failure_result(pdf_path, "Falha na exportação", doc_type, confidence, timer, extraction,
+                                            error_class='export_failed')
+            
+            return dict(
+                self._timing_fields(timer, extraction),
+                pdf_path=pdf_path,
+                export_path=result,
+                doc_type=doc_type,
+                confidence=confidence,
+                success=True
+            )
         
+        except BatchCancelled:
+            raise
+        except DocumentTimeout as e:
+            logger.error(f"Tempo limite excedido ao processar {pdf_path}: {str(e)}")
+            extraction['timed_out_stage'] = e.stage
+            return self._failure_result(pdf_path, str(e), doc_type, confidence, timer, extraction,
+                                        error_class='timeout')
         except Exception as e:
             logger.error(f"Erro ao processar {pdf_path}: {str(e)}")
+            return self._failure_result(pdf_path, str(e), doc_type, confidence, timer, extraction)
+    
+    @staticmethod
+    def _timing_fields(timer, extraction):
+        """Campos de instrumentação comuns aos resultados de sucesso e de falha"""
+        fields = {
+            'timestamp': datetime.now().isoformat(),
+            'processing_time': timer.elapsed(),
+            'stage_timings': dict(timer.timings),
+            'pages_processed': extraction.get('pages_processed'),
+            'bytes_read': extraction.get('bytes_read')
+        }
+        if extraction.get('ocr_page_times'):
+            fields['ocr_page_times'] = extraction['ocr_page_times']
+        return fields
+    
+    def _failure_result(self, pdf_path, error, doc_type, confidence, timer, extraction, error_class='error'):
+        """Monta o resultado de um PDF que não pôde ser processado"""
+        result = dict(
+            self._timing_fields(timer, extraction),
+            pdf_path=pdf_path,
+            export_path=None,
+            doc_type=doc_type,
+            confidence=confidence,
+            success=False,
+            error=error,
+            error_class=error_class
+        )
+        if extraction.get('timed_out_stage'):
+            result['timed_out_stage'] = extraction['timed_out_stage']
+        return result
+    
+    def create_fallback_chain(self):
+        """Cria a cadeia de métodos do modo automático (config 'fallback_chain')
+        
+        A cadeia é opcional: fallback_chain pode ser uma lista de métodos ou
+        True (DEFAULT_FALLBACK_CHAIN). Sem ela, o modo automático usa só o
+        método 'text'. Como o OCR de um documento digitalizado pode custar
+        muito, convém limitar document_budget_seconds e document_budget_cost.
+        """
+        methods = self.config.get('fallback_chain')
+        if methods is True:
+            methods = DEFAULT_FALLBACK_CHAIN
+        if not methods:
+            return None
+        return FallbackChain(
+            methods,
+            budget_seconds=self.config.get('document_budget_seconds'),
+            budget_cost=self.config.get('document_budget_cost'),
+            min_chars=self.config.get('fallback_min_chars', 20)
+        )
+    
+    def extract_with_fallback(self, pdf_path, template=None, deadline=None):
+        """Extrai o documento com a cadeia de métodos do modo automático"""
+        def extract_step(pdf, method, pages, step_template):
+            if pages == 'all':
+                return self.extract_document(pdf, method, step_template, deadline=deadline)
+            return self.extract_pages(pdf, method, pages, step_template, deadline)
+        
+        return self.fallback_chain.extract(pdf_path, extract_step, template, num_pages=count_pages(pdf_path))
+    
+    def create_isolated_pool(self, concurrent_documents=None):
+        """Cria o pool de processos auxiliares do lote, ou None
+        
+        Fica ativo com isolate_backends ou, por padrão, sempre que
+        document_timeout ou stage_timeouts estiverem configurados. Por padrão
+        (isolation_workers), há um processo para cada chamada simultânea
+        possível: os documentos em andamento vezes os intervalos de páginas
+        extraídos em paralelo (range_workers) com split_pages. Os processos
+        são iniciados sob demanda.
+        """
+        isolate = self.config.get('isolate_backends', bool(self.document_timeout or self.stage_timeouts))
+        if not isolate:
+            return None
+        workers = self.config.get('isolation_workers')
+        if not workers:
+            workers = concurrent_documents or self.max_workers
+            if self.split_pages:
+                workers *= self.config.get('range_workers', self.max_workers)
+        return IsolatedWorkerPool(workers, start_method=self.config.get('isolation_start_method', 'spawn'))
+    
+    def _stage_deadline(self, stage, deadline):
+        """Prazo absoluto (time.monotonic) da etapa, limitado pelo prazo do documento"""
+        now = time.monotonic()
+        if deadline is not None and deadline <= now:
+            raise DocumentTimeout(stage, self.document_timeout)
+        timeout = self.stage_timeouts.get(stage)
+        if timeout is None:
+            return deadline
+        return now + timeout if deadline is None else min(deadline, now + timeout)
+    
+    def _run_isolated(self, fn, *args, stage, deadline=None):
+        """Executa fn no pool de processos auxiliares, perfilando-a se o documento for perfilado"""
+        worker_profiles = getattr(self._profiling, 'worker_profiles', None)
+        if worker_profiles is not None:
+            profile_path = self.profiler.worker_profile_path()
+            worker_profiles.append(profile_path)
+            args = (profile_path, fn) + args
+            fn = _profile_in_worker
+        return self.isolated_pool.run(fn, *args, stage=stage, deadline=self._stage_deadline(stage, deadline))
+    
+    def classify_document(self, pdf_path, deadline=None):
+        """Classifica o documento, no processo auxiliar se o pool estiver ativo"""
+        if self.isolated_pool is None:
+            return self.document_classifier.classify_document(pdf_path)
+        return self._run_isolated(
+            _classify_in_worker, pdf_path, self.config.get('classifier_model_path'), self.config.get('patterns_dir'),
+            stage='classify', deadline=deadline
+        )
+    
+    def extract_pages(self, pdf_path, extraction_method, pages='all', template=None, deadline=None):
+        """Extrai as páginas informadas, no processo auxiliar se o pool estiver ativo"""
+        if self.isolated_pool is None:
+            return self.extractor.extract_data(pdf_path, extraction_method, pages, template)
+        return self._run_isolated(
+            _extract_in_worker, pdf_path, extraction_method, pages, template,
+            stage='extract', deadline=deadline
+        )
+    
+    def extract_document(self, pdf_path, extraction_method, template=None, deadline=None):
+        """Extrai um PDF inteiro, dividindo documentos grandes em intervalos de páginas
+        
+        Se split_pages estiver configurado e o documento tiver mais páginas que
+        isso, cada intervalo de pages_per_task páginas é extraído em paralelo e
+        os resultados são juntados em um só (exceto em documentos perfilados).
+        """
+        if (not self.split_pages or extraction_method not in self.extractor.extraction_methods
+                or getattr(self._profiling, 'worker_profiles', None) is not None):
+            return self.extract_pages(pdf_path, extraction_method, 'all', template, deadline)
+        
+        num_pages = count_pages(pdf_path)
+        if not num_pages or num_pages <= self.split_pages:
+            return self.extract_pages(pdf_path, extraction_method, 'all', template, deadline)
+        
+        page_ranges = split_page_ranges(num_pages, self.pages_per_task)
+        logger.info(f"Extraindo {pdf_path} em {len(page_ranges)} intervalos de páginas")
+        
+        range_workers = self.config.get('range_workers', self.max_workers)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(range_workers, len(page_ranges))) as executor:
+            parts = list(executor.map(
+                lambda pages: self.extract_pages(pdf_path, extraction_method, pages, template, deadline),
+                page_ranges
+            ))
+        
+        return merge_extractions(parts, num_pages)
+    
+    def create_batch_sink(self, export_format):
+        """Cria o destino consolidado de um lote (um banco SQLite ou uma planilha)
+        
+        Retorna None para formatos exportados em um arquivo por PDF.
+        """
+        timestamp = time.strftime('%Y%m%d_%H%M%S')
+        if export_format == 'sql':
+            db_path = self.config.get('batch_db_path') or os.path.join(
+                self.config.get('export_dir', ''), f"batch_{timestamp}.db"
+            )
+            return SQLiteBatchSink(
+                db_path,
+                commit_every=self.config.get('batch_db_commit_every', 200)
+            ).start()
+        if export_format == 'excel':
+            return StreamingExcelWriter(
+                os.path.join(self.config.get('export_dir', ''), f"batch_{timestamp}.xlsx"),
+                max_sheets=self.config.get('batch_excel_max_sheets', 200)
+            )
+        return None
+    
+    @staticmethod
+    def mark_sink_failures(results, sink):
+        """Marca como falhos os resultados de documentos que o destino do lote não conseguiu confirmar"""
+        failed = getattr(sink, 'failed_documents', None)
+        if not failed:
+            return
+        for result in results:
+            source = result.get('duplicate_of') or result.get('pdf_path')
+            if result.get('success', True) and source in failed:
+                result.update(
+                    success=False,
+                    export_path=None,
+                    error=f"Falha ao gravar no destino do lote: {failed[source]}",
+                    error_class='export_failed'
+                )
+    
+    def create_job_journal(self):
+        """Abre o journal de jobs configurado em journal_path (ou None se desativado)"""
+        journal_path = self.config.get('journal_path')
+        if not journal_path:
             return None
+        return JobJournal(journal_path, max_attempts=self.config.get('max_attempts', 3))
     
-    def process_batch(self, input_path, extraction_method=None, template=None, export_format='csv', callback=None):
-        """Processa um lote de PDFs"""
-        pdf_files = self.find_pdfs(input_path)
+    def process_journaled(self, journal, pdf_path, extraction_method=None, template=None, export_format='csv',
+                          sink=None, cancel_token=None):
+        """Processa um PDF registrando início, conclusão ou falha no journal
+        
+        Com um destino de lote (sink), a gravação só é definitiva quando o
+        destino confirma o documento; o arquivo fica como 'running' até lá e
+        é concluído pelo on_commit do destino (ver process_batch).
+        """
+        journal.start(pdf_path)
+        try:
+            result = self.profiled_process_pdf(pdf_path, extraction_method, template, export_format, sink,
+                                               cancel_token)
+        except BatchCancelled:
+            journal.release(pdf_path)
+            raise
+        except Exception as e:
+            journal.fail(pdf_path, str(e))
+            raise
+        
+        if result and result.get('success', True):
+            if sink is None:
+                journal.finish(pdf_path, result.get('export_path'))
+        else:
+            error = result.get('error') if result else None
+            journal.fail(pdf_path, error or "Nenhum dado extraído ou exportado")
+        return result
+    
+    def create_deduplicator(self):
+        """Cria o detector de duplicatas do lote (config 'deduplicate'), ou None"""
+        if not self.config.get('deduplicate', False):
+            return None
+        return DocumentDeduplicator(
+            near_duplicates=self.config.get('detect_near_duplicates', False),
+            max_distance=self.config.get('near_duplicate_distance', 3)
+        )
+    
+    def create_concurrency_controller(self):
+        """Cria o controle adaptativo de concorrência (config 'adaptive_concurrency'), ou None"""
+        if not self.config.get('adaptive_concurrency', False):
+            return None
+        max_rss_mb = self.config.get('max_rss_mb')
+        return ConcurrencyController(
+            min_limit=self.config.get('concurrency_min', 1),
+            max_limit=self.config.get('concurrency_max', max(self.max_workers, os.cpu_count() or 1) * 2),
+            initial_limit=self.max_workers,
+            method_weights=self.config.get('concurrency_weights'),
+            target_cpu=self.config.get('target_cpu', 0.85),
+            min_available_memory=self.config.get('min_available_memory_mb', 512) * 1024 * 1024,
+            max_rss=max_rss_mb * 1024 * 1024 if max_rss_mb else None,
+            sample_interval=self.config.get('concurrency_sample_interval', 1.0)
+        )
+    
+    def process_batch(self, input_path, extraction_method=None, template=None, export_format='csv', callback=None,
+                      cancel_token=None):
+        """Processa um lote de PDFs
+        
+        No máximo max_in_flight arquivos ficam submetidos ao pool por vez; um novo
+        arquivo só é submetido quando outro termina. Se o cancel_token for
+        cancelado, nenhum arquivo novo é submetido, os que ainda não começaram
+        são descartados e os resultados obtidos até então são retornados.
         
-        if not pdf_files:
-            logger.warning(f"Nenhum arquivo PDF encontrado em {input_path}")
+        Com journal_path configurado, o lote pode ser retomado: arquivos já
+        concluídos são pulados e os que falharam são repetidos até max_attempts.
+        
+        Os PDFs são descobertos (iter_pdfs) à medida que a janela tem espaço, de
+        modo que a varredura e o processamento se sobrepõem; o total informado ao
+        callback é o número de arquivos descobertos até o momento.
+        
+        Com deduplicate ativo, o conteúdo de cada arquivo é comparado por hash
+        antes da submissão: duplicatas exatas não são extraídas e reaproveitam o
+        resultado do original (marcadas com duplicate_of). Com
+        detect_near_duplicates, quase-duplicatas são processadas normalmente e
+        marcadas com near_duplicate_of.
+        
+        Com schedule='longest_first', os arquivos são submetidos em ordem
+        decrescente de custo estimado (páginas, tamanho, proporção de imagens e
+        método), considerando até schedule_lookahead arquivos por vez
+        (DEFAULT_LOOKAHEAD por padrão; None espera a descoberta terminar antes
+        de submeter o primeiro arquivo).
+        
+        Com adaptive_concurrency, o número de arquivos em andamento deixa de
+        ser fixo: um ConcurrencyController amplia ou reduz o orçamento entre
+        concurrency_min e concurrency_max conforme a CPU e a memória, e cada
+        arquivo consome o peso do método de extração (concurrency_weights).
+        
+        Com document_timeout/stage_timeouts (ou isolate_backends), a
+        classificação e a extração rodam em processos auxiliares: um arquivo que
+        trave o pdfplumber, o Ghostscript, a JVM do tabula ou o Tesseract tem o
+        processo encerrado e substituído ao fim do prazo, e o lote segue.
+        
+        input_path também pode ser um iterável de caminhos (por exemplo, os
+        arquivos gerados por PDFDownloader.iter_downloads); cada caminho é lido
+        apenas quando a janela tem espaço.
+        """
+        # Os arquivos são descobertos durante o processamento
+        if isinstance(input_path, (str, os.PathLike)):
+            source = os.fspath(input_path)
+            pdf_files = self.iter_pdfs(source)
+        else:
+            pdf_files = iter(input_path)
+            source = "lista de arquivos"
+        first_pdf = next(pdf_files, None)
+        
+        if first_pdf is None:
+            logger.warning(f"Nenhum arquivo PDF encontrado em {source}")
             return []
         
-        logger.info(f"Iniciando processamento em lote de {len(pdf_files)} arquivos")
+        logger.info(f"Iniciando processamento em lote de {source}")
+        method_label = extraction_method or self.default_method
         results = []
+        discovered = 0
         
-        # Configuração da barra de progresso
-        progress_bar = tqdm(total=len(pdf_files), desc="Processando PDFs", unit="arquivo")
+        # Configuração da barra de progresso (o total cresce com a descoberta)
+        progress_bar = tqdm(desc="Processando PDFs", unit="arquivo")
         
-        # Processamento paralelo
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Submete os trabalhos
-            future_to_pdf = {
-                executor.submit(self.process_pdf, pdf, extraction_method, template, export_format): pdf 
-                for pdf in pdf_files
-            }
+        # Exportação SQL/Excel em lote vai para um único banco/planilha
+        sink = self.create_batch_sink(export_format)
+        journal = self.create_job_journal()
+        if sink is not None and journal is not None:
+            sink_path = getattr(sink, 'db_path', None) or getattr(sink, 'file_path', None)
             
-            # Processa os resultados à medida que são concluídos
-            for future in concurrent.futures.as_completed(future_to_pdf):
-                pdf = future_to_pdf[future]
-                try:
-                    result = future.result()
-                    if result:
-                        results.append(result)
+            def finish_committed(pdf_paths):
+                # Planilhas em partes: cada documento aponta para a sua
+                document_paths = getattr(sink, 'document_paths', {})
+                for pdf_path in pdf_paths:
+                    journal.finish(pdf_path, document_paths.get(pdf_path, sink_path))
+            
+            sink.on_commit = finish_committed
+        # Duplicatas cujo original depende da confirmação do destino do lote
+        deferred_duplicates = []
+        deduplicator = self.create_deduplicator()
+        controller = self.create_concurrency_controller()
+        pool_size = controller.max_limit if controller is not None else self.max_workers
+        self.isolated_pool = self.create_isolated_pool(pool_size)
+        weight = controller.weight(method_label) if controller is not None else 1
+        exhausted = False
+        skipped = 0
+        result_by_pdf = {}
+        duplicates = []
+        near_duplicates = {}
+        
+        def cancelled():
+            return cancel_token is not None and cancel_token.cancelled
+        
+        def update_gauges():
+            running = sum(1 for future in list(future_to_pdf) if future.running())
+            self.in_flight_jobs.set(running)
+            self.queue_depth.set(len(future_to_pdf) - running)
+            if controller is not None:
+                self.concurrency_limit.set(controller.limit)
+            if discovered:
+                self.cache_hit_ratio.set(skipped / discovered, cache='journal')
+                self.cache_hit_ratio.set(len(duplicates) / discovered, cache='dedup')
+        
+        future_to_pdf = {}
+        metrics_server = self.start_metrics_server()
+        try:
+            # Processamento paralelo
+            with concurrent.futures.ThreadPoolExecutor(max_workers=pool_size) as executor:
+                pending_pdfs = itertools.chain([first_pdf], pdf_files)
+                if self.config.get('schedule') == 'longest_first':
+                    # Arquivos mais caros primeiro, para não sobrarem no fim do lote
+                    method = extraction_method or self.default_method
                     
-                    # Atualiza progresso
-                    progress_bar.update(1)
+                    def cost(pdf):
+                        try:
+                            return estimate_cost(pdf, method)['cost']
+                        except Exception as e:
+                            # O erro de leitura aparece de novo (e é reportado) ao processar o arquivo
+                            logger.error(f"Erro ao estimar o custo de {pdf}: {str(e)}")
+                            return 0.0
                     
-                    # Chama callback se fornecido
+                    pending_pdfs = iter_longest_first(
+                        pending_pdfs, cost, lookahead=self.config.get('schedule_lookahead', DEFAULT_LOOKAHEAD)
+                    )
+                
+                def reserve():
+                    if controller is not None:
+                        return controller.try_acquire(weight)
+                    return len(future_to_pdf) < self.max_in_flight
+                
+                def release():
+                    if controller is not None:
+                        controller.release(weight)
+                
+                def record_failure(pdf, error):
+                    # Arquivo que não pôde ser lido (removido, sem permissão ou bloqueado)
+                    error_class = 'io_error' if isinstance(error, OSError) else 'error'
+                    result = self._failure_result(pdf, str(error), None, None, StageTimer(), {},
+                                                  error_class=error_class)
+                    results.append(result)
+                    self.record_metrics(result, extraction_method)
+                    progress_bar.update(1)
                     if callback:
-                        callback(len(results), len(pdf_files), pdf)
+                        callback(len(results), discovered, pdf)
+                
+                def submit_more():
+                    nonlocal skipped, discovered, exhausted
+                    # Completa a janela de arquivos em andamento
+                    while not exhausted and not cancelled() and reserve():
+                        pdf = next(pending_pdfs, None)
+                        if pdf is None:
+                            exhausted = True
+                            release()
+                            return
+                        discovered += 1
                         
+                        try:
+                            should_process = journal is None or journal.should_process(pdf)
+                            kind, original = None, None
+                            if should_process and deduplicator is not None:
+                                kind, original = deduplicator.check(pdf)
+                        except Exception as e:
+                            logger.error(f"Erro ao ler {pdf}: {str(e)}")
+                            release()
+                            record_failure(pdf, e)
+                            continue
+                        
+                        if not should_process:
+                            # Concluído em uma execução anterior (ou sem tentativas restantes)
+                            release()
+                            skipped += 1
+                            self.documents_total.inc(method=method_label, status='skipped')
+                            progress_bar.update(1)
+                            continue
+                        
+                        if deduplicator is not None:
+                            if kind == 'duplicate':
+                                # Reaproveita o resultado do original ao final do lote
+                                release()
+                                duplicates.append((pdf, original))
+                                self.documents_total.inc(method=method_label, status='duplicate')
+                                progress_bar.update(1)
+                                continue
+                            if kind == 'near_duplicate':
+                                near_duplicates[pdf] = original
+                        
+                        if journal is None:
+                            future = executor.submit(
+                                self.profiled_process_pdf, pdf, extraction_method, template, export_format, sink,
+                                cancel_token
+                            )
+                        else:
+                            future = executor.submit(
+                                self.process_journaled, journal, pdf, extraction_method, template, export_format,
+                                sink, cancel_token
+                            )
+                        future_to_pdf[future] = pdf
+                
+                submit_more()
+                update_gauges()
+                
+                # Processa os resultados à medida que são concluídos
+                while future_to_pdf:
+                    done, _ = concurrent.futures.wait(
+                        future_to_pdf, return_when=concurrent.futures.FIRST_COMPLETED,
+                        timeout=controller.sample_interval if controller is not None else None
+                    )
+                    
+                    for future in done:
+                        pdf = future_to_pdf.pop(future)
+                        release()
+                        try:
+                            result = future.result()
+                            if result:
+                                if pdf in near_duplicates:
+                                    result['near_duplicate_of'] = near_duplicates[pdf]
+                                results.append(result)
+                                self.record_metrics(result, extraction_method)
+                                result_by_pdf[pdf] = result
+                            else:
+                                self.documents_total.inc(method=method_label, status='failed')
+                            
+                            # Atualiza progresso
+                            progress_bar.update(1)
+                            
+                            # Chama callback se fornecido
+                            if callback:
+                                callback(len(results), discovered, pdf)
+                        
+                        except (BatchCancelled, concurrent.futures.CancelledError):
+                            pass
+                        except Exception as e:
+                            logger.error(f"Erro ao processar {pdf}: {str(e)}")
+                            record_failure(pdf, e)
+                    
+                    if cancelled():
+                        # Descarta os arquivos que ainda não começaram
+                        for future in list(future_to_pdf):
+                            if future.cancel():
+                                del future_to_pdf[future]
+                                release()
+                    else:
+                        if controller is not None:
+                            controller.update(waiting_weight=0 if exhausted else weight)
+                        submit_more()
+                    update_gauges()
+            
+            # Duplicatas exatas recebem uma cópia do resultado do original, inclusive
+            # a falha; se o original não terminou (cancelado), a duplicata fica
+            # fora do journal e é processada na próxima execução
+            for pdf, original in duplicates:
+                original_result = result_by_pdf.get(original)
+                if original_result is None:
+                    error_class = 'cancelled' if cancelled() else 'error'
+                    results.append(dict(
+                        self._failure_result(pdf, f"O original {original} não foi processado", None, None,
+                                             StageTimer(), {}, error_class=error_class),
+                        duplicate_of=original
+                    ))
+                    if journal is not None and error_class != 'cancelled':
+                        journal.start(pdf)
+                        journal.fail(pdf, f"O original {original} não foi processado")
+                else:
+                    results.append(dict(original_result, pdf_path=pdf, duplicate_of=original))
+                    if journal is not None:
+                        journal.start(pdf)
+                        if not original_result.get('success', True):
+                            journal.fail(pdf, original_result.get('error'))
+                        elif sink is None:
+                            journal.finish(pdf, original_result.get('export_path'))
+                        else:
+                            deferred_duplicates.append((pdf, original))
+                if callback:
+                    callback(len(results), discovered, pdf)
+        
+        finally:
+            if sink is not None:
+                try:
+                    sink.close()
                 except Exception as e:
-                    logger.error(f"Erro ao processar {pdf}: {str(e)}")
-                    progress_bar.update(1)
+                    logger.error(f"Erro ao finalizar o destino do lote: {str(e)}")
+                self.mark_sink_failures(results, sink)
+                if journal is not None:
+                    failed = getattr(sink, 'failed_documents', None) or {}
+                    for pdf_path, error in failed.items():
+                        journal.fail(pdf_path, f"Falha ao gravar no destino do lote: {error}")
+                    for pdf, original in deferred_duplicates:
+                        if original in failed:
+                            journal.fail(pdf, f"Falha ao gravar no destino do lote: {failed[original]}")
+                        else:
+                            journal.finish(pdf, getattr(sink, 'document_paths', {}).get(original)
+                                           or getattr(sink, 'db_path', None) or getattr(sink, 'file_path', None))
+            if journal is not None:
+                journal.close()
+            if self.isolated_pool is not None:
+                if self.isolated_pool.replaced:
+                    logger.warning(f"{self.isolated_pool.replaced} processos auxiliares substituídos após travar ou falhar")
+                self.isolated_pool.close()
+                self.isolated_pool = None
+            self.in_flight_jobs.set(0)
+            self.queue_depth.set(0)
+            self.write_metrics()
+            if metrics_server is not None:
+                self.metrics.stop_server()
         
         progress_bar.close()
-        logger.info(f"Processamento em lote concluído. {len(results)} de {len(pdf_files)} arquivos processados com sucesso.")
+        self.log_analytics(results)
+        succeeded = sum(1 for result in results if result.get('success', True))
+        if skipped:
+            logger.info(f"{skipped} arquivos ignorados conforme o journal de jobs")
+        if duplicates:
+            logger.info(f"{len(duplicates)} arquivos duplicados reaproveitaram o resultado do original")
+        if cancelled():
+            logger.info(f"Processamento em lote cancelado. {succeeded} de {discovered} arquivos processados com sucesso.")
+        else:
+            logger.info(f"Processamento em lote concluído. {succeeded} de {discovered} arquivos processados com sucesso.")
         
         return results
     
+    def write_metrics(self):
+        """Grava as métricas no arquivo metrics_file da config, se configurado"""
+        metrics_file = self.config.get('metrics_file')
+        if not metrics_file:
+            return None
+        try:
+            return self.metrics.write(metrics_file)
+        except Exception as e:
+            logger.error(f"Erro ao gravar métricas em {metrics_file}: {str(e)}")
+            return None
+    
+    def log_analytics(self, results):
+        """Grava os resultados do lote no banco de análise (config 'analytics_dir'), se configurado"""
+        analytics_dir = self.config.get('analytics_dir')
+        if not analytics_dir or not results:
+            return
+        try:
+            os.makedirs(analytics_dir, exist_ok=True)
+            store = AnalyticsStore(os.path.join(analytics_dir, 'analytics.db'))
+            try:
+                store.insert_many(results)
+            finally:
+                store.close()
+        except Exception as e:
+            logger.error(f"Erro ao registrar resultados do lote para análise: {str(e)}")
+    
+    @staticmethod
+    def summarize_timings(results):
+        """Calcula p50/p95/p99 (em segundos) do tempo de cada etapa nos resultados
+        
+        Além das etapas registradas em stage_timings, inclui 'total' (o
+        processing_time de cada documento) e 'ocr_page' (o tempo de OCR de cada
+        página individualmente).
+        """
+        import numpy as np
+        
+        samples = {}
+        for result in results:
+            if result.get('duplicate_of'):
+                # Cópias do resultado do original distorceriam as estatísticas
+                continue
+            for stage, seconds in (result.get('stage_timings') or {}).items():
+                samples.setdefault(stage, []).append(seconds)
+            if result.get('processing_time') is not None:
+                samples.setdefault('total', []).append(result['processing_time'])
+            if result.get('ocr_page_times'):
+                samples.setdefault('ocr_page', []).extend(result['ocr_page_times'])
+        
+        summary = {}
+        for stage, values in samples.items():
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            summary[stage] = {
+                'count': len(values),
+                'p50': float(p50),
+                'p95': float(p95),
+                'p99': float(p99)
+            }
+        return summary
+    
+    def process_downloads(self, urls, extraction_method=None, template=None, export_format='csv', callback=None,
+                          cancel_token=None, downloader=None):
+        """Baixa as URLs (ou entradas de um manifesto) e processa cada PDF assim que termina de baixar
+        
+        Os downloads rodam em paralelo (download_workers, com no máximo
+        download_max_per_host por servidor) e alimentam process_batch, de modo
+        que download e extração se sobrepõem. URLs que não puderam ser baixadas
+        entram nos resultados com error_class 'download_failed', e as que ainda
+        não tinham sido baixadas quando o lote foi cancelado, com 'cancelled'.
+        Um downloader criado aqui é fechado ao final; um recebido pertence a
+        quem chamou.
+        """
+        if downloader is None:
+            with PDFDownloader(
+                self.config.get('download_dir', 'downloads'),
+                max_workers=self.config.get('download_workers', 8),
+                max_per_host=self.config.get('download_max_per_host', 4)
+            ) as downloader:
+                return self.process_downloads(urls, extraction_method, template, export_format, callback,
+                                              cancel_token, downloader)
+        
+        urls = list(urls)
+        failed_urls = []
+        # URLs ainda sem resposta do downloader
+        requested = [item if isinstance(item, str) else item.get('url') for item in urls]
+        pending_urls = Counter(url for url in requested if url)
+        
+        def downloaded_pdfs():
+            for url, file_path in downloader.iter_downloads(urls, cancel_token=cancel_token):
+                pending_urls[url] -= 1
+                if file_path:
+                    yield file_path
+                else:
+                    failed_urls.append(url)
+        
+        pdf_files = downloaded_pdfs()
+        try:
+            results = self.process_batch(pdf_files, extraction_method, template, export_format, callback, cancel_token)
+        finally:
+            pdf_files.close()
+        
+        for url in failed_urls:
+            results.append(self._failure_result(url, "Falha no download", None, None, StageTimer(), {},
+                                                error_class='download_failed'))
+        if cancel_token is not None and cancel_token.cancelled:
+            for url in pending_urls.elements():
+                results.append(self._failure_result(url, "Download cancelado", None, None, StageTimer(), {},
+                                                    error_class='cancelled'))
+        return results
+    
     def generate_batch_report(self, results, output_path=None):
         """Gera um relatório do processamento em lote"""
         if not results:
@@ -142,6 +1038,12 @@ class BatchProcessor:
         df['success'] = df['export_path'].notnull()
         df['filename'] = df['pdf_path'].apply(os.path.basename)
         
+        # Falhas por classe (timeout, no_data, export_failed...)
+        failure_classes = {}
+        if 'error_class' in df.columns:
+            counts = df.loc[~df['success'], 'error_class'].fillna('error').value_counts()
+            failure_classes = {key: int(value) for key, value in counts.items()}
+        
         # Gera estatísticas
         stats = {
             'total_files': len(results),
@@ -150,9 +1052,20 @@ class BatchProcessor:
             'success_rate': df['success'].mean() * 100,
             'document_types': df['doc_type'].value_counts().to_dict() if 'doc_type' in df.columns else {},
             'avg_confidence': df['confidence'].mean() if 'confidence' in df.columns else None,
+            'duplicates': int(df['duplicate_of'].notnull().sum()) if 'duplicate_of' in df.columns else 0,
+            'near_duplicates': int(df['near_duplicate_of'].notnull().sum()) if 'near_duplicate_of' in df.columns else 0,
+            'stage_timings': self.summarize_timings(results),
+            'failure_classes': failure_classes,
+            'timeouts': failure_classes.get('timeout', 0),
+            'pages_processed': int(df['pages_processed'].fillna(0).sum()) if 'pages_processed' in df.columns else 0,
+            'bytes_read': int(df['bytes_read'].fillna(0).sum()) if 'bytes_read' in df.columns else 0,
             'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
         }
         
+        profiling = summarize_profiles(results, self.config.get('profile_top_n', 20))
+        if profiling:
+            stats['profiling'] = profiling
+        
         # Exporta relatório se caminho for fornecido
         if output_path:
             report_path = os.path.join(output_path, f"batch_report_{time.strftime('%Y%m%d_%H%M%S')}.json")
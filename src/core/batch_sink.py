@@ -0,0 +1,248 @@
+import os
+import json
+import queue
+import sqlite3
+import threading
+import time
+import concurrent.futures
+from datetime import datetime
+import pandas as pd
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_STOP = object()
+
+
+class SQLiteBatchSink:
+    """Grava os resultados de um lote inteiro em um único banco SQLite
+
+    Os workers do lote chamam write(), que enfileira o documento e espera a
+    inserção. Uma única thread escritora mantém a conexão aberta e agrupa
+    vários documentos por transação; cada documento é inserido em um
+    savepoint próprio, de modo que a falha de um documento desfaz apenas as
+    linhas dele e é levantada no write() correspondente. Documentos cuja
+    transação não pôde ser confirmada ficam em failed_documents.
+
+    on_commit, se informado, é chamado (na thread escritora) com os
+    caminhos dos documentos de cada transação confirmada.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS documents (
+            id INTEGER PRIMARY KEY,
+            pdf_path TEXT NOT NULL,
+            doc_type TEXT,
+            confidence REAL,
+            extraction_method TEXT,
+            language TEXT,
+            num_pages INTEGER,
+            created_at TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS pages (
+            document_id INTEGER NOT NULL REFERENCES documents(id),
+            page TEXT NOT NULL,
+            content TEXT
+        );
+        CREATE TABLE IF NOT EXISTS tables (
+            document_id INTEGER NOT NULL REFERENCES documents(id),
+            table_name TEXT NOT NULL,
+            row_index INTEGER NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS fields (
+            document_id INTEGER NOT NULL REFERENCES documents(id),
+            name TEXT NOT NULL,
+            value TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_documents_doc_type ON documents(doc_type);
+        CREATE INDEX IF NOT EXISTS idx_documents_created_at ON documents(created_at);
+        CREATE INDEX IF NOT EXISTS idx_pages_document ON pages(document_id);
+        CREATE INDEX IF NOT EXISTS idx_tables_document ON tables(document_id, table_name);
+        CREATE INDEX IF NOT EXISTS idx_fields_document ON fields(document_id);
+    """
+
+    def __init__(self, db_path, commit_every=200, commit_interval=2.0, max_queue=256, on_commit=None):
+        self.db_path = db_path
+        self.on_commit = on_commit
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.documents_written = 0
+        self.error = None
+        # pdf_path -> erro dos documentos inseridos cujo commit falhou
+        self.failed_documents = {}
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def start(self):
+        """Inicia a thread escritora"""
+        if self._thread is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._thread = threading.Thread(target=self._run, name="sqlite-batch-sink", daemon=True)
+            self._thread.start()
+        return self
+
+    def write(self, pdf_path, extracted_data, doc_type=None, confidence=None):
+        """Grava um documento extraído e retorna o caminho do banco
+
+        Espera a inserção do documento (não o commit da transação) e levanta
+        a exceção da inserção se ela falhar.
+        """
+        if self.error:
+            raise RuntimeError(f"Gravação no banco do lote falhou: {self.error}")
+        inserted = concurrent.futures.Future()
+        # Bloqueia quando a fila está cheia, limitando a memória usada pelos workers
+        self.queue.put((pdf_path, extracted_data, doc_type, confidence, inserted))
+        inserted.result()
+        return self.db_path
+
+    def close(self):
+        """Grava os documentos pendentes e encerra a thread escritora"""
+        if self._thread is None:
+            return
+        self.queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+        logger.info(f"{self.documents_written} documentos gravados em {self.db_path}")
+
+    def _connect(self):
+        # Transações controladas explicitamente (BEGIN/SAVEPOINT/COMMIT)
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-65536")  # 64 MB
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.executescript(self.SCHEMA)
+        return conn
+
+    def _write_item(self, conn, pdf_path, data, doc_type, confidence, inserted):
+        """Insere um documento em um savepoint; retorna se a inserção deu certo"""
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        conn.execute("SAVEPOINT document")
+        try:
+            self._insert_document(conn, pdf_path, data, doc_type, confidence)
+        except Exception as e:
+            conn.execute("ROLLBACK TO SAVEPOINT document")
+            conn.execute("RELEASE SAVEPOINT document")
+            logger.error(f"Erro ao gravar {pdf_path} no banco do lote {self.db_path}: {str(e)}")
+            inserted.set_exception(e)
+            return False
+        conn.execute("RELEASE SAVEPOINT document")
+        inserted.set_result(self.db_path)
+        return True
+
+    def _commit(self, conn, uncommitted):
+        """Confirma a transação aberta; em caso de falha, registra os documentos perdidos"""
+        try:
+            if conn.in_transaction:
+                conn.execute("COMMIT")
+            if self.on_commit is not None and uncommitted:
+                try:
+                    self.on_commit(list(uncommitted))
+                except Exception as e:
+                    logger.error(f"Erro ao notificar documentos confirmados em {self.db_path}: {str(e)}")
+        except Exception as e:
+            logger.error(f"Erro ao confirmar {len(uncommitted)} documentos no banco do lote {self.db_path}: {str(e)}")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for pdf_path in uncommitted:
+                self.failed_documents[pdf_path] = str(e)
+            self.documents_written -= len(uncommitted)
+        uncommitted.clear()
+
+    def _run(self):
+        conn = None
+        item = None
+        uncommitted = []
+        last_commit = time.monotonic()
+        try:
+            conn = self._connect()
+            while True:
+                try:
+                    item = self.queue.get(timeout=self.commit_interval)
+                except queue.Empty:
+                    item = None
+
+                if item is _STOP:
+                    break
+                if item is not None and self._write_item(conn, *item):
+                    uncommitted.append(item[0])
+
+                if uncommitted and (len(uncommitted) >= self.commit_every or
+                                    time.monotonic() - last_commit >= self.commit_interval):
+                    self._commit(conn, uncommitted)
+                    last_commit = time.monotonic()
+            self._commit(conn, uncommitted)
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Erro ao gravar no banco do lote {self.db_path}: {str(e)}")
+            if item is not None and item is not _STOP and not item[-1].done():
+                item[-1].set_exception(e)
+            for pdf_path in uncommitted:
+                self.failed_documents[pdf_path] = str(e)
+            # Continua consumindo a fila até o fim do lote para não bloquear os workers
+            while item is not _STOP:
+                item = self.queue.get()
+                if item is _STOP:
+                    break
+                item[-1].set_exception(RuntimeError(f"Gravação no banco do lote falhou: {self.error}"))
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _insert_document(self, conn, pdf_path, data, doc_type, confidence):
+        metadata = {}
+        if isinstance(data, dict):
+            metadata = data.get('_metadata') or {}
+        elif isinstance(data, pd.DataFrame):
+            data = {'table_1': data}
+        else:
+            data = {'page_1': str(data)}
+
+        cursor = conn.execute(
+            "INSERT INTO documents (pdf_path, doc_type, confidence, extraction_method, language, num_pages, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (pdf_path, doc_type, confidence, metadata.get('extraction_method'),
+             metadata.get('language'), metadata.get('num_pages'), datetime.now().isoformat())
+        )
+        document_id = cursor.lastrowid
+
+        pages, fields = [], []
+        for key, value in data.items():
+            if key == '_metadata':
+                continue
+            if isinstance(value, pd.DataFrame):
+                if value.empty:
+                    continue
+                # to_json serializa tipos numpy/datas de forma vetorizada
+                df = value.copy()
+                df.columns = [str(col) for col in df.columns]
+                rows = df.to_json(orient='records', lines=True, force_ascii=False, date_format='iso').rstrip('\n').split('\n')
+                conn.executemany(
+                    "INSERT INTO tables (document_id, table_name, row_index, data) VALUES (?, ?, ?, ?)",
+                    ((document_id, key, i, row) for i, row in enumerate(rows))
+                )
+            elif isinstance(value, str) and key.startswith('page_'):
+                pages.append((document_id, key, value))
+            else:
+                if not isinstance(value, str):
+                    value = json.dumps(value, ensure_ascii=False, default=str)
+                fields.append((document_id, key, value))
+
+        if pages:
+            conn.executemany("INSERT INTO pages (document_id, page, content) VALUES (?, ?, ?)", pages)
+        if fields:
+            conn.executemany("INSERT INTO fields (document_id, name, value) VALUES (?, ?, ?)", fields)
+
+        self.documents_written += 1
@@ -0,0 +1,28 @@
+import threading
+
+class BatchCancelled(Exception):
+    """Levantada quando o processamento é interrompido por um CancellationToken"""
+
+class CancellationToken:
+    """Sinaliza, de forma cooperativa, que um processamento deve ser interrompido
+    
+    O token é consultado entre as etapas do processamento; a etapa em andamento
+    termina normalmente, de modo que nenhuma exportação fica pela metade.
+    """
+    
+    def __init__(self):
+        self._event = threading.Event()
+    
+    def cancel(self):
+        """Solicita o cancelamento"""
+        self._event.set()
+    
+    @property
+    def cancelled(self):
+        """Indica se o cancelamento foi solicitado"""
+        return self._event.is_set()
+    
+    def raise_if_cancelled(self):
+        """Levanta BatchCancelled se o cancelamento foi solicitado"""
+        if self._event.is_set():
+            raise BatchCancelled()
@@ -0,0 +1,178 @@
+import os
+import time
+import threading
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Parcela do orçamento de concorrência consumida por um documento de cada método
+DEFAULT_METHOD_WEIGHTS = {
+    'text': 1,
+    'tables': 2,
+    'ocr': 4,
+    # Cadeia de métodos: texto e, nas páginas vazias, OCR
+    'auto': 2
+}
+
+class ResourceSampler:
+    """Lê a utilização de CPU, o RSS do processo e a memória disponível
+    
+    Usa o psutil se estiver instalado; caso contrário, /proc (Linux) ou, na
+    falta dele, a carga média do sistema. Valores que não puderem ser medidos
+    são None.
+    """
+    
+    def __init__(self):
+        self._last_cpu_times = None
+        self._process = psutil.Process() if psutil is not None else None
+        if psutil is not None:
+            # A primeira leitura do psutil só inicia a contagem
+            psutil.cpu_percent(interval=None)
+    
+    @staticmethod
+    def _read_proc_stat():
+        with open('/proc/stat') as f:
+            values = [int(value) for value in f.readline().split()[1:]]
+        idle = values[3] + (values[4] if len(values) > 4 else 0)
+        return idle, sum(values)
+    
+    def cpu_utilization(self):
+        """Fração (0 a 1) de CPU usada desde a leitura anterior"""
+        if psutil is not None:
+            return psutil.cpu_percent(interval=None) / 100
+        try:
+            idle, total = self._read_proc_stat()
+            last, self._last_cpu_times = self._last_cpu_times, (idle, total)
+            if last is None or total == last[1]:
+                return None
+            return 1 - (idle - last[0]) / (total - last[1])
+        except (OSError, ValueError, IndexError):
+            pass
+        try:
+            return min(1.0, os.getloadavg()[0] / (os.cpu_count() or 1))
+        except (OSError, AttributeError):
+            return None
+    
+    def rss(self):
+        """Memória residente do processo, em bytes"""
+        if self._process is not None:
+            return self._process.memory_info().rss
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, AttributeError):
+            return None
+    
+    def available_memory(self):
+        """Memória disponível no sistema, em bytes"""
+        if psutil is not None:
+            return psutil.virtual_memory().available
+        try:
+            with open('/proc/meminfo') as f:
+                for line in f:
+                    if line.startswith('MemAvailable:'):
+                        return int(line.split()[1]) * 1024
+        except (OSError, ValueError):
+            pass
+        return None
+    
+    def sample(self):
+        """Retorna cpu, rss e available_memory"""
+        return {
+            'cpu': self.cpu_utilization(),
+            'rss': self.rss(),
+            'available_memory': self.available_memory()
+        }
+
+class ConcurrencyController:
+    """Ajusta o número de documentos em andamento conforme CPU e memória
+    
+    O limite é um orçamento em unidades de peso: cada documento consome o
+    peso do seu método (um OCR vale 4 documentos de texto, por padrão). A
+    cada amostragem, o limite cresce uma unidade enquanto a CPU estiver
+    abaixo de target_cpu e o limite estiver barrando documentos; é reduzido à metade
+    sob pressão de memória (memória disponível abaixo de
+    min_available_memory ou RSS acima de max_rss) e diminui uma unidade com
+    a CPU saturada. O limite fica sempre entre min_limit e max_limit, e um
+    documento é sempre admitido quando nada está em andamento.
+    """
+    
+    def __init__(self, min_limit=1, max_limit=8, initial_limit=None, method_weights=None, target_cpu=0.85,
+                 min_available_memory=512 * 1024 * 1024, max_rss=None, sample_interval=1.0, sampler=None):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(max(initial_limit or self.min_limit, self.min_limit), self.max_limit)
+        self.method_weights = dict(DEFAULT_METHOD_WEIGHTS, **(method_weights or {}))
+        self.target_cpu = target_cpu
+        self.min_available_memory = min_available_memory
+        self.max_rss = max_rss
+        self.sample_interval = sample_interval
+        self.sampler = sampler or ResourceSampler()
+        self.in_use = 0
+        self.last_sample = None
+        self._last_update = None
+        self._lock = threading.Lock()
+    
+    def weight(self, extraction_method):
+        """Peso de um documento do método informado"""
+        return self.method_weights.get(extraction_method or 'text', 1)
+    
+    def try_acquire(self, weight):
+        """Reserva weight unidades do orçamento, se couberem no limite atual"""
+        with self._lock:
+            if self.in_use and self.in_use + weight > self.limit:
+                return False
+            self.in_use += weight
+            return True
+    
+    def release(self, weight):
+        """Devolve as unidades reservadas por um documento concluído"""
+        with self._lock:
+            self.in_use = max(0, self.in_use - weight)
+    
+    def memory_pressure(self, sample):
+        """Indica se a amostra mostra pouca memória disponível ou RSS acima do máximo"""
+        available = sample.get('available_memory')
+        rss = sample.get('rss')
+        if available is not None and self.min_available_memory and available < self.min_available_memory:
+            return True
+        return bool(rss is not None and self.max_rss and rss > self.max_rss)
+    
+    def update(self, waiting_weight=0, force=False):
+        """Amostra os recursos (no máximo a cada sample_interval) e ajusta o limite
+        
+        waiting_weight é o peso do próximo documento esperando para ser
+        submetido (0 se não houver). Retorna o limite atual.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._last_update is not None and now - self._last_update < self.sample_interval:
+                return self.limit
+            self._last_update = now
+        
+        try:
+            sample = self.sampler.sample()
+        except Exception as e:
+            logger.error(f"Erro ao amostrar recursos do sistema: {str(e)}")
+            return self.limit
+        
+        with self._lock:
+            self.last_sample = sample
+            previous = self.limit
+            cpu = sample.get('cpu')
+            if self.memory_pressure(sample):
+                self.limit = max(self.min_limit, self.limit // 2)
+            elif cpu is not None and cpu > self.target_cpu:
+                self.limit = max(self.min_limit, self.limit - 1)
+            elif waiting_weight and self.in_use + waiting_weight > self.limit and (cpu is None or cpu < self.target_cpu):
+                # Só cresce se o limite atual estiver barrando documentos
+                self.limit = min(self.max_limit, self.limit + 1)
+            
+            if self.limit != previous:
+                logger.info(f"Limite de concorrência ajustado de {previous} para {self.limit} (amostra: {sample})")
+            return self.limit
@@ -0,0 +1,102 @@
+import re
+import hashlib
+import PyPDF2
+from ..utils.file_hash import cached_hash_file
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+def simhash(text, bits=64, shingle_size=3):
+    """Calcula a impressão digital SimHash de um texto a partir de trigramas de palavras"""
+    words = re.findall(r'\w+', text.lower())
+    if not words:
+        return None
+    
+    shingles = [' '.join(words[i:i + shingle_size]) for i in range(max(len(words) - shingle_size + 1, 1))]
+    weights = [0] * bits
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=bits // 8).digest(), 'big')
+        for bit in range(bits):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    
+    return sum(1 << bit for bit in range(bits) if weights[bit] > 0)
+
+def hamming_distance(a, b):
+    """Número de bits diferentes entre duas impressões digitais"""
+    return bin(a ^ b).count('1')
+
+def first_page_text(pdf_path):
+    """Extrai o texto da primeira página de um PDF"""
+    try:
+        with open(pdf_path, 'rb') as f:
+            reader = PyPDF2.PdfReader(f)
+            if not reader.pages:
+                return ""
+            return reader.pages[0].extract_text() or ""
+    except Exception as e:
+        logger.error(f"Erro ao ler a primeira página de {pdf_path}: {str(e)}")
+        return ""
+
+class DocumentDeduplicator:
+    """Detecta documentos repetidos em um lote antes da extração
+    
+    Duplicatas exatas são identificadas pelo hash do conteúdo do arquivo.
+    Opcionalmente, quase-duplicatas (ex.: o mesmo PDF salvo de novo com outros
+    metadados) são identificadas pelo SimHash do texto da primeira página; as
+    impressões são indexadas em faixas de bits, de modo que só os documentos
+    que compartilham uma faixa são comparados.
+    """
+    
+    def __init__(self, near_duplicates=False, max_distance=3, bits=64, bands=4):
+        self.near_duplicates = near_duplicates
+        self.max_distance = max_distance
+        self.bits = bits
+        self.bands = bands
+        self._band_bits = bits // bands
+        self._by_hash = {}
+        self._band_index = {}
+    
+    def _band_keys(self, fingerprint):
+        mask = (1 << self._band_bits) - 1
+        return [(band, fingerprint >> (band * self._band_bits) & mask) for band in range(self.bands)]
+    
+    def find_near_duplicate(self, fingerprint):
+        """Retorna o documento já visto mais parecido dentro de max_distance, ou None"""
+        best, best_distance = None, self.max_distance + 1
+        for key in self._band_keys(fingerprint):
+            for other_fingerprint, other_path in self._band_index.get(key, []):
+                distance = hamming_distance(fingerprint, other_fingerprint)
+                if distance < best_distance:
+                    best, best_distance = other_path, distance
+        return best
+    
+    def add_fingerprint(self, fingerprint, pdf_path):
+        """Indexa a impressão digital de um documento"""
+        for key in self._band_keys(fingerprint):
+            self._band_index.setdefault(key, []).append((fingerprint, pdf_path))
+    
+    def check(self, pdf_path):
+        """Classifica um arquivo como 'duplicate', 'near_duplicate' ou novo
+        
+        Retorna (tipo, arquivo_original); para arquivos novos, (None, None).
+        Arquivos que não são duplicatas exatas passam a ser referência para os
+        próximos.
+        """
+        content_hash = cached_hash_file(pdf_path)
+        original = self._by_hash.get(content_hash)
+        if original is not None:
+            return 'duplicate', original
+        self._by_hash[content_hash] = pdf_path
+        
+        if not self.near_duplicates:
+            return None, None
+        
+        fingerprint = simhash(first_page_text(pdf_path), self.bits)
+        if fingerprint is None:
+            return None, None
+        
+        original = self.find_near_duplicate(fingerprint)
+        self.add_fingerprint(fingerprint, pdf_path)
+        if original is not None:
+            return 'near_duplicate', original
+        return None, None
@@ -0,0 +1,313 @@
+import os
+import re
+import json
+import time
+import tempfile
+import requests
+import concurrent.futures
+from collections import deque
+from urllib.parse import urlparse, unquote
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Statuses worth retrying: rate limiting and transient server/proxy errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class PDFDownloader:
+    """Download PDFs over a shared HTTP session
+    
+    All direct downloads go through one requests.Session, so connections to
+    the same host are kept alive and reused from a per-host pool instead of
+    paying a new TCP/TLS handshake per file. Failed connections and the
+    statuses in RETRY_STATUSES are retried with exponential backoff.
+    
+    Bulk downloads (iter_downloads/download_many) run max_workers at a time,
+    with at most max_per_host against any single host.
+    """
+    
+    def __init__(self, download_dir, pool_connections=10, pool_maxsize=10, max_retries=3, backoff_factor=0.5,
+                 timeout=(10, 60), chunk_size=1024 * 1024, headers=None, max_workers=8, max_per_host=4):
+        self.download_dir = download_dir
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.headers = headers or {}
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self._session = None
+        os.makedirs(download_dir, exist_ok=True)
+    
+    @property
+    def session(self):
+        """Shared session, created on first use"""
+        if self._session is None:
+            self._session = self.create_session()
+        return self._session
+    
+    def create_session(self):
+        """Create a keep-alive session with pooled, retrying adapters"""
+        retry = Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=self.max_retries,
+            status=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        # pool_connections: hosts kept in the pool; pool_maxsize: connections kept per host
+        # (at least max_per_host, so concurrent downloads from one host are all kept)
+        adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                              pool_maxsize=max(self.pool_maxsize, self.max_per_host), max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({'Accept': 'application/pdf,*/*'})
+        session.headers.update(self.headers)
+        return session
+    
+    def close(self):
+        """Close the pooled connections"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    @staticmethod
+    def filename_from_response(url, response=None):
+        """Pick a file name from Content-Disposition or the URL path"""
+        filename = None
+        disposition = response.headers.get('Content-Disposition', '') if response is not None else ''
+        if isinstance(disposition, str):
+            match = re.search(r'filename\*?=(?:UTF-8\'\')?"?([^";]+)"?', disposition, re.IGNORECASE)
+            if match:
+                filename = unquote(match.group(1))
+        if not filename:
+            filename = unquote(os.path.basename(urlparse(url).path))
+        filename = os.path.basename(filename.replace('\\', '/')) or f"download_{int(time.time())}"
+        if not filename.lower().endswith('.pdf'):
+            filename += '.pdf'
+        return filename
+    
+    def reserve_path(self, filename):
+        """Atomically claim a free path for filename in the download directory
+        
+        Creates an empty placeholder (O_CREAT | O_EXCL), adding a numeric
+        suffix (name_1.pdf, name_2.pdf, ...) while the name is taken, so
+        concurrent downloads and files from earlier runs are never overwritten.
+        """
+        stem, ext = os.path.splitext(filename)
+        n = 0
+        while True:
+            candidate = os.path.join(self.download_dir, f"{stem}_{n}{ext}" if n else filename)
+            try:
+                os.close(os.open(candidate, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return candidate
+            except FileExistsError:
+                n += 1
+    
+    def download_pdf_direct(self, url, filename=None, progress_callback=None):
+        """Download a PDF from a direct URL
+        
+        The body is written to a temporary .part file. Once it is complete,
+        a free path for the file name (filename, Content-Disposition or the
+        URL) is claimed with reserve_path and the .part file is renamed over
+        it, so a partial download is never visible under the PDF name and
+        existing files are never overwritten. Returns the path of the saved
+        file, or None if the download failed.
+        """
+        part_path = None
+        file_path = None
+        try:
+            response = self.session.get(url, stream=True, timeout=self.timeout)
+            try:
+                response.raise_for_status()
+                
+                total = int(response.headers.get('Content-Length') or 0)
+                downloaded = 0
+                
+                name = filename or self.filename_from_response(url, response)
+                fd, part_path = tempfile.mkstemp(prefix=name + '.', suffix='.part', dir=self.download_dir)
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        if not chunk:
+                            continue
+                        f.write(chunk)
+                        downloaded += len(chunk)
+                        if progress_callback and total:
+                            progress_callback(int(downloaded * 100 / total))
+            finally:
+                # Returns the connection to the pool
+                response.close()
+            
+            # The name is only reserved once the body is complete
+            file_path = self.reserve_path(name)
+            os.replace(part_path, file_path)
+            part_path = None
+            
+            logger.info(f"Downloaded {url} to {file_path}")
+            return file_path
+        except Exception as e:
+            logger.error(f"Error downloading {url}: {str(e)}")
+            # Frees the reserved name
+            if file_path is not None and part_path is not None and os.path.exists(file_path):
+                os.remove(file_path)
+            return None
+        finally:
+            if part_path is not None and os.path.exists(part_path):
+                os.remove(part_path)
+    
+    @staticmethod
+    def load_manifest(manifest_path):
+        """Read a download manifest
+        
+        Either a JSON list (of URLs or of {"url": ..., "filename": ...}
+        objects, optionally under a "urls" key) or a text file with one URL
+        per line (blank lines and lines starting with # are ignored).
+        """
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        if manifest_path.lower().endswith('.json'):
+            entries = json.loads(content)
+            if isinstance(entries, dict):
+                entries = entries.get('urls', [])
+            return entries
+        
+        return [line.strip() for line in content.splitlines() if line.strip() and not line.strip().startswith('#')]
+    
+    @staticmethod
+    def _prepare_entries(urls):
+        """Normalize URLs/manifest entries into {'url': ..., 'filename': ...} dicts
+        
+        Colliding file names are resolved when each download reserves its
+        path (see reserve_path).
+        """
+        entries = []
+        for item in urls:
+            entry = {'url': item} if isinstance(item, str) else dict(item)
+            if entry.get('url'):
+                entries.append(entry)
+        return entries
+    
+    def iter_downloads(self, urls, max_workers=None, max_per_host=None, cancel_token=None):
+        """Download many URLs concurrently, yielding (url, file_path) as each download finishes
+        
+        urls may hold URLs or manifest entries (see load_manifest). At most
+        max_workers downloads run at once and at most max_per_host per host;
+        hosts are served round-robin so one slow portal does not hold up the
+        others. file_path is None for failed downloads. If cancel_token is
+        cancelled, no new downloads are started.
+        """
+        max_workers = max_workers or self.max_workers
+        max_per_host = max_per_host or self.max_per_host
+        
+        pending = {}
+        for entry in self._prepare_entries(urls):
+            pending.setdefault(urlparse(entry['url']).netloc.lower(), deque()).append(entry)
+        active = {}
+        futures = {}
+        
+        def cancelled():
+            return cancel_token is not None and cancel_token.cancelled
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            def submit_more():
+                submitted = True
+                while submitted and len(futures) < max_workers and not cancelled():
+                    submitted = False
+                    for host in list(pending):
+                        if len(futures) >= max_workers:
+                            break
+                        if active.get(host, 0) >= max_per_host:
+                            continue
+                        entry = pending[host].popleft()
+                        if not pending[host]:
+                            del pending[host]
+                        active[host] = active.get(host, 0) + 1
+                        future = executor.submit(self.download_pdf_direct, entry['url'], entry.get('filename'))
+                        futures[future] = (host, entry['url'])
+                        submitted = True
+            
+            submit_more()
+            while futures:
+                done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    host, url = futures.pop(future)
+                    active[host] -= 1
+                    try:
+                        file_path = future.result()
+                    except Exception as e:
+                        logger.error(f"Error downloading {url}: {str(e)}")
+                        file_path = None
+                    yield url, file_path
+                submit_more()
+    
+    def download_many(self, urls, max_workers=None, max_per_host=None, cancel_token=None):
+        """Download many URLs concurrently; returns {url: file_path or None}"""
+        return dict(self.iter_downloads(urls, max_workers, max_per_host, cancel_token))
+    
+    def download_pdf_with_selenium(self, url, download_button_xpath=None, wait_time=30):
+        """Download a PDF that is only reachable through a browser (e.g. behind a button)
+        
+        Returns the path of the downloaded file, or None if nothing was downloaded.
+        """
+        from selenium import webdriver
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.chrome.service import Service
+        from webdriver_manager.chrome import ChromeDriverManager
+        
+        download_dir = os.path.abspath(self.download_dir)
+        options = webdriver.ChromeOptions()
+        options.add_argument('--headless=new')
+        options.add_experimental_option('prefs', {
+            'download.default_directory': download_dir,
+            'download.prompt_for_download': False,
+            'plugins.always_open_pdf_externally': True
+        })
+        
+        existing = set(os.listdir(download_dir))
+        started = time.time()
+        driver = None
+        try:
+            driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+            driver.get(url)
+            if download_button_xpath:
+                driver.find_element(By.XPATH, download_button_xpath).click()
+            
+            # Wait for a finished PDF (Chrome writes .crdownload files while downloading)
+            deadline = time.time() + wait_time
+            while True:
+                candidates = [
+                    os.path.join(download_dir, name) for name in os.listdir(download_dir)
+                    if name.lower().endswith('.pdf')
+                    and (name not in existing or os.path.getmtime(os.path.join(download_dir, name)) >= started)
+                ]
+                in_progress = any(name.endswith('.crdownload') for name in os.listdir(download_dir))
+                if candidates and not in_progress:
+                    file_path = max(candidates, key=os.path.getmtime)
+                    logger.info(f"Downloaded {url} to {file_path} using Selenium")
+                    return file_path
+                if time.time() >= deadline:
+                    logger.error(f"Timed out waiting for the download from {url}")
+                    return None
+                time.sleep(0.5)
+        except Exception as e:
+            logger.error(f"Error downloading {url} with Selenium: {str(e)}")
+            return None
+        finally:
+            if driver is not None:
+                driver.quit()
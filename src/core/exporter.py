@@ -1,15 +1,218 @@
 import pandas as pd
+import numpy as np
 import os
+import io
 import json
+import gzip
 import sqlite3
+import uuid
+import threading
+from datetime import date
 from sqlalchemy import create_engine
 from ..utils.logger import get_logger
 
+try:
+    import zstandard
+except ImportError:  # zstd compression is optional
+    zstandard = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import pyarrow.feather as feather
+except ImportError:  # Parquet/Feather export is optional
+    pa = None
+
 logger = get_logger(__name__)
 
+# Engines are expensive to build (each owns a connection pool), so they are
+# shared by connection string across exports and DataExporter instances
+_engine_cache = {}
+_engine_lock = threading.Lock()
+
+
+def _json_default(value):
+    """Convert numpy/pandas scalars that json can't serialize natively"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, pd.Timedelta)):
+        return value.isoformat()
+    if value is pd.NaT:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def _clean_value(value):
+    """Map missing values (NaN of any float type, NaT, pd.NA) to None and numpy scalars to Python ones"""
+    if pd.api.types.is_scalar(value) and pd.isna(value):
+        return None
+    if isinstance(value, np.datetime64):
+        return pd.Timestamp(value)
+    if isinstance(value, np.timedelta64):
+        return pd.Timedelta(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _sheet_title(name):
+    """Make a valid Excel sheet title (no []:*?/\\, at most 31 characters)"""
+    for char in '[]:*?/\\':
+        name = name.replace(char, '_')
+    return name[:31] or 'Sheet'
+
+
+class StreamingExcelWriter:
+    """Writes extracted data to one .xlsx workbook with constant memory
+    
+    Uses openpyxl's write-only mode, which streams rows to disk as they are
+    appended. Tables longer than Excel's row limit continue on extra sheets.
+    Page text goes to a shared 'pages' sheet with one row per line. Several
+    documents can be written to the same workbook; write() is thread-safe so
+    batch workers can share one writer.
+    
+    Every write-only sheet holds an open temporary file until the workbook
+    is saved, so once a workbook has max_sheets sheets it is saved and the
+    next document starts a new part (name_2.xlsx, name_3.xlsx, ...);
+    document_paths maps each document to the part holding it.
+    
+    Nothing is on disk until a part is saved (on rollover or close()).
+    on_commit, if set, is then called with the paths of the documents in
+    that part; if saving fails they are recorded in failed_documents instead.
+    """
+    
+    MAX_ROWS = 1048576
+    MAX_CELL_CHARS = 32767
+    
+    def __init__(self, file_path, chunksize=5000, on_commit=None, max_sheets=200):
+        self.file_path = file_path
+        self.chunksize = chunksize
+        self.on_commit = on_commit
+        self.max_sheets = max_sheets
+        self.failed_documents = {}
+        self.document_paths = {}
+        self.part_paths = []
+        self._lock = threading.Lock()
+        self._new_workbook()
+    
+    def _new_workbook(self):
+        from openpyxl import Workbook
+        
+        stem, ext = os.path.splitext(self.file_path)
+        self.part_path = f"{stem}_{len(self.part_paths) + 1}{ext}" if self.part_paths else self.file_path
+        self.part_paths.append(self.part_path)
+        self.workbook = Workbook(write_only=True)
+        self._documents = []
+        self._titles = set()
+        self._pages_sheet = None
+        self._pages_rows = 0
+    
+    def _save_part(self):
+        """Save the current workbook and confirm its documents"""
+        if not self.workbook.worksheets:
+            self.workbook.create_sheet('empty')
+        try:
+            self.workbook.save(self.part_path)
+        except Exception as e:
+            for document in self._documents:
+                self.failed_documents[document] = str(e)
+            raise
+        logger.info(f"Data exported successfully to Excel: {self.part_path}")
+        if self.on_commit is not None and self._documents:
+            self.on_commit(list(self._documents))
+    
+    def _rollover(self):
+        """Save the current part and start a new workbook"""
+        try:
+            self._save_part()
+        except Exception as e:
+            logger.error(f"Error saving Excel workbook {self.part_path}: {str(e)}")
+        self._new_workbook()
+    
+    def _new_sheet(self, name, header):
+        base = _sheet_title(name)
+        title, n = base, 2
+        while title.lower() in self._titles:
+            suffix = f"~{n}"
+            title = base[:31 - len(suffix)] + suffix
+            n += 1
+        self._titles.add(title.lower())
+        sheet = self.workbook.create_sheet(title)
+        sheet.append(header)
+        return sheet
+    
+    def add_dataframe(self, df, sheet_name):
+        """Stream a DataFrame into one or more sheets"""
+        header = [str(col) for col in df.columns]
+        sheet = self._new_sheet(sheet_name, header)
+        rows_in_sheet = 1
+        for start in range(0, len(df), self.chunksize):
+            chunk = df.iloc[start:start + self.chunksize]
+            for row in chunk.itertuples(index=False, name=None):
+                if rows_in_sheet >= self.MAX_ROWS:
+                    sheet = self._new_sheet(sheet_name, header)
+                    rows_in_sheet = 1
+                sheet.append([_clean_value(value) for value in row])
+                rows_in_sheet += 1
+    
+    def add_text(self, text, document, page):
+        """Append page text to the 'pages' sheet, one row per line"""
+        header = ['document', 'page', 'line', 'text']
+        if self._pages_sheet is None:
+            self._pages_sheet = self._new_sheet('pages', header)
+            self._pages_rows = 1
+        for line_no, line in enumerate(text.splitlines(), start=1):
+            for start in range(0, max(len(line), 1), self.MAX_CELL_CHARS):
+                if self._pages_rows >= self.MAX_ROWS:
+                    self._pages_sheet = self._new_sheet('pages', header)
+                    self._pages_rows = 1
+                self._pages_sheet.append([document, page, line_no, line[start:start + self.MAX_CELL_CHARS]])
+                self._pages_rows += 1
+    
+    def write(self, document, data, doc_type=None, confidence=None):
+        """Add one document's extracted data to the workbook; returns the part's path"""
+        if isinstance(data, pd.DataFrame):
+            data = {'table_1': data}
+        elif isinstance(data, str):
+            data = {'page_1': data}
+        
+        prefix = f"{os.path.splitext(os.path.basename(document))[0]}_" if document else ''
+        with self._lock:
+            # A document is never split across parts
+            if self._documents and len(self.workbook.worksheets) >= self.max_sheets:
+                self._rollover()
+            for key, value in data.items():
+                if isinstance(value, pd.DataFrame):
+                    self.add_dataframe(value, f"{prefix}{key}")
+                elif isinstance(value, str):
+                    self.add_text(value, os.path.basename(document) if document else '', key)
+            if document:
+                self._documents.append(document)
+                self.document_paths[document] = self.part_path
+            return self.part_path
+    
+    def close(self):
+        """Save the last workbook"""
+        with self._lock:
+            self._save_part()
+
+
+def get_engine(connection_string):
+    """Return a cached SQLAlchemy engine, one connection pool per database"""
+    with _engine_lock:
+        engine = _engine_cache.get(connection_string)
+        if engine is None:
+            engine = create_engine(connection_string, pool_pre_ping=True)
+            _engine_cache[connection_string] = engine
+        return engine
+
+
 class DataExporter:
-    def __init__(self, export_dir):
+    def __init__(self, export_dir, sql_chunksize=1000):
         self.export_dir = export_dir
+        self.sql_chunksize = sql_chunksize
         os.makedirs(export_dir, exist_ok=True)
     
     def export_to_csv(self, data, filename, structured=False):
@@ -49,21 +252,26 @@ class DataExporter:
             logger.error(f"Error exporting data to CSV: {str(e)}")
             return None
     
-    def export_to_json(self, data, filename):
+    def export_to_json(self, data, filename, compact=False):
         """Export extracted data to JSON"""
         try:
             file_path = os.path.join(self.export_dir, filename)
             
-            # Convert DataFrames to dict for JSON serialization
+            # Convert DataFrames to dict for JSON serialization (on a copy,
+            # the caller's data must stay untouched)
             if isinstance(data, dict):
-                for key, value in data.items():
-                    if isinstance(value, pd.DataFrame):
-                        data[key] = value.to_dict(orient='records')
+                data = {
+                    key: value.to_dict(orient='records') if isinstance(value, pd.DataFrame) else value
+                    for key, value in data.items()
+                }
             elif isinstance(data, pd.DataFrame):
                 data = data.to_dict(orient='records')
             
             with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=4)
+                if compact:
+                    json.dump(data, f, ensure_ascii=False, separators=(',', ':'), default=_json_default)
+                else:
+                    json.dump(data, f, ensure_ascii=False, indent=4, default=_json_default)
             
             logger.info(f"Data exported successfully to {file_path}")
             return file_path
@@ -71,21 +279,235 @@ class DataExporter:
             logger.error(f"Error exporting data to JSON: {str(e)}")
             return None
     
-    def export_to_sql(self, data, filename, connection_string=None):
-        """Export extracted data to SQLite or other SQL database"""
+    def _open_text_stream(self, file_path, compression=None):
+        """Open a text file for writing, optionally gzip/zstd compressed"""
+        if compression is None:
+            return open(file_path, 'w', encoding='utf-8', newline='\n')
+        if compression == 'gzip':
+            return gzip.open(file_path, 'wt', encoding='utf-8', newline='\n', compresslevel=6)
+        if compression == 'zstd':
+            if zstandard is None:
+                raise ImportError("zstd compression requires the 'zstandard' package")
+            raw = open(file_path, 'wb')
+            writer = zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=True)
+            return io.TextIOWrapper(writer, encoding='utf-8', newline='\n')
+        raise ValueError(f"Unsupported compression: {compression}")
+    
+    def _iter_ndjson_lines(self, data, chunksize):
+        """Yield NDJSON lines: one per DataFrame row and one per page of text"""
+        if isinstance(data, pd.DataFrame):
+            data = {None: data}
+        elif isinstance(data, str):
+            data = {None: data}
+        
+        for key, value in data.items():
+            if isinstance(value, pd.DataFrame):
+                columns = [str(col) for col in value.columns]
+                # Iterate in chunks so only one slice of rows is converted at a time
+                for start in range(0, len(value), chunksize):
+                    chunk = value.iloc[start:start + chunksize]
+                    for row in chunk.itertuples(index=False, name=None):
+                        record = dict(zip(columns, map(_clean_value, row)))
+                        if key is not None:
+                            record = {'_source': key, **record}
+                        yield json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=_json_default)
+            else:
+                record = {'content': value}
+                if key is not None:
+                    record = {'_source': key, **record}
+                yield json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=_json_default)
+    
+    def export_to_ndjson(self, data, filename, compression=None, chunksize=10000):
+        """Export extracted data to newline-delimited JSON, streaming row by row"""
+        try:
+            file_path = os.path.join(self.export_dir, filename)
+            if compression == 'gzip' and not file_path.endswith('.gz'):
+                file_path += '.gz'
+            elif compression == 'zstd' and not file_path.endswith('.zst'):
+                file_path += '.zst'
+            
+            with self._open_text_stream(file_path, compression) as f:
+                for line in self._iter_ndjson_lines(data, chunksize):
+                    f.write(line)
+                    f.write('\n')
+            
+            logger.info(f"Data exported successfully to {file_path}")
+            return file_path
+        except Exception as e:
+            logger.error(f"Error exporting data to NDJSON: {str(e)}")
+            return None
+    
+    def _to_columnar_frames(self, data, document):
+        """Split extracted data into a pages frame and a long-format tables frame
+        
+        Tables from different documents have different columns, so they are
+        stored as (document, table, row, column, value) to keep one schema
+        per dataset. Repeated strings become categoricals, which Arrow writes
+        with dictionary encoding.
+        """
+        if isinstance(data, pd.DataFrame):
+            data = {'table_1': data}
+        elif isinstance(data, str):
+            data = {'page_1': data}
+        
+        page_rows = []
+        table_frames = []
+        for key, value in data.items():
+            if key == '_metadata':
+                continue
+            if isinstance(value, pd.DataFrame):
+                n_rows, n_cols = value.shape
+                if n_rows == 0 or n_cols == 0:
+                    continue
+                table_frames.append(pd.DataFrame({
+                    'table': key,
+                    'row': np.repeat(np.arange(n_rows, dtype='int32'), n_cols),
+                    'column': np.tile(np.array([str(c) for c in value.columns], dtype=object), n_rows),
+                    'value': pd.Series(value.to_numpy(dtype=object).ravel()).astype('string'),
+                }))
+            elif isinstance(value, str):
+                page_rows.append({'page': key, 'content': value})
+        
+        pages = pd.DataFrame(page_rows, columns=['page', 'content'])
+        if table_frames:
+            tables = pd.concat(table_frames, ignore_index=True)
+        else:
+            tables = pd.DataFrame(columns=['table', 'row', 'column', 'value'])
+        
+        pages.insert(0, 'document', document)
+        tables.insert(0, 'document', document)
+        for frame, columns in ((pages, ['document', 'page']), (tables, ['document', 'table', 'column'])):
+            for column in columns:
+                frame[column] = frame[column].astype('category')
+        return pages, tables
+    
+    def export_to_parquet(self, data, filename, doc_type=None, partitioned=True, compression='zstd'):
+        """Export extracted data to Parquet
+        
+        With partitioned=True, pages and tables are appended to datasets under
+        <export_dir>/parquet/{pages,tables}/doc_type=<type>/date=<YYYY-MM-DD>/,
+        so a batch adds new files instead of rewriting existing ones.
+        """
         try:
+            if pa is None:
+                raise ImportError("Parquet export requires the 'pyarrow' package")
+            
+            document = os.path.splitext(os.path.basename(filename))[0]
+            pages, tables = self._to_columnar_frames(data, document)
+            
+            if partitioned:
+                root = os.path.join(self.export_dir, 'parquet')
+                for name, frame in (('pages', pages), ('tables', tables)):
+                    if frame.empty:
+                        continue
+                    frame = frame.assign(doc_type=doc_type or 'unknown', date=date.today().isoformat())
+                    pq.write_to_dataset(
+                        pa.Table.from_pandas(frame, preserve_index=False),
+                        os.path.join(root, name),
+                        partition_cols=['doc_type', 'date'],
+                        basename_template=f"{document}-{uuid.uuid4().hex}-{{i}}.parquet",
+                        existing_data_behavior='overwrite_or_ignore',
+                        compression=compression,
+                        use_dictionary=True
+                    )
+                result = root
+            else:
+                name, _ = os.path.splitext(os.path.join(self.export_dir, filename))
+                for suffix, frame in (('pages', pages), ('tables', tables)):
+                    if not frame.empty:
+                        pq.write_table(
+                            pa.Table.from_pandas(frame, preserve_index=False),
+                            f"{name}_{suffix}.parquet",
+                            compression=compression,
+                            use_dictionary=True
+                        )
+                result = f"{name}_tables.parquet" if not tables.empty else f"{name}_pages.parquet"
+            
+            logger.info(f"Data exported successfully to Parquet: {result}")
+            return result
+        except Exception as e:
+            logger.error(f"Error exporting data to Parquet: {str(e)}")
+            return None
+    
+    def export_to_feather(self, data, filename, compression='zstd'):
+        """Export extracted data to Arrow IPC (Feather v2) files"""
+        try:
+            if pa is None:
+                raise ImportError("Feather export requires the 'pyarrow' package")
+            
+            name, _ = os.path.splitext(os.path.join(self.export_dir, filename))
+            if isinstance(data, pd.DataFrame):
+                data = {'table_1': data}
+            elif isinstance(data, str):
+                data = {'page_1': data}
+            
+            written = []
+            page_rows = []
+            for key, value in data.items():
+                if isinstance(value, pd.DataFrame):
+                    # Feather requires string column names and a default index
+                    df = value.reset_index(drop=True)
+                    df.columns = [str(col) for col in df.columns]
+                    path = f"{name}_{key}.feather"
+                    feather.write_feather(df, path, compression=compression)
+                    written.append(path)
+                elif isinstance(value, str):
+                    page_rows.append({'page': key, 'content': value})
+            
+            if page_rows:
+                path = f"{name}_pages.feather"
+                feather.write_feather(pd.DataFrame(page_rows), path, compression=compression)
+                written.append(path)
+            
+            logger.info(f"Data exported successfully to Feather: {', '.join(written)}")
+            return written[0] if written else None
+        except Exception as e:
+            logger.error(f"Error exporting data to Feather: {str(e)}")
+            return None
+    
+    def _tables_for_sql(self, data, table_name):
+        """Map target table names to DataFrames for SQL export"""
+        if isinstance(data, pd.DataFrame):
+            return {table_name: data}
+        if isinstance(data, dict):
+            return {
+                f"{table_name}_{key}": df
+                for key, df in data.items()
+                if isinstance(df, pd.DataFrame)
+            }
+        return {}
+    
+    def export_to_sql(self, data, filename, connection_string=None, document_id=None,
+                      table_name=None, if_exists='append', chunksize=None):
+        """Export extracted data to SQLite or other SQL database
+        
+        Rows are appended with a document_id column, so several documents can
+        share the same tables. Pass table_name to use a fixed table name
+        instead of one derived from the filename.
+        """
+        try:
+            base_name = os.path.splitext(os.path.basename(filename))[0]
+            document_id = document_id or base_name
+            table_name = table_name or base_name
+            chunksize = chunksize or self.sql_chunksize
+            
+            tables = {
+                name: df.assign(document_id=document_id)
+                for name, df in self._tables_for_sql(data, table_name).items()
+            }
+            
             # Determine if we're using SQLite or another database
             if connection_string:
-                # Use SQLAlchemy for other databases
-                engine = create_engine(connection_string)
-                table_name = os.path.splitext(filename)[0]
+                # Use SQLAlchemy for other databases, reusing the cached engine
+                engine = get_engine(connection_string)
+                # Multi-row INSERTs are much faster than row-by-row on client/server
+                # databases; SQLite keeps executemany because of its variable limit
+                method = None if engine.dialect.name == 'sqlite' else 'multi'
                 
-                if isinstance(data, pd.DataFrame):
-                    data.to_sql(table_name, engine, if_exists='replace', index=False)
-                elif isinstance(data, dict):
-                    for key, df in data.items():
-                        if isinstance(df, pd.DataFrame):
-                            df.to_sql(f"{table_name}_{key}", engine, if_exists='replace', index=False)
+                with engine.begin() as conn:
+                    for name, df in tables.items():
+                        df.to_sql(name, conn, if_exists=if_exists, index=False,
+                                  chunksize=chunksize, method=method)
                 
                 logger.info(f"Data exported successfully to SQL database")
                 return connection_string
@@ -94,17 +516,12 @@ class DataExporter:
                 db_path = os.path.join(self.export_dir, filename.replace('.sql', '.db'))
                 conn = sqlite3.connect(db_path)
                 
-                if isinstance(data, pd.DataFrame):
-                    table_name = os.path.splitext(os.path.basename(filename))[0]
-                    data.to_sql(table_name, conn, if_exists='replace', index=False)
-                elif isinstance(data, dict):
-                    for key, df in data.items():
-                        if isinstance(df, pd.DataFrame):
-                            table_name = f"{os.path.splitext(os.path.basename(filename))[0]}_{key}"
-                            df.to_sql(table_name, conn, if_exists='replace', index=False)
-                
-                conn.commit()
-                conn.close()
+                try:
+                    for name, df in tables.items():
+                        df.to_sql(name, conn, if_exists=if_exists, index=False, chunksize=chunksize)
+                    conn.commit()
+                finally:
+                    conn.close()
                 
                 logger.info(f"Data exported successfully to SQLite database: {db_path}")
                 return db_path
@@ -112,13 +529,24 @@ class DataExporter:
             logger.error(f"Error exporting data to SQL: {str(e)}")
             return None
     
-    def export_to_excel(self, data, filename):
-        """Export extracted data to Excel"""
+    def export_to_excel(self, data, filename, streaming=False):
+        """Export extracted data to Excel
+        
+        With streaming=True rows are written through a write-only workbook in
+        chunks (see StreamingExcelWriter), keeping memory flat for large tables.
+        """
         try:
             file_path = os.path.join(self.export_dir, filename)
             if not file_path.endswith('.xlsx'):
                 file_path += '.xlsx'
             
+            if streaming:
+                # close() logs the export
+                writer = StreamingExcelWriter(file_path)
+                writer.write(None, data)
+                writer.close()
+                return file_path
+            
             if isinstance(data, pd.DataFrame):
                 data.to_excel(file_path, index=False)
             elif isinstance(data, dict):
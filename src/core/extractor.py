@@ -9,7 +9,9 @@ from pdf2image import convert_from_path
 import cv2
 import numpy as np
 import json
+import time
 from ..utils.logger import get_logger
+from ..utils.timing import StageTimer
 from ..utils.language_detector import LanguageDetector
 
 logger = get_logger(__name__)
@@ -38,10 +40,13 @@ class PDFExtractor:
     def extract_text(self, pdf_path, pages='all', template=None):
         """Extract text from PDF using PyPDF2 and pdfplumber"""
         try:
+            timer = StageTimer()
+            
             # Use PyPDF2 for basic text extraction
             with open(pdf_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                num_pages = len(reader.pages)
+                with timer.stage('open'):
+                    reader = PyPDF2.PdfReader(file)
+                    num_pages = len(reader.pages)
                 
                 if pages == 'all':
                     pages = range(num_pages)
@@ -53,40 +58,47 @@ class PDFExtractor:
                 extracted_data = {}
                 
                 # Use pdfplumber for more accurate text extraction
+                open_start = time.perf_counter()
                 with pdfplumber.open(pdf_path) as pdf:
-                    # Amostra para detecção de idioma
-                    sample_text = ""
-                    for i, page_num in enumerate(pages):
-                        if i >= 3:  # Limita a 3 páginas para a amostra
-                            break
-                        if page_num < num_pages:
-                            page = pdf.pages[page_num]
-                            sample_text += page.extract_text() or ""
+                    timer.add('open', time.perf_counter() - open_start)
                     
-                    # Detecta o idioma do documento
-                    lang_code = "unknown"
-                    if sample_text:
-                        lang_code = self.language_detector.detect_language(sample_text)
-                        logger.info(f"Idioma detectado: {lang_code} ({self.language_detector.get_language_name(lang_code)})")
+                    # Amostra para detecção de idioma
+                    with timer.stage('language'):
+                        sample_text = ""
+                        for i, page_num in enumerate(pages):
+                            if i >= 3:  # Limita a 3 páginas para a amostra
+                                break
+                            if page_num < num_pages:
+                                page = pdf.pages[page_num]
+                                sample_text += page.extract_text() or ""
+                        
+                        # Detecta o idioma do documento
+                        lang_code = "unknown"
+                        if sample_text:
+                            lang_code = self.language_detector.detect_language(sample_text)
+                            logger.info(f"Idioma detectado: {lang_code} ({self.language_detector.get_language_name(lang_code)})")
                     
                     # Extrai texto de todas as páginas solicitadas
-                    for page_num in pages:
-                        if page_num < num_pages:
-                            page = pdf.pages[page_num]
-                            page_text = page.extract_text() or ""
-                            
-                            # Pré-processa o texto de acordo com o idioma
-                            if page_text:
-                                page_text = self.language_detector.preprocess_for_language(page_text, lang_code)
-                            
-                            extracted_data[f'page_{page_num+1}'] = page_text
+                    with timer.stage('text'):
+                        for page_num in pages:
+                            if page_num < num_pages:
+                                page = pdf.pages[page_num]
+                                page_text = page.extract_text() or ""
+                                
+                                # Pré-processa o texto de acordo com o idioma
+                                if page_text:
+                                    page_text = self.language_detector.preprocess_for_language(page_text, lang_code)
+                                
+                                extracted_data[f'page_{page_num+1}'] = page_text
                 
                 # Adiciona metadados
                 extracted_data['_metadata'] = {
                     'language': lang_code,
                     'language_name': self.language_detector.get_language_name(lang_code),
                     'num_pages': num_pages,
-                    'extraction_method': 'text'
+                    'extraction_method': 'text',
+                    'pages_processed': len(extracted_data),
+                    'timings': timer.timings
                 }
                 
                 return extracted_data
@@ -97,23 +109,38 @@ class PDFExtractor:
     def extract_tables(self, pdf_path, pages='all', template=None):
         """Extract tables from PDF using camelot and tabula"""
         try:
+            timer = StageTimer()
+            
             # Detecta o idioma para processamento específico
             sample_text = ""
             with open(pdf_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                for i in range(min(3, len(reader.pages))):
-                    sample_text += reader.pages[i].extract_text() or ""
+                with timer.stage('open'):
+                    reader = PyPDF2.PdfReader(file)
+                with timer.stage('language'):
+                    for i in range(min(3, len(reader.pages))):
+                        sample_text += reader.pages[i].extract_text() or ""
             
             lang_code = "unknown"
             if sample_text:
-                lang_code = self.language_detector.detect_language(sample_text)
+                with timer.stage('language'):
+                    lang_code = self.language_detector.detect_language(sample_text)
             
-            # Try camelot first (better for complex tables)
-            tables = camelot.read_pdf(pdf_path, pages=pages, flavor='lattice')
+            # camelot/tabula take 1-based page numbers
+            if isinstance(pages, int):
+                pages = [pages]
+            if isinstance(pages, (list, range)):
+                camelot_pages = ','.join(str(p + 1) for p in pages)
+                tabula_pages = [p + 1 for p in pages]
+            else:
+                camelot_pages = tabula_pages = pages
             
-            if len(tables) == 0:
-                # If camelot fails, try tabula
-                tables = tabula.read_pdf(pdf_path, pages=pages, multiple_tables=True)
+            with timer.stage('tables'):
+                # Try camelot first (better for complex tables)
+                tables = camelot.read_pdf(pdf_path, pages=camelot_pages, flavor='lattice')
+                
+                if len(tables) == 0:
+                    # If camelot fails, try tabula
+                    tables = tabula.read_pdf(pdf_path, pages=tabula_pages, multiple_tables=True)
             
             extracted_tables = {}
             for i, table in enumerate(tables):
@@ -134,7 +161,9 @@ class PDFExtractor:
                 'language': lang_code,
                 'language_name': self.language_detector.get_language_name(lang_code),
                 'num_tables': len(tables),
-                'extraction_method': 'tables'
+                'extraction_method': 'tables',
+                'pages_processed': len(pages) if isinstance(pages, (list, range)) else len(reader.pages),
+                'timings': timer.timings
             }
             
             return extracted_tables
@@ -142,27 +171,49 @@ class PDFExtractor:
             logger.error(f"Error extracting tables from PDF: {str(e)}")
             return None
     
+    @staticmethod
+    def page_runs(pages):
+        """Group 0-based page numbers into contiguous (first, last) runs"""
+        runs = []
+        for page in sorted(set(pages)):
+            if runs and page == runs[-1][1] + 1:
+                runs[-1][1] = page
+            else:
+                runs.append([page, page])
+        return [tuple(run) for run in runs]
+    
     def extract_with_ocr(self, pdf_path, pages='all', template=None):
         """Extract text using OCR for scanned PDFs"""
         try:
-            images = convert_from_path(pdf_path)
+            if isinstance(pages, int):
+                pages = [pages]
+            elif isinstance(pages, str) and pages != 'all':
+                pages = [int(p) for p in pages.split(',')]
+            
+            timer = StageTimer()
             
             if pages == 'all':
+                with timer.stage('rasterize'):
+                    images = dict(enumerate(convert_from_path(pdf_path)))
                 pages = range(len(images))
-            elif isinstance(pages, int):
-                pages = [pages]
-            elif isinstance(pages, str):
-                pages = [int(p) for p in pages.split(',')]
+            else:
+                # Rasterize only the requested pages, one contiguous run at a time
+                images = {}
+                with timer.stage('rasterize'):
+                    for first_page, last_page in self.page_runs(pages):
+                        run = convert_from_path(pdf_path, first_page=first_page + 1, last_page=last_page + 1)
+                        images.update(zip(range(first_page, last_page + 1), run))
             
             extracted_data = {}
             
             # Amostra para detecção de idioma
             sample_img = None
             if len(images) > 0:
-                sample_img = images[0]
+                sample_img = next(iter(images.values()))
             
             # Detecta o idioma para configurar o OCR
             lang_code = "eng"  # Padrão para inglês
+            language_start = time.perf_counter()
             if sample_img:
                 # Converte para OpenCV
                 img = cv2.cvtColor(np.array(sample_img), cv2.COLOR_RGB2BGR)
@@ -191,10 +242,13 @@ class PDFExtractor:
                     }
                     lang_code = tesseract_lang_map.get(detected_lang, 'eng')
             
+            timer.add('language', time.perf_counter() - language_start)
             logger.info(f"Usando idioma para OCR: {lang_code}")
             
-            for i, page_num in enumerate(pages):
-                if page_num < len(images):
+            for page_num in pages:
+                if page_num in images:
+                    page_start = time.perf_counter()
+                    
                     # Convert to OpenCV format
                     img = cv2.cvtColor(np.array(images[page_num]), cv2.COLOR_RGB2BGR)
                     
@@ -210,12 +264,18 @@ class PDFExtractor:
                         text = self.language_detector.preprocess_for_language(text, lang_code.split('_')[0])
                     
                     extracted_data[f'page_{page_num+1}'] = text
+                    
+                    # Tempo de OCR de cada página
+                    timer.add('ocr', time.perf_counter() - page_start, sample=True)
             
             # Adiciona metadados
             extracted_data['_metadata'] = {
                 'language': lang_code,
                 'num_pages': len(images),
-                'extraction_method': 'ocr'
+                'extraction_method': 'ocr',
+                'pages_processed': len(extracted_data),
+                'timings': timer.timings,
+                'ocr_page_times': timer.samples.get('ocr', [])
             }
             
             return extracted_data
@@ -0,0 +1,192 @@
+import re
+import time
+from .scheduler import METHOD_WEIGHTS
+from .isolation import DocumentTimeout
+from .cancellation import BatchCancelled
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Cadeia usada no modo automático quando fallback_chain não está configurada
+DEFAULT_FALLBACK_CHAIN = ['text', 'ocr', 'tables']
+
+_PAGE_KEY = re.compile(r'^page_(\d+)$')
+
+def page_number(key):
+    """Número (base 1) de uma chave page_N, ou None"""
+    match = _PAGE_KEY.match(key)
+    return int(match.group(1)) if match else None
+
+def is_empty_text(value, min_chars=20):
+    """Indica se o texto de uma página tem menos de min_chars caracteres úteis"""
+    return not isinstance(value, str) or len(value.strip()) < min_chars
+
+def empty_pages(data, min_chars=20):
+    """Páginas (base 0) cujo texto extraído tem menos de min_chars caracteres"""
+    return sorted(page_number(key) - 1 for key, value in data.items()
+                  if page_number(key) is not None and is_empty_text(value, min_chars))
+
+def template_needs_tables(template):
+    """Indica se o template descreve tabelas a extrair"""
+    return bool(template) and bool(template.get('tables'))
+
+class FallbackChain:
+    """Extrai um documento tentando uma sequência de métodos
+    
+    O primeiro método extrai o documento inteiro. O OCR é aplicado apenas às
+    páginas que ficaram vazias nas etapas anteriores, e as tabelas só são
+    extraídas se o template pedir tabelas ou se nada tiver sido extraído
+    até então; nenhuma página já preenchida é processada de novo.
+    
+    O orçamento por documento limita o tempo (budget_seconds) e o custo
+    estimado (budget_cost, em páginas ponderadas por METHOD_WEIGHTS): as
+    etapas que não couberem são puladas e, no OCR, apenas as primeiras
+    páginas que couberem são processadas. O método que produziu cada página
+    fica em _metadata['page_methods'].
+    """
+    
+    def __init__(self, methods=None, budget_seconds=None, budget_cost=None, min_chars=20):
+        self.methods = list(methods or DEFAULT_FALLBACK_CHAIN)
+        self.budget_seconds = budget_seconds
+        self.budget_cost = budget_cost
+        self.min_chars = min_chars
+    
+    def _affordable_pages(self, method, requested, spent_cost, start):
+        """Quantas das páginas pedidas cabem no que resta do orçamento"""
+        if self.budget_seconds is not None and time.monotonic() - start >= self.budget_seconds:
+            return 0
+        if self.budget_cost is None:
+            return requested
+        weight = METHOD_WEIGHTS.get(method, 1.0)
+        return max(0, min(requested, int((self.budget_cost - spent_cost) // weight)))
+    
+    def extract(self, pdf_path, extract_fn, template=None, num_pages=None):
+        """Executa a cadeia; extract_fn(pdf_path, method, pages, template) extrai uma etapa
+        
+        pages é 'all' ou uma lista de páginas (base 0). Retorna os dados
+        combinados, ou None se nenhuma etapa produziu dados.
+        """
+        start = time.monotonic()
+        merged = {}
+        page_methods = {}
+        steps = []
+        skipped_pages = []
+        budget_exhausted = False
+        spent_cost = 0.0
+        metadata = {}
+        timings = {}
+        pages_processed = 0
+        ocr_page_times = []
+        table_count = 0
+        
+        for method in self.methods:
+            text_pages = [key for key in merged if page_number(key) is not None]
+            
+            # Decide o que esta etapa precisa processar
+            if method == 'tables':
+                has_data = any(not is_empty_text(merged[key], self.min_chars) for key in text_pages)
+                if table_count or (has_data and not template_needs_tables(template)):
+                    continue
+                pages = 'all'
+            elif not text_pages:
+                pages = 'all'
+            else:
+                pages = empty_pages(merged, self.min_chars)
+                if not pages:
+                    continue
+            
+            # Aplica o orçamento (documento inteiro conta como num_pages páginas)
+            page_count = num_pages or len(text_pages) or 1
+            requested = page_count if pages == 'all' else len(pages)
+            affordable = self._affordable_pages(method, requested, spent_cost, start)
+            if affordable == 0:
+                budget_exhausted = True
+                if pages != 'all':
+                    skipped_pages.extend(pages)
+                logger.info(f"Orçamento do documento esgotado antes da etapa '{method}' em {pdf_path}")
+                continue
+            if affordable < requested:
+                budget_exhausted = True
+                if pages == 'all':
+                    pages = list(range(affordable))
+                else:
+                    skipped_pages.extend(pages[affordable:])
+                    pages = pages[:affordable]
+            
+            step_start = time.monotonic()
+            try:
+                data = extract_fn(pdf_path, method, pages, template)
+            except (DocumentTimeout, BatchCancelled):
+                raise
+            except Exception as e:
+                logger.error(f"Erro na etapa '{method}' da cadeia de extração de {pdf_path}: {str(e)}")
+                data = None
+            step = {
+                'method': method,
+                'pages': len(pages) if pages != 'all' else requested,
+                'seconds': time.monotonic() - step_start
+            }
+            step['cost'] = step['pages'] * METHOD_WEIGHTS.get(method, 1.0)
+            spent_cost += step['cost']
+            steps.append(step)
+            
+            if not data:
+                continue
+            
+            step_metadata = data.get('_metadata') or {}
+            if not metadata:
+                metadata = dict(step_metadata)
+            if not num_pages and step_metadata.get('num_pages'):
+                num_pages = step_metadata['num_pages']
+            for stage, seconds in (step_metadata.get('timings') or {}).items():
+                timings[stage] = timings.get(stage, 0.0) + seconds
+            pages_processed += step_metadata.get('pages_processed') or 0
+            ocr_page_times.extend(step_metadata.get('ocr_page_times') or [])
+            
+            for key, value in data.items():
+                if key == '_metadata':
+                    continue
+                if key.startswith('table_'):
+                    table_count += 1
+                    merged[f'table_{table_count}'] = value
+                    page_methods[f'table_{table_count}'] = method
+                elif page_number(key) is not None:
+                    # Só substitui páginas que ainda estavam vazias
+                    if key not in merged or (is_empty_text(merged[key], self.min_chars)
+                                             and not is_empty_text(value, 1)):
+                        merged[key] = value
+                        page_methods[key] = method
+                else:
+                    merged.setdefault(key, value)
+        
+        if not merged:
+            return None
+        
+        methods_used = [step['method'] for step in steps]
+        metadata.update({
+            'extraction_method': '+'.join(dict.fromkeys(page_methods.values())) or '+'.join(methods_used),
+            'page_methods': page_methods,
+            'fallback': {
+                'chain': self.methods,
+                'steps': steps,
+                'budget_exhausted': budget_exhausted,
+                'skipped_pages': sorted(page + 1 for page in skipped_pages)
+            },
+            'timings': timings,
+            'pages_processed': pages_processed
+        })
+        if num_pages:
+            metadata['num_pages'] = num_pages
+        if 'num_tables' in metadata or table_count:
+            metadata['num_tables'] = table_count
+        if ocr_page_times:
+            metadata['ocr_page_times'] = ocr_page_times
+        
+        # Páginas em ordem, seguidas das tabelas e demais campos
+        ordered = dict(sorted(
+            ((key, value) for key, value in merged.items() if page_number(key) is not None),
+            key=lambda item: page_number(item[0])
+        ))
+        ordered.update((key, value) for key, value in merged.items() if page_number(key) is None)
+        ordered['_metadata'] = metadata
+        return ordered
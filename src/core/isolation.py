@@ -0,0 +1,212 @@
+import os
+import queue
+import signal
+import threading
+import time
+import traceback
+import multiprocessing
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class DocumentTimeout(Exception):
+    """Uma etapa do processamento de um documento excedeu o tempo limite"""
+    
+    def __init__(self, stage, timeout):
+        super().__init__(f"Tempo limite de {timeout:g}s excedido na etapa '{stage}'")
+        self.stage = stage
+        self.timeout = timeout
+
+class WorkerCrashed(RuntimeError):
+    """O processo auxiliar terminou de forma inesperada durante uma tarefa"""
+
+# Objetos reaproveitados entre tarefas dentro de cada processo auxiliar
+_worker_state = {}
+
+def _extract_in_worker(pdf_path, extraction_method, pages, template):
+    from .extractor import PDFExtractor
+    extractor = _worker_state.get('extractor')
+    if extractor is None:
+        extractor = _worker_state['extractor'] = PDFExtractor()
+    return extractor.extract_data(pdf_path, extraction_method, pages, template)
+
+def _classify_in_worker(pdf_path, model_path, patterns_dir):
+    from .document_classifier import DocumentClassifier
+    key = ('classifier', model_path, patterns_dir)
+    classifier = _worker_state.get(key)
+    if classifier is None:
+        classifier = _worker_state[key] = DocumentClassifier(model_path=model_path, patterns_dir=patterns_dir)
+    return classifier.classify_document(pdf_path)
+
+def _profile_in_worker(profile_path, fn, *args):
+    """Executa fn(*args) sob cProfile no processo auxiliar e grava o perfil em profile_path"""
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return fn(*args)
+    finally:
+        profiler.disable()
+        profiler.dump_stats(profile_path)
+
+def _worker_main(conn):
+    """Laço do processo auxiliar: executa tarefas recebidas pelo pipe até receber None"""
+    if hasattr(os, 'setsid'):
+        # Grupo de processos próprio, para encerrar também Ghostscript, Tesseract e a JVM
+        os.setsid()
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError, KeyboardInterrupt):
+            break
+        if task is None:
+            break
+        fn, args, kwargs = task
+        try:
+            conn.send(('ok', fn(*args, **kwargs)))
+        except Exception as e:
+            conn.send(('error', f"{type(e).__name__}: {str(e)}", traceback.format_exc()))
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+    
+    def kill(self):
+        """Encerra o processo auxiliar e todos os processos que ele iniciou"""
+        try:
+            if hasattr(os, 'killpg'):
+                os.killpg(self.process.pid, signal.SIGKILL)
+            else:
+                self.process.kill()
+        except (ProcessLookupError, PermissionError, OSError):
+            self.process.kill()
+        self.process.join(5)
+        self.conn.close()
+
+class IsolatedWorkerPool:
+    """Executa tarefas em processos auxiliares que podem ser encerrados
+    
+    Cada processo atende uma tarefa por vez; os processos são iniciados sob
+    demanda, até max_workers. Se a tarefa exceder o tempo limite, o processo
+    (com seus subprocessos) é encerrado, substituído por um novo e
+    DocumentTimeout é levantada; se o processo morrer, é substituído e
+    WorkerCrashed é levantada. A espera por um processo livre também conta
+    para o prazo da tarefa. As funções e argumentos precisam ser
+    serializáveis com pickle.
+    """
+    
+    def __init__(self, max_workers, start_method='spawn'):
+        self.max_workers = max(1, max_workers)
+        self._context = multiprocessing.get_context(start_method)
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._started = 0
+        self.replaced = 0
+    
+    def _acquire(self, stage, deadline, timeout):
+        """Obtém um processo livre (ou inicia um novo) até o prazo"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            start = self._started < self.max_workers
+            if start:
+                self._started += 1
+        if start:
+            try:
+                return _Worker(self._context)
+            except Exception:
+                with self._lock:
+                    self._started -= 1
+                raise
+        
+        remaining = None if deadline is None else deadline - time.monotonic()
+        try:
+            if remaining is not None and remaining <= 0:
+                raise queue.Empty
+            return self._idle.get(timeout=remaining)
+        except queue.Empty:
+            logger.warning(f"Etapa '{stage}' excedeu {timeout:g}s aguardando um processo auxiliar livre")
+            raise DocumentTimeout(stage, timeout)
+    
+    def run(self, fn, *args, stage='task', timeout=None, deadline=None, **kwargs):
+        """Executa fn(*args, **kwargs) em um processo auxiliar e retorna o resultado
+        
+        timeout é o tempo limite da etapa em segundos e deadline um instante
+        absoluto (time.monotonic()); vale o que vencer primeiro, contando
+        também a espera por um processo livre.
+        """
+        if self._closed:
+            raise RuntimeError("Pool de processos encerrado")
+        
+        start = time.monotonic()
+        if timeout is not None:
+            deadline = start + timeout if deadline is None else min(deadline, start + timeout)
+        if deadline is not None:
+            timeout = deadline - start
+            if timeout <= 0:
+                raise DocumentTimeout(stage, 0.0)
+        
+        worker = self._acquire(stage, deadline, timeout)
+        try:
+            try:
+                worker.conn.send((fn, args, kwargs))
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                if not worker.conn.poll(remaining):
+                    logger.warning(f"Etapa '{stage}' excedeu {timeout:g}s; encerrando o processo {worker.process.pid}")
+                    worker = self._replace(worker)
+                    raise DocumentTimeout(stage, timeout)
+                response = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                exitcode = worker.process.exitcode
+                worker = self._replace(worker)
+                raise WorkerCrashed(f"Processo auxiliar terminou durante a etapa '{stage}' (código {exitcode}): {e}")
+        finally:
+            if self._closed:
+                self._stop(worker)
+            else:
+                self._idle.put(worker)
+        
+        if response[0] == 'ok':
+            return response[1]
+        logger.error(f"Erro no processo auxiliar durante a etapa '{stage}': {response[2]}")
+        raise RuntimeError(response[1])
+    
+    def _replace(self, worker):
+        worker.kill()
+        with self._lock:
+            self.replaced += 1
+        return _Worker(self._context)
+    
+    @staticmethod
+    def _stop(worker):
+        try:
+            worker.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        worker.process.join(2)
+        if worker.process.is_alive():
+            worker.kill()
+        else:
+            worker.conn.close()
+    
+    def close(self):
+        """Encerra os processos ociosos; os ocupados são encerrados ao terminar a tarefa"""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._stop(worker)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
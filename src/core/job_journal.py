@@ -0,0 +1,142 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from ..utils.file_hash import cached_hash_file
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class JobJournal:
+    """Registra em SQLite o andamento de cada arquivo de um lote
+    
+    Cada arquivo tem uma linha em jobs com tamanho, mtime, hash do conteúdo,
+    status ('running', 'done', 'failed' ou 'pending'), número de tentativas e
+    caminho de saída. Uma nova execução do lote consulta o journal para pular
+    os arquivos concluídos, repetir os que falharam (até max_attempts) e
+    retomar os que ficaram em 'running' após uma queda.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime_ns INTEGER,
+            content_hash TEXT,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            output_path TEXT,
+            error TEXT,
+            updated_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+    """
+    
+    def __init__(self, db_path, max_attempts=3):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+    
+    def close(self):
+        """Fecha a conexão com o banco"""
+        with self._lock:
+            self._conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def get(self, path):
+        """Retorna a linha do journal de um arquivo, ou None"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT path, size, mtime_ns, content_hash, status, attempts, output_path, error "
+                "FROM jobs WHERE path = ?", (os.path.abspath(path),)
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return dict(zip([column[0] for column in cursor.description], row))
+    
+    def should_process(self, path):
+        """Indica se o arquivo precisa ser processado nesta execução"""
+        job = self.get(path)
+        if job is None:
+            return True
+        
+        stat = os.stat(path)
+        unchanged = job['size'] == stat.st_size and job['mtime_ns'] == stat.st_mtime_ns
+        
+        if job['status'] == 'done':
+            if unchanged:
+                return False
+            # Arquivo tocado mas com o mesmo conteúdo continua concluído
+            if job['content_hash'] and job['content_hash'] == cached_hash_file(path):
+                self._update(path, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                return False
+            return True
+        
+        if job['status'] == 'failed' and unchanged:
+            return job['attempts'] < self.max_attempts
+        
+        # 'pending', 'running' (interrompido por uma queda) ou arquivo alterado
+        return True
+    
+    def start(self, path):
+        """Marca o arquivo como em processamento e conta uma tentativa"""
+        stat = os.stat(path)
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (path, size, mtime_ns, status, attempts, updated_at) "
+                "VALUES (?, ?, ?, 'running', 1, ?) "
+                "ON CONFLICT(path) DO UPDATE SET "
+                "attempts = CASE WHEN jobs.size = excluded.size AND jobs.mtime_ns = excluded.mtime_ns "
+                "THEN jobs.attempts + 1 ELSE 1 END, "
+                "size = excluded.size, mtime_ns = excluded.mtime_ns, status = 'running', "
+                "error = NULL, updated_at = excluded.updated_at",
+                (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, now)
+            )
+    
+    def finish(self, path, output_path=None, content_hash=None):
+        """Marca o arquivo como concluído e registra o hash do conteúdo
+        
+        Sem content_hash, usa o hash já calculado para o arquivo (na
+        deduplicação ou em should_process) se ele não mudou desde então.
+        """
+        if content_hash is None:
+            content_hash = cached_hash_file(path)
+        self._update(path, status='done', output_path=output_path, content_hash=content_hash, error=None)
+    
+    def fail(self, path, error=None):
+        """Marca o arquivo como falho"""
+        self._update(path, status='failed', error=error)
+    
+    def release(self, path):
+        """Devolve um arquivo interrompido por cancelamento, sem contar a tentativa"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'pending', attempts = MAX(attempts - 1, 0), updated_at = ? "
+                "WHERE path = ?",
+                (datetime.now().isoformat(), os.path.abspath(path))
+            )
+    
+    def counts(self):
+        """Retorna o número de arquivos por status"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+    
+    def _update(self, path, **values):
+        values['updated_at'] = datetime.now().isoformat()
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE path = ?",
+                list(values.values()) + [os.path.abspath(path)]
+            )
@@ -0,0 +1,227 @@
+import os
+import re
+import heapq
+import functools
+import mmap
+import itertools
+import PyPDF2
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Custo relativo por página de cada método de extração
+METHOD_WEIGHTS = {
+    'text': 1.0,
+    'tables': 3.0,
+    'ocr': 20.0
+}
+
+def method_weight(extraction_method, image_ratio=0.0):
+    """Peso por página do método; no modo 'auto', texto mais OCR das páginas só com imagem"""
+    if extraction_method == 'auto':
+        return METHOD_WEIGHTS['text'] + image_ratio * METHOD_WEIGHTS['ocr']
+    return METHOD_WEIGHTS.get(extraction_method, 1.0)
+
+# Número de arquivos mantidos em espera pela ordenação longest_first: pequeno,
+# para que os primeiros documentos sejam submetidos sem esperar a descoberta
+DEFAULT_LOOKAHEAD = 16
+
+# Bytes do início do arquivo amostrados para estimar a proporção de imagens
+SAMPLE_BYTES = 1024 * 1024
+
+# Varredura completa, usada só quando a tabela xref não pode ser lida
+_PDF_OBJECTS = re.compile(
+    rb'(?P<pages><<(?:(?!<<|>>).)*?/Type\s*/Pages\b(?:(?!<<|>>).)*?>>)'
+    rb'|(?P<page>/Type\s*/Page\b(?!s))'
+    rb'|(?P<image>/Subtype\s*/Image\b)'
+    rb'|(?P<font>/Type\s*/Font\b)',
+    re.S
+)
+_SAMPLE_OBJECTS = re.compile(
+    rb'(?P<page>/Type\s*/Page\b(?!s))'
+    rb'|(?P<image>/Subtype\s*/Image\b)'
+    rb'|(?P<font>/Type\s*/Font\b)'
+)
+_COUNT = re.compile(rb'/Count\s+(\d+)')
+
+def _file_key(pdf_path):
+    """Chave de cache do arquivo: caminho, tamanho e data de modificação"""
+    stat = os.stat(pdf_path)
+    return pdf_path, stat.st_size, stat.st_mtime_ns
+
+def _trailer_page_count(pdf_path):
+    """/Count da árvore de páginas, seguindo startxref, trailer, /Root e /Pages
+    
+    O PyPDF2 lê apenas a tabela xref do fim do arquivo e resolve sob demanda
+    os dois objetos envolvidos, sem percorrer as páginas. Retorna None se a
+    contagem não puder ser obtida assim.
+    """
+    try:
+        with open(pdf_path, 'rb') as f:
+            count = PyPDF2.PdfReader(f, strict=False).trailer['/Root']['/Pages']['/Count']
+    except Exception:
+        return None
+    return count if isinstance(count, int) and count > 0 else None
+
+@functools.lru_cache(maxsize=1024)
+def _scan_file(pdf_path, size, mtime_ns):
+    """Conta nós de páginas, imagens e fontes percorrendo o arquivo inteiro
+    
+    É lento em arquivos grandes; só é usado quando a xref está corrompida.
+    """
+    if size == 0:
+        return None, 0, 0, 0
+    counts = []
+    found = {'page': 0, 'image': 0, 'font': 0}
+    with open(pdf_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for match in _PDF_OBJECTS.finditer(data):
+                if match.lastgroup == 'pages':
+                    counts.extend(int(count.group(1)) for count in _COUNT.finditer(match.group(0)))
+                else:
+                    found[match.lastgroup] += 1
+    # O nó raiz da árvore de páginas tem o maior /Count
+    page_count = max(counts) if counts else None
+    return page_count, found['page'], found['image'], found['font']
+
+def _scan(pdf_path):
+    """Contagens de _scan_file, reaproveitadas enquanto o arquivo não mudar"""
+    return _scan_file(*_file_key(pdf_path))
+
+@functools.lru_cache(maxsize=1024)
+def _sample_file(pdf_path, size, mtime_ns):
+    """Conta objetos /Page, imagens e fontes nos primeiros SAMPLE_BYTES do arquivo"""
+    with open(pdf_path, 'rb') as f:
+        data = f.read(SAMPLE_BYTES)
+    found = {'page': 0, 'image': 0, 'font': 0}
+    for match in _SAMPLE_OBJECTS.finditer(data):
+        found[match.lastgroup] += 1
+    return found['page'], found['image'], found['font']
+
+@functools.lru_cache(maxsize=1024)
+def _count_pages_file(pdf_path, size, mtime_ns):
+    """Número de páginas de uma versão do arquivo (ver count_pages)"""
+    if size == 0:
+        return None
+    page_count = _trailer_page_count(pdf_path)
+    if page_count:
+        return page_count
+    # xref ausente ou corrompida: percorre o arquivo
+    page_count, page_objects, _, _ = _scan_file(pdf_path, size, mtime_ns)
+    return page_count or page_objects or None
+
+def count_pages(pdf_path):
+    """Estima o número de páginas sem interpretar o documento inteiro
+    
+    Lê o /Count da árvore de páginas a partir do trailer (ver
+    _trailer_page_count); só se a xref estiver corrompida o arquivo inteiro é
+    percorrido. O resultado fica em cache por caminho, tamanho e data de
+    modificação, pois o agendamento, a cadeia de métodos e a divisão em
+    intervalos consultam o mesmo arquivo.
+    """
+    try:
+        return _count_pages_file(*_file_key(pdf_path))
+    except Exception as e:
+        logger.error(f"Erro ao contar páginas de {pdf_path}: {str(e)}")
+        return None
+
+def estimate_cost(pdf_path, extraction_method='text'):
+    """Estima o custo de processar um PDF
+    
+    Retorna um dicionário com pages, size, image_ratio e cost. O custo é o
+    número de páginas ponderado pelo método; páginas só com imagem pesam mais,
+    pois costumam ser digitalizações (no modo 'auto', recebem o peso do OCR
+    que a cadeia de métodos aplicará a elas). A proporção de imagens é
+    estimada pelos primeiros SAMPLE_BYTES do arquivo.
+    """
+    key = _file_key(pdf_path)
+    size = key[1]
+    try:
+        page_count = _count_pages_file(*key)
+        page_objects, images, fonts = _sample_file(*key)
+    except Exception as e:
+        logger.error(f"Erro ao estimar o custo de {pdf_path}: {str(e)}")
+        page_count, page_objects, images, fonts = None, 0, 0, 0
+    
+    pages = page_count or max(1, size // (100 * 1024))
+    image_ratio = min(1.0, images / page_objects) if page_objects else 0.0
+    if images and not fonts:
+        image_ratio = 1.0
+    
+    if extraction_method == 'auto':
+        cost = pages * method_weight('auto', image_ratio) + size / (1024 * 1024)
+    else:
+        cost = pages * method_weight(extraction_method) * (1 + image_ratio) + size / (1024 * 1024)
+    
+    return {
+        'pages': pages,
+        'size': size,
+        'image_ratio': image_ratio,
+        'cost': cost
+    }
+
+def iter_longest_first(pdf_paths, cost_fn, lookahead=None):
+    """Reordena os caminhos do maior para o menor custo
+    
+    Com lookahead=None todos os caminhos são lidos e ordenados. Com um limite,
+    mantém apenas lookahead arquivos em espera e sempre entrega o mais caro
+    deles, preservando a leitura incremental da entrada.
+    """
+    counter = itertools.count()
+    heap = []
+    for pdf_path in pdf_paths:
+        heapq.heappush(heap, (-cost_fn(pdf_path), next(counter), pdf_path))
+        if lookahead and len(heap) >= lookahead:
+            yield heapq.heappop(heap)[2]
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+def split_page_ranges(num_pages, pages_per_task):
+    """Divide as páginas (base 0) em intervalos de até pages_per_task páginas"""
+    return [list(range(start, min(start + pages_per_task, num_pages)))
+            for start in range(0, num_pages, pages_per_task)]
+
+def merge_extractions(parts, num_pages=None):
+    """Junta os resultados de extrações feitas por intervalos de páginas
+    
+    As chaves page_N já usam a numeração absoluta; tabelas são renumeradas
+    na ordem dos intervalos. Tempos por etapa e páginas processadas são somados.
+    """
+    merged = {}
+    metadata = {}
+    table_count = 0
+    timings = {}
+    pages_processed = 0
+    ocr_page_times = []
+    
+    for part in parts:
+        if not part:
+            continue
+        for key, value in part.items():
+            if key == '_metadata':
+                if not metadata:
+                    metadata = dict(value)
+                for stage, seconds in (value.get('timings') or {}).items():
+                    timings[stage] = timings.get(stage, 0.0) + seconds
+                pages_processed += value.get('pages_processed') or 0
+                ocr_page_times.extend(value.get('ocr_page_times') or [])
+            elif key.startswith('table_'):
+                table_count += 1
+                merged[f'table_{table_count}'] = value
+            else:
+                merged[key] = value
+    
+    if not merged:
+        return None
+    
+    if num_pages is not None:
+        metadata['num_pages'] = num_pages
+    if 'num_tables' in metadata:
+        metadata['num_tables'] = table_count
+    metadata['page_ranges'] = len(parts)
+    metadata['timings'] = timings
+    metadata['pages_processed'] = pages_processed
+    if ocr_page_times:
+        metadata['ocr_page_times'] = ocr_page_times
+    merged['_metadata'] = metadata
+    return merged
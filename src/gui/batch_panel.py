@@ -6,6 +6,7 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 import os
 from ..core.batch_processor import BatchProcessor
+from ..core.cancellation import CancellationToken
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -23,6 +24,11 @@ class BatchWorker(QThread):
         self.extraction_method = extraction_method
         self.template = template
         self.export_format = export_format
+        self.cancel_token = CancellationToken()
+    
+    def cancel(self):
+        """Solicita o cancelamento; os arquivos em andamento terminam a etapa atual"""
+        self.cancel_token.cancel()
     
     def run(self):
         try:
@@ -36,14 +42,15 @@ class BatchWorker(QThread):
                 self.extraction_method, 
                 self.template, 
                 self.export_format,
-                progress_callback
+                progress_callback,
+                cancel_token=self.cancel_token
             )
             
             # Gera relatório
             report = self.batch_processor.generate_batch_report(results)
             
-            # Emite sinal de conclusão
-            self.finished.emit(results, report)
+            # Emite sinal de conclusão (sem resultados, como ao cancelar, não há relatório)
+            self.finished.emit(results, report or {})
             
         except Exception as e:
             logger.error(f"Erro no processamento em lote: {str(e)}")
@@ -238,11 +245,9 @@ class BatchPanel(QWidget):
             return
         
         # Determina o método de extração
+        # "Automático" usa a cadeia de métodos (texto, OCR nas páginas vazias, tabelas)
         method_text = self.extraction_method.currentText()
-        if method_text == "Automático":
-            extraction_method = None
-        else:
-            extraction_method = method_text.lower()
+        extraction_method = {"Texto": 'text', "Tabelas": 'tables', "OCR": 'ocr'}.get(method_text)
         
         # Determina o template
         template = None
@@ -285,11 +290,10 @@ class BatchPanel(QWidget):
     def cancel_processing(self):
         """Cancela o processamento em lote"""
         if hasattr(self, 'batch_worker') and self.batch_worker.isRunning():
-            self.batch_worker.terminate()
-            self.batch_worker.wait()
+            # Cancelamento cooperativo: o worker termina sozinho e emite finished
+            self.batch_worker.cancel()
             
-            self.progress_label.setText("Processamento cancelado")
-            self.start_btn.setEnabled(True)
+            self.progress_label.setText("Cancelando processamento...")
             self.cancel_btn.setEnabled(False)
     
     def update_progress(self, processed, total, current_file):
@@ -302,8 +306,12 @@ class BatchPanel(QWidget):
     
     def processing_finished(self, results, report):
         """Chamado quando o processamento em lote é concluído"""
-        self.progress_bar.setValue(100)
-        self.progress_label.setText(f"Processamento concluído: {len(results)} arquivos processados")
+        cancelled = self.batch_worker.cancel_token.cancelled
+        if cancelled:
+            self.progress_label.setText(f"Processamento cancelado: {len(results)} arquivos processados")
+        else:
+            self.progress_bar.setValue(100)
+            self.progress_label.setText(f"Processamento concluído: {len(results)} arquivos processados")
         
         # Atualiza UI
         self.start_btn.setEnabled(True)
@@ -324,7 +332,7 @@ class BatchPanel(QWidget):
             self.results_table.setItem(i, 0, QTableWidgetItem(filename))
             
             # Tipo de documento
-            doc_type = result.get('doc_type', 'Desconhecido')
+            doc_type = result.get('doc_type') or 'Desconhecido'
             self.results_table.setItem(i, 1, QTableWidgetItem(doc_type))
             
             # Status
@@ -338,14 +346,13 @@ class BatchPanel(QWidget):
             self.results_table.setItem(i, 3, QTableWidgetItem(f"{confidence:.2f}" if confidence else "N/A"))
             
             # Arquivo de saída
-            export_path = result.get('export_path', 'N/A')
-            if export_path:
-                export_path = os.path.basename(export_path)
+            export_path = result.get('export_path')
+            export_path = os.path.basename(export_path) if export_path else 'N/A'
             self.results_table.setItem(i, 4, QTableWidgetItem(export_path))
         
         # Exibe estatísticas
-        stats = self.batch_report.get('stats', {})
-        if stats:
+        stats = (self.batch_report or {}).get('stats', {})
+        if stats and not cancelled:
             success_rate = stats.get('success_rate', 0)
             QMessageBox.information(
                 self,
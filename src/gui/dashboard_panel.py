@@ -1,7 +1,7 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                            QComboBox, QPushButton, QTableWidget, QTableWidgetItem,
                            QTabWidget, QSplitter, QFrame)
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QColor
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
@@ -11,6 +11,59 @@ import os
 import json
 from datetime import datetime, timedelta
 from ..core.analytics import DataAnalytics
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+def fill_missing_dates(date_counts, start_date, end_date=None):
+    """Reindexa a contagem diária para incluir todas as datas do período"""
+    date_counts = date_counts.copy()
+    date_counts.index = pd.to_datetime(date_counts.index)
+    if start_date and not date_counts.empty:
+        end = end_date or datetime.now()
+        all_dates = pd.date_range(start=start_date.date(), end=end.date())
+        date_counts = date_counts.reindex(all_dates, fill_value=0)
+    return date_counts
+
+def same_chart_input(previous, current):
+    """Indica se a entrada de um gráfico não mudou desde o último desenho"""
+    if isinstance(current, pd.Series):
+        return isinstance(previous, pd.Series) and previous.equals(current)
+    return previous == current
+
+class DashboardWorker(QThread):
+    """Calcula os dados do dashboard fora da thread da interface"""
+    snapshot_ready = pyqtSignal(int, dict)
+    failed = pyqtSignal(int, str)
+    
+    def __init__(self, request_id, analytics, start_date, end_date, doc_type, refresh=False):
+        super().__init__()
+        self.request_id = request_id
+        self.analytics = analytics
+        self.start_date = start_date
+        self.end_date = end_date
+        self.doc_type = doc_type
+        self.refresh = refresh
+    
+    def run(self):
+        try:
+            if self.refresh:
+                self.analytics.refresh_data()
+            
+            snapshot = self.analytics.get_dashboard_snapshot(self.start_date, self.end_date, self.doc_type)
+            summary = snapshot['summary']
+            
+            # Entradas de cada gráfico, já prontas para desenhar
+            snapshot['charts'] = {
+                'docs_by_day': fill_missing_dates(summary['by_day'], self.start_date, self.end_date),
+                'doc_types': summary['by_type'],
+                'confidence': summary['confidence_by_type'],
+                'errors': summary['top_errors']
+            }
+            snapshot['doc_types'] = self.analytics.get_document_types()
+            self.snapshot_ready.emit(self.request_id, snapshot)
+        except Exception as e:
+            self.failed.emit(self.request_id, str(e))
 
 class DashboardPanel(QWidget):
     """Painel de dashboard analítico para visualização de dados"""
@@ -19,6 +72,15 @@ class DashboardPanel(QWidget):
         super().__init__(parent)
         self.config = config or {}
         self.analytics = DataAnalytics(self.config.get('analytics_dir', ''))
+        
+        # Estado das atualizações em segundo plano
+        self._worker = None
+        self._request_id = 0
+        self._pending_request = None
+        self._refresh_pending = False
+        self._chart_inputs = {}
+        self._recent_docs = None
+        
         self.init_ui()
     
     def init_ui(self):
@@ -185,123 +247,184 @@ class DashboardPanel(QWidget):
     
     def load_initial_data(self):
         """Carrega dados iniciais para o dashboard"""
-        # Carrega tipos de documentos disponíveis
-        doc_types = self.analytics.get_document_types()
-        self.doc_type_combo.clear()
-        self.doc_type_combo.addItem("Todos")
-        for doc_type in doc_types:
-            self.doc_type_combo.addItem(doc_type)
-        
-        # Atualiza o dashboard
+        # Os tipos de documentos disponíveis chegam junto com os dados calculados
         self.update_dashboard()
     
     def refresh_data(self):
         """Atualiza os dados do dashboard"""
-        self.analytics.refresh_data()
-        self.load_initial_data()
+        # A leitura dos registros novos também é feita pela thread de fundo
+        self._refresh_pending = True
+        self.update_dashboard()
     
-    def update_dashboard(self):
-        """Atualiza todos os elementos do dashboard"""
-        # Obtém filtros selecionados
+    def get_period(self):
+        """Retorna (start_date, end_date) do período selecionado
+        
+        Os períodos começam à meia-noite e ficam abertos no fim (end_date=None),
+        alinhados aos agregados diários do DataAnalytics.
+        """
         period_idx = self.period_combo.currentIndex()
-        doc_type = self.doc_type_combo.currentText()
-        if doc_type == "Todos":
-            doc_type = None
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
         
-        # Determina o período de filtro
         start_date = None
-        end_date = datetime.now()
-        
         if period_idx == 0:  # Últimos 7 dias
-            start_date = end_date - timedelta(days=7)
+            start_date = today - timedelta(days=7)
         elif period_idx == 1:  # Últimos 30 dias
-            start_date = end_date - timedelta(days=30)
+            start_date = today - timedelta(days=30)
         elif period_idx == 2:  # Este mês
-            start_date = datetime(end_date.year, end_date.month, 1)
+            start_date = today.replace(day=1)
         elif period_idx == 3:  # Este ano
-            start_date = datetime(end_date.year, 1, 1)
+            start_date = today.replace(month=1, day=1)
+        
+        return start_date, None
+    
+    def update_dashboard(self, *args):
+        """Solicita a atualização do dashboard com os filtros selecionados
+        
+        O cálculo é feito em uma DashboardWorker. Se já houver um cálculo em
+        andamento, apenas a solicitação mais recente é guardada e executada ao
+        final; resultados de solicitações superadas são descartados.
+        """
+        # Obtém filtros selecionados
+        doc_type = self.doc_type_combo.currentText()
+        if doc_type == "Todos" or not doc_type:
+            doc_type = None
+        
+        # Determina o período de filtro
+        start_date, end_date = self.get_period()
         
-        # Obtém dados filtrados
-        data = self.analytics.get_filtered_data(start_date, end_date, doc_type)
+        self._request_id += 1
+        self._pending_request = (self._request_id, start_date, end_date, doc_type)
         
-        # Atualiza KPIs
-        self.update_kpis(data)
+        if self._worker is None:
+            self._start_worker()
+    
+    def _start_worker(self):
+        """Inicia o cálculo da solicitação pendente"""
+        request_id, start_date, end_date, doc_type = self._pending_request
+        self._pending_request = None
+        refresh, self._refresh_pending = self._refresh_pending, False
+        
+        self._worker = DashboardWorker(request_id, self.analytics, start_date, end_date, doc_type, refresh)
+        self._worker.snapshot_ready.connect(self.apply_snapshot)
+        self._worker.failed.connect(self.dashboard_failed)
+        self._worker.finished.connect(self._worker_done)
+        self._worker.start()
+    
+    def _worker_done(self):
+        """Libera a worker e executa a solicitação que chegou durante o cálculo"""
+        self._worker = None
+        if self._pending_request is not None:
+            self._start_worker()
+    
+    def apply_snapshot(self, request_id, snapshot):
+        """Aplica na interface os dados calculados pela worker"""
+        if request_id != self._request_id:
+            return  # Solicitação superada por outra mais recente
+        
+        self.update_doc_types(snapshot['doc_types'])
+        self.update_kpis(snapshot['summary'])
+        self.update_charts(snapshot['charts'])
+        
+        if snapshot['recent'] != self._recent_docs:
+            self._recent_docs = snapshot['recent']
+            self.update_recent_docs_table(snapshot['recent'])
+    
+    def dashboard_failed(self, request_id, error_msg):
+        """Trata erros no cálculo do dashboard"""
+        logger.error(f"Erro ao atualizar o dashboard: {error_msg}")
+    
+    def update_doc_types(self, doc_types):
+        """Atualiza a lista de tipos de documentos mantendo a seleção atual"""
+        current_items = [self.doc_type_combo.itemText(i) for i in range(1, self.doc_type_combo.count())]
+        if current_items == list(doc_types):
+            return
         
-        # Atualiza gráficos
-        self.update_charts(data, start_date, end_date)
+        selected = self.doc_type_combo.currentText()
+        self.doc_type_combo.blockSignals(True)
+        self.doc_type_combo.clear()
+        self.doc_type_combo.addItem("Todos")
+        for doc_type in doc_types:
+            self.doc_type_combo.addItem(doc_type)
+        index = self.doc_type_combo.findText(selected)
+        self.doc_type_combo.setCurrentIndex(max(index, 0))
+        self.doc_type_combo.blockSignals(False)
         
-        # Atualiza tabela de documentos recentes
-        self.update_recent_docs_table(data)
+        # O tipo selecionado deixou de existir: recalcula com "Todos"
+        if index < 0:
+            self.update_dashboard()
     
-    def update_kpis(self, data):
-        """Atualiza os KPIs com base nos dados filtrados"""
+    def closeEvent(self, event):
+        """Aguarda a worker em andamento antes de fechar"""
+        if self._worker is not None:
+            self._worker.wait()
+        super().closeEvent(event)
+    
+    def update_kpis(self, summary):
+        """Atualiza os KPIs com base nos agregados do período"""
         # Total de documentos
-        total_docs = len(data)
+        total_docs = summary['total']
         self.total_docs_frame.value_label.setText(f"<h2>{total_docs}</h2>")
         
         # Taxa de sucesso
         if total_docs > 0:
-            success_count = sum(1 for d in data if d.get('success', False))
-            success_rate = (success_count / total_docs) * 100
-            self.success_rate_frame.value_label.setText(f"<h2>{success_rate:.1f}%</h2>")
+            self.success_rate_frame.value_label.setText(f"<h2>{summary['success_rate']:.1f}%</h2>")
         else:
             self.success_rate_frame.value_label.setText("<h2>0%</h2>")
         
         # Documentos hoje
-        today = datetime.now().date()
-        today_count = sum(1 for d in data if datetime.fromisoformat(d.get('timestamp', '')).date() == today)
-        self.today_docs_frame.value_label.setText(f"<h2>{today_count}</h2>")
+        self.today_docs_frame.value_label.setText(f"<h2>{summary['today_count']}</h2>")
         
         # Tempo médio de processamento
-        if total_docs > 0:
-            processing_times = [d.get('processing_time', 0) for d in data if 'processing_time' in d]
-            if processing_times:
-                avg_time = sum(processing_times) / len(processing_times)
-                if avg_time < 1:
-                    time_str = f"{avg_time*1000:.0f}ms"
-                elif avg_time < 60:
-                    time_str = f"{avg_time:.1f}s"
-                else:
-                    time_str = f"{avg_time/60:.1f}min"
-                self.avg_time_frame.value_label.setText(f"<h2>{time_str}</h2>")
+        avg_time = summary['avg_processing_time']
+        if total_docs > 0 and avg_time is not None:
+            if avg_time < 1:
+                time_str = f"{avg_time*1000:.0f}ms"
+            elif avg_time < 60:
+                time_str = f"{avg_time:.1f}s"
             else:
-                self.avg_time_frame.value_label.setText("<h2>-</h2>")
+                time_str = f"{avg_time/60:.1f}min"
+            self.avg_time_frame.value_label.setText(f"<h2>{time_str}</h2>")
         else:
             self.avg_time_frame.value_label.setText("<h2>-</h2>")
     
-    def update_charts(self, data, start_date, end_date):
-        """Atualiza os gráficos com base nos dados filtrados"""
-        # Gráfico de documentos por dia
+    def chart_changed(self, name, value):
+        """Registra a entrada de um gráfico e indica se ele precisa ser redesenhado"""
+        if name in self._chart_inputs and same_chart_input(self._chart_inputs[name], value):
+            return False
+        self._chart_inputs[name] = value
+        return True
+    
+    def update_charts(self, charts):
+        """Redesenha apenas os gráficos cuja entrada mudou"""
+        if self.chart_changed('docs_by_day', charts['docs_by_day']):
+            self.draw_docs_by_day(charts['docs_by_day'])
+        if self.chart_changed('doc_types', charts['doc_types']):
+            self.draw_doc_types(charts['doc_types'])
+        if self.chart_changed('confidence', charts['confidence']):
+            self.draw_confidence(charts['confidence'])
+        if self.chart_changed('errors', charts['errors']):
+            self.draw_errors(charts['errors'])
+    
+    def draw_docs_by_day(self, date_counts):
+        """Desenha o gráfico de documentos por dia"""
         self.docs_by_day_figure.clear()
         ax1 = self.docs_by_day_figure.add_subplot(111)
         
-        if data:
-            # Agrupa por data
-            dates = [datetime.fromisoformat(d.get('timestamp', '')).date() for d in data]
-            date_counts = pd.Series(dates).value_counts().sort_index()
-            
-            # Garante que todas as datas no intervalo estejam representadas
-            if start_date:
-                all_dates = pd.date_range(start=start_date.date(), end=end_date.date())
-                date_counts = date_counts.reindex(all_dates, fill_value=0)
-            
+        if not date_counts.empty:
             ax1.bar(date_counts.index, date_counts.values, color='royalblue')
             ax1.set_xlabel('Data')
             ax1.set_ylabel('Documentos')
             ax1.tick_params(axis='x', rotation=45)
             self.docs_by_day_figure.tight_layout()
         
-        self.docs_by_day_canvas.draw()
-        
-        # Gráfico de tipos de documentos
+        self.docs_by_day_canvas.draw_idle()
+    
+    def draw_doc_types(self, type_counts):
+        """Desenha o gráfico de tipos de documentos"""
         self.doc_types_figure.clear()
         ax2 = self.doc_types_figure.add_subplot(111)
         
-        if data:
-            # Conta tipos de documentos
-            doc_types = [d.get('doc_type', 'Desconhecido') for d in data]
-            type_counts = pd.Series(doc_types).value_counts()
-            
+        if not type_counts.empty:
             colors = plt.cm.viridis(np.linspace(0, 1, len(type_counts)))
             wedges, texts, autotexts = ax2.pie(
                 type_counts.values, 
@@ -317,68 +440,51 @@ class DashboardPanel(QWidget):
                 text.set_fontsize(8)
         
         self.doc_types_figure.tight_layout()
-        self.doc_types_canvas.draw()
-        
-        # Gráfico de confiança por tipo de documento
+        self.doc_types_canvas.draw_idle()
+    
+    def draw_confidence(self, avg_confidence):
+        """Desenha o gráfico de confiança por tipo de documento"""
         self.confidence_figure.clear()
         ax3 = self.confidence_figure.add_subplot(111)
         
-        if data:
-            # Filtra apenas dados com confiança
-            confidence_data = [(d.get('doc_type', 'Desconhecido'), d.get('confidence', 0)) 
-                              for d in data if 'confidence' in d]
-            
-            if confidence_data:
-                df = pd.DataFrame(confidence_data, columns=['doc_type', 'confidence'])
-                avg_confidence = df.groupby('doc_type')['confidence'].mean().sort_values(ascending=False)
-                
-                ax3.bar(avg_confidence.index, avg_confidence.values, color='teal')
-                ax3.set_xlabel('Tipo de Documento')
-                ax3.set_ylabel('Confiança Média')
-                ax3.set_ylim(0, 1.0)
-                ax3.tick_params(axis='x', rotation=45)
+        if not avg_confidence.empty:
+            ax3.bar(avg_confidence.index, avg_confidence.values, color='teal')
+            ax3.set_xlabel('Tipo de Documento')
+            ax3.set_ylabel('Confiança Média')
+            ax3.set_ylim(0, 1.0)
+            ax3.tick_params(axis='x', rotation=45)
         
         self.confidence_figure.tight_layout()
-        self.confidence_canvas.draw()
-        
-        # Gráfico de erros comuns
+        self.confidence_canvas.draw_idle()
+    
+    def draw_errors(self, top_errors):
+        """Desenha o gráfico de erros comuns"""
         self.errors_figure.clear()
         ax4 = self.errors_figure.add_subplot(111)
         
-        if data:
-            # Extrai erros
-            error_data = []
-            for d in data:
-                if not d.get('success', True) and 'error' in d:
-                    error_data.append(d['error'])
+        if top_errors:
+            errors = [error for error, _ in top_errors]
+            counts = [count for _, count in top_errors]
             
-            if error_data:
-                error_counts = pd.Series(error_data).value_counts().head(10)  # Top 10 erros
-                
-                ax4.barh(error_counts.index, error_counts.values, color='indianred')
-                ax4.set_xlabel('Ocorrências')
-                ax4.set_ylabel('Erro')
-                
-                # Limita o tamanho do texto do erro
-                labels = [label[:50] + '...' if len(label) > 50 else label for label in error_counts.index]
-                ax4.set_yticklabels(labels)
+            ax4.barh(errors, counts, color='indianred')
+            ax4.set_xlabel('Ocorrências')
+            ax4.set_ylabel('Erro')
+            
+            # Limita o tamanho do texto do erro
+            labels = [label[:50] + '...' if len(label) > 50 else label for label in errors]
+            ax4.set_yticks(range(len(labels)))
+            ax4.set_yticklabels(labels)
         
         self.errors_figure.tight_layout()
-        self.errors_canvas.draw()
+        self.errors_canvas.draw_idle()
     
-    def update_recent_docs_table(self, data):
-        """Atualiza a tabela de documentos recentes"""
+    def update_recent_docs_table(self, recent_docs):
+        """Atualiza a tabela de documentos recentes (já ordenados, mais novos primeiro)"""
         self.recent_docs_table.setRowCount(0)
         
-        if not data:
+        if not recent_docs:
             return
         
-        # Ordena por data (mais recentes primeiro)
-        sorted_data = sorted(data, key=lambda x: x.get('timestamp', ''), reverse=True)
-        
-        # Limita a 20 documentos mais recentes
-        recent_docs = sorted_data[:20]
-        
         self.recent_docs_table.setRowCount(len(recent_docs))
         
         for i, doc in enumerate(recent_docs):
@@ -0,0 +1,154 @@
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
+                             QPushButton, QPlainTextEdit)
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+import pandas as pd
+
+class DataFrameModel(QAbstractTableModel):
+    """Modelo de tabela que lê as células diretamente de um DataFrame
+    
+    Nenhum item é criado por célula: data() consulta o DataFrame apenas para
+    as células visíveis, e as linhas são expostas à view em lotes de
+    batch_size por meio de canFetchMore/fetchMore.
+    """
+    
+    def __init__(self, df=None, batch_size=1000, parent=None):
+        super().__init__(parent)
+        self.batch_size = batch_size
+        self._df = pd.DataFrame()
+        self._loaded = 0
+        if df is not None:
+            self.set_dataframe(df)
+    
+    def set_dataframe(self, df):
+        """Substitui o DataFrame exibido"""
+        self.beginResetModel()
+        self._df = df
+        self._loaded = min(len(df), self.batch_size)
+        self.endResetModel()
+    
+    def dataframe(self):
+        """Retorna o DataFrame exibido"""
+        return self._df
+    
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._loaded
+    
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._df.columns)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        
+        value = self._df.iat[index.row(), index.column()]
+        if pd.api.types.is_scalar(value) and pd.isna(value):
+            return ""
+        return str(value)
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return str(self._df.columns[section])
+        return str(self._df.index[section])
+    
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._loaded < len(self._df)
+    
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        
+        count = min(self.batch_size, len(self._df) - self._loaded)
+        if count <= 0:
+            return
+        
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+def page_offsets(text, page_size):
+    """Calcula os limites das páginas de um texto, quebrando em fim de linha quando possível"""
+    offsets = [0]
+    length = len(text)
+    
+    while offsets[-1] + page_size < length:
+        start = offsets[-1]
+        end = text.rfind('\n', start + 1, start + page_size)
+        # Linha maior que a página: corta no tamanho da página
+        offsets.append(end + 1 if end > start else start + page_size)
+    
+    offsets.append(length)
+    return offsets
+
+class PagedTextView(QWidget):
+    """Exibe textos longos uma página por vez"""
+    
+    def __init__(self, page_size=20000, parent=None):
+        super().__init__(parent)
+        self.page_size = page_size
+        self._text = ""
+        self._offsets = [0, 0]
+        self._page = 0
+        
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        
+        self.text_view = QPlainTextEdit()
+        self.text_view.setReadOnly(True)
+        layout.addWidget(self.text_view)
+        
+        nav_layout = QHBoxLayout()
+        self.prev_btn = QPushButton("<")
+        self.prev_btn.clicked.connect(self.previous_page)
+        self.page_label = QLabel()
+        self.next_btn = QPushButton(">")
+        self.next_btn.clicked.connect(self.next_page)
+        
+        nav_layout.addStretch()
+        nav_layout.addWidget(self.prev_btn)
+        nav_layout.addWidget(self.page_label)
+        nav_layout.addWidget(self.next_btn)
+        layout.addLayout(nav_layout)
+        
+        self.show_page(0)
+    
+    def set_text(self, text):
+        """Define o texto exibido e volta para a primeira página"""
+        self._text = text or ""
+        self._offsets = page_offsets(self._text, self.page_size)
+        self.show_page(0)
+    
+    def clear(self):
+        """Limpa o texto exibido"""
+        self.set_text("")
+    
+    def page_count(self):
+        """Retorna o número de páginas"""
+        return len(self._offsets) - 1
+    
+    def show_page(self, page):
+        """Exibe a página indicada"""
+        page = max(0, min(page, self.page_count() - 1))
+        self._page = page
+        
+        start, end = self._offsets[page], self._offsets[page + 1]
+        self.text_view.setPlainText(self._text[start:end])
+        
+        self.page_label.setText(f"{page + 1}/{self.page_count()}")
+        self.prev_btn.setEnabled(page > 0)
+        self.next_btn.setEnabled(page < self.page_count() - 1)
+    
+    def previous_page(self):
+        """Vai para a página anterior"""
+        self.show_page(self._page - 1)
+    
+    def next_page(self):
+        """Vai para a próxima página"""
+        self.show_page(self._page + 1)
@@ -1,10 +1,13 @@
 import sys
 import os
+import json
+from datetime import datetime
+import pandas as pd
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QTabWidget, QWidget, 
                              QVBoxLayout, QHBoxLayout, QPushButton, QLabel, 
                              QLineEdit, QFileDialog, QTextEdit, QComboBox,
                              QProgressBar, QMessageBox, QAction, QToolBar,
-                             QStatusBar)
+                             QStatusBar, QTableView, QStackedWidget)
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWebEngineWidgets import QWebEngineView
@@ -13,6 +16,7 @@ from .theme_manager import ThemeManager
 from .batch_panel import BatchPanel
 from .dashboard_panel import DashboardPanel
 from .validation_panel import ValidationPanel
+from .dataframe_model import DataFrameModel, PagedTextView
 
 from ..core.downloader import PDFDownloader
 from ..core.extractor import PDFExtractor
@@ -243,9 +247,15 @@ class MainWindow(QMainWindow):
     def setup_preview_tab(self):
         layout = QVBoxLayout()
         
-        # Preview area
-        self.preview_text = QTextEdit()
-        self.preview_text.setReadOnly(True)
+        # Preview area: tables are read lazily by the model, text is shown one page at a time
+        self.preview_model = DataFrameModel()
+        self.preview_table = QTableView()
+        self.preview_table.setModel(self.preview_model)
+        self.preview_pager = PagedTextView()
+        
+        self.preview_stack = QStackedWidget()
+        self.preview_stack.addWidget(self.preview_pager)
+        self.preview_stack.addWidget(self.preview_table)
         
         # Table view selector
         table_layout = QHBoxLayout()
@@ -261,7 +271,7 @@ class MainWindow(QMainWindow):
         table_layout.addWidget(self.validate_btn)
         
         layout.addLayout(table_layout)
-        layout.addWidget(self.preview_text)
+        layout.addWidget(self.preview_stack)
         
         self.preview_tab.setLayout(layout)
     
@@ -465,7 +475,8 @@ class MainWindow(QMainWindow):
             return
         
         # Clear previous data
-        self.preview_text.clear()
+        self.preview_pager.clear()
+        self.preview_model.set_dataframe(pd.DataFrame())
         self.table_selector.clear()
         
         if isinstance(self.extracted_data, dict):
@@ -477,10 +488,8 @@ class MainWindow(QMainWindow):
             # Show first table/data
             if self.table_selector.count() > 0:
                 self.show_selected_table(0)
-        elif isinstance(self.extracted_data, pd.DataFrame):
-            self.preview_text.setPlainText(self.extracted_data.to_string())
         else:
-            self.preview_text.setPlainText(str(self.extracted_data))
+            self.show_preview(self.extracted_data)
     
     def show_selected_table(self, index):
         """Show selected table in preview"""
@@ -489,11 +498,16 @@ class MainWindow(QMainWindow):
         
         key = self.table_selector.itemText(index)
         if key in self.extracted_data:
-            data = self.extracted_data[key]
-            if isinstance(data, pd.DataFrame):
-                self.preview_text.setPlainText(data.to_string())
-            else:
-                self.preview_text.setPlainText(str(data))
+            self.show_preview(self.extracted_data[key])
+    
+    def show_preview(self, data):
+        """Show a DataFrame in the table view or anything else as paged text"""
+        if isinstance(data, pd.DataFrame):
+            self.preview_model.set_dataframe(data)
+            self.preview_stack.setCurrentWidget(self.preview_table)
+        else:
+            self.preview_pager.set_text(str(data))
+            self.preview_stack.setCurrentWidget(self.preview_pager)
     
     def validate_data(self):
         """Validate extracted data"""
@@ -521,22 +535,35 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Warning", "Please enter a filename")
             return
         
-        result = None
-        
         if export_format == 'csv':
             filename = filename if filename.endswith('.csv') else filename + '.csv'
-            result = self.exporter.export_to_csv(self.extracted_data, filename, 
-                                               structured=isinstance(self.extracted_data, (pd.DataFrame, dict)))
+            func = self.exporter.export_to_csv
+            args = (self.extracted_data, filename)
+            kwargs = {'structured': isinstance(self.extracted_data, (pd.DataFrame, dict))}
         elif export_format == 'json':
             filename = filename if filename.endswith('.json') else filename + '.json'
-            result = self.exporter.export_to_json(self.extracted_data, filename)
+            func, args, kwargs = self.exporter.export_to_json, (self.extracted_data, filename), {}
         elif export_format == 'sql':
             filename = filename if filename.endswith('.sql') else filename + '.sql'
             connection_string = self.db_connection.text() if self.db_connection.isEnabled() else None
-            result = self.exporter.export_to_sql(self.extracted_data, filename, connection_string)
+            func, args, kwargs = self.exporter.export_to_sql, (self.extracted_data, filename, connection_string), {}
         elif export_format == 'excel':
             filename = filename if filename.endswith('.xlsx') else filename + '.xlsx'
-            result = self.exporter.export_to_excel(self.extracted_data, filename)
+            func, args, kwargs = self.exporter.export_to_excel, (self.extracted_data, filename), {'streaming': True}
+        else:
+            return
+        
+        # Exporta em segundo plano para não travar a interface com tabelas grandes
+        self.export_btn.setEnabled(False)
+        self.export_status.setText("Exportando...")
+        self.export_thread = WorkerThread('export', func, *args, **kwargs)
+        self.export_thread.finished.connect(lambda result: self.export_finished(result, export_format))
+        self.export_thread.error.connect(self.export_failed)
+        self.export_thread.start()
+    
+    def export_finished(self, result, export_format):
+        """Chamado quando a exportação em segundo plano termina"""
+        self.export_btn.setEnabled(True)
         
         if result:
             self.export_status.setText(f"Data exported successfully to {result}")
@@ -560,6 +587,12 @@ class MainWindow(QMainWindow):
             self.export_status.setText("Failed to export data")
             QMessageBox.warning(self, "Error", "Failed to export data")
     
+    def export_failed(self, error_msg):
+        """Chamado quando a exportação em segundo plano lança uma exceção"""
+        self.export_btn.setEnabled(True)
+        self.export_status.setText("Failed to export data")
+        self.show_error(error_msg)
+    
     def show_error(self, error_msg):
         """Show error message"""
         QMessageBox.critical(self, "Error", error_msg)
\ No newline at end of file
@@ -1,13 +1,14 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                           QPushButton, QTableWidget, QTableWidgetItem,
+                           QPushButton, QTableWidget, QTableWidgetItem, QTableView,
                            QComboBox, QTextEdit, QGroupBox, QHeaderView,
-                           QMessageBox, QSplitter)
+                           QMessageBox, QSplitter, QStackedWidget)
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QColor
 import pandas as pd
 import json
 import os
 from ..core.validator import DataValidator
+from .dataframe_model import DataFrameModel, PagedTextView
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -67,9 +68,18 @@ class ValidationPanel(QWidget):
         data_layout.addLayout(table_layout)
         
         # Visualização de dados
-        self.data_view = QTableWidget()
+        self.data_model = DataFrameModel()
+        self.data_view = QTableView()
+        self.data_view.setModel(self.data_model)
         self.data_view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        data_layout.addWidget(self.data_view)
+        
+        # Textos longos são exibidos por páginas, e não em uma única célula
+        self.text_pager = PagedTextView()
+        
+        self.data_stack = QStackedWidget()
+        self.data_stack.addWidget(self.data_view)
+        self.data_stack.addWidget(self.text_pager)
+        data_layout.addWidget(self.data_stack)
         
         # Área de resultados de validação
         results_group = QGroupBox("Resultados da Validação")
@@ -181,55 +191,22 @@ class ValidationPanel(QWidget):
     
     def show_dataframe(self, df):
         """Mostra um DataFrame na tabela de visualização"""
-        self.data_view.clear()
-        
-        if df.empty:
-            self.data_view.setRowCount(0)
-            self.data_view.setColumnCount(0)
-            return
-        
-        # Configura tabela
-        self.data_view.setRowCount(len(df))
-        self.data_view.setColumnCount(len(df.columns))
-        self.data_view.setHorizontalHeaderLabels(df.columns)
-        
-        # Preenche dados
-        for i, (_, row) in enumerate(df.iterrows()):
-            for j, value in enumerate(row):
-                item = QTableWidgetItem(str(value))
-                self.data_view.setItem(i, j, item)
+        # O modelo lê as células sob demanda, sem criar um item por célula
+        self.data_model.set_dataframe(df)
+        self.data_stack.setCurrentWidget(self.data_view)
     
     def show_dict_data(self, data):
         """Mostra um dicionário na tabela de visualização"""
-        self.data_view.clear()
-        
-        if not data:
-            self.data_view.setRowCount(0)
-            self.data_view.setColumnCount(0)
-            return
-        
-        # Configura tabela
-        self.data_view.setRowCount(len(data))
-        self.data_view.setColumnCount(2)
-        self.data_view.setHorizontalHeaderLabels(["Campo", "Valor"])
-        
-        # Preenche dados
-        for i, (key, value) in enumerate(data.items()):
-            key_item = QTableWidgetItem(str(key))
-            value_item = QTableWidgetItem(str(value))
-            
-            self.data_view.setItem(i, 0, key_item)
-            self.data_view.setItem(i, 1, value_item)
+        self.data_model.set_dataframe(pd.DataFrame({
+            "Campo": [str(key) for key in data.keys()],
+            "Valor": [str(value) for value in data.values()]
+        }))
+        self.data_stack.setCurrentWidget(self.data_view)
     
     def show_text_data(self, text):
-        """Mostra texto na tabela de visualização"""
-        self.data_view.clear()
-        self.data_view.setRowCount(1)
-        self.data_view.setColumnCount(1)
-        self.data_view.setHorizontalHeaderLabels(["Conteúdo"])
-        
-        item = QTableWidgetItem(text)
-        self.data_view.setItem(0, 0, item)
+        """Mostra texto no visualizador paginado"""
+        self.text_pager.set_text(text)
+        self.data_stack.setCurrentWidget(self.text_pager)
     
     def validate_data(self):
         """Valida os dados com o esquema selecionado"""
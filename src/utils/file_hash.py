@@ -0,0 +1,33 @@
+import functools
+import hashlib
+import mmap
+import os
+
+# Arquivos a partir deste tamanho são lidos por mapeamento em memória
+MMAP_THRESHOLD = 64 * 1024 * 1024
+
+def hash_file(file_path, algorithm='sha256', chunk_size=1024 * 1024, mmap_threshold=MMAP_THRESHOLD):
+    """Calcula o hash do conteúdo de um arquivo lendo-o em blocos
+    
+    Arquivos grandes são mapeados em memória e entregues ao hashlib sem cópias
+    intermediárias; os demais são lidos em blocos de chunk_size.
+    """
+    digest = hashlib.new(algorithm)
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if mmap_threshold is not None and size >= mmap_threshold:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped)
+        else:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+@functools.lru_cache(maxsize=4096)
+def _hash_file_version(file_path, size, mtime_ns, algorithm):
+    return hash_file(file_path, algorithm)
+
+def cached_hash_file(file_path, algorithm='sha256'):
+    """Hash do conteúdo, reaproveitado enquanto tamanho e data de modificação não mudarem"""
+    stat = os.stat(file_path)
+    return _hash_file_version(file_path, stat.st_size, stat.st_mtime_ns, algorithm)
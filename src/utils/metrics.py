@@ -0,0 +1,262 @@
+import os
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Limites padrão (em segundos) dos histogramas de latência
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+class _Metric:
+    """Base das métricas: valores indexados pela tupla de valores dos rótulos"""
+    
+    type_name = 'untyped'
+    
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+    
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Rótulos inválidos para {self.name}: esperado {self.labelnames}, recebido {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+    
+    def get(self, **labels):
+        """Valor atual da série com os rótulos informados"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+    
+    def _samples(self):
+        with self._lock:
+            return [(self.name, key, None, value) for key, value in sorted(self._values.items())]
+    
+    def render(self):
+        """Linhas no formato de texto do Prometheus"""
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.type_name}"]
+        for name, key, extra, value in self._samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return lines
+
+class Counter(_Metric):
+    """Contador que só aumenta"""
+    
+    type_name = 'counter'
+    
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Contadores não podem diminuir")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    """Valor que sobe e desce; pode ser calculado por uma função no momento da leitura"""
+    
+    type_name = 'gauge'
+    
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._functions = {}
+    
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+    
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+    
+    def set_function(self, fn, **labels):
+        """Lê o valor da série chamando fn a cada coleta"""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = fn
+    
+    def get(self, **labels):
+        key = self._key(labels)
+        with self._lock:
+            fn = self._functions.get(key)
+            if fn is None:
+                return self._values.get(key, 0)
+        return fn()
+    
+    def _samples(self):
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, fn in functions.items():
+            try:
+                values[key] = fn()
+            except Exception:
+                values.pop(key, None)
+        return [(self.name, key, None, value) for key, value in sorted(values.items())]
+
+class Histogram(_Metric):
+    """Distribuição de observações em faixas cumulativas, com soma e contagem"""
+    
+    type_name = 'histogram'
+    
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        if 'le' in self.labelnames:
+            raise ValueError("O rótulo 'le' é reservado em histogramas")
+        self.buckets = tuple(sorted(float(bucket) for bucket in buckets))
+        if not self.buckets or self.buckets[-1] != math.inf:
+            self.buckets += (math.inf,)
+    
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+    
+    def get(self, **labels):
+        """Retorna (contagem, soma) da série"""
+        with self._lock:
+            series = self._values.get(self._key(labels))
+            if series is None:
+                return 0, 0.0
+            return series['count'], series['sum']
+    
+    def _samples(self):
+        samples = []
+        with self._lock:
+            for key, series in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series['counts']):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", key, ('le', _format_value(bound)), cumulative))
+                samples.append((f"{self.name}_sum", key, None, series['sum']))
+                samples.append((f"{self.name}_count", key, None, series['count']))
+        return samples
+
+class MetricsRegistry:
+    """Conjunto de métricas exposto no formato de texto do Prometheus
+    
+    As métricas podem ser servidas por HTTP (start_server) enquanto um lote
+    longo é executado e gravadas em arquivo (write) ao final.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._server = None
+    
+    def _register(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Métrica {name} já registrada com outro tipo ou rótulos")
+            return metric
+    
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+    
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+    
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+    
+    def get_metric(self, name):
+        with self._lock:
+            return self._metrics.get(name)
+    
+    def render(self):
+        """Texto de todas as métricas no formato de exposição do Prometheus"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+    
+    def write(self, path):
+        """Grava as métricas em um arquivo (substituição atômica)"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(temp_path, path)
+        return path
+    
+    @property
+    def server(self):
+        """Servidor HTTP ativo, ou None"""
+        return self._server
+    
+    def start_server(self, port, host='127.0.0.1'):
+        """Serve as métricas em http://host:port/metrics numa thread em segundo plano"""
+        if self._server is not None:
+            return self._server
+        
+        registry = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                # Coletas periódicas não devem poluir o log
+                pass
+        
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+        self._server = server
+        return server
+    
+    def stop_server(self):
+        """Encerra o servidor HTTP, se estiver ativo"""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
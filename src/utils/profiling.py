@@ -0,0 +1,184 @@
+import os
+import pstats
+import cProfile
+import hashlib
+import threading
+import uuid
+import tracemalloc
+from .file_hash import cached_hash_file
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# Um documento perfilado por vez: o cProfile não admite perfis simultâneos em
+# algumas versões do Python e o tracemalloc é global ao processo
+_profile_lock = threading.Lock()
+
+def _function_label(key):
+    filename, line, function = key
+    if filename == '~':
+        return function
+    return f"{filename}:{line}({function})"
+
+def top_hotspots(stats, top_n=20):
+    """Funções com maior tempo próprio (tottime) em um pstats.Stats"""
+    entries = []
+    for key, (primitive_calls, calls, total_time, cumulative_time, _) in stats.stats.items():
+        entries.append({
+            'function': _function_label(key),
+            'calls': calls,
+            'total_time': total_time,
+            'cumulative_time': cumulative_time
+        })
+    entries.sort(key=lambda entry: entry['total_time'], reverse=True)
+    return entries[:top_n]
+
+def top_allocations(snapshot, top_n=20):
+    """Linhas de código com mais memória alocada em um snapshot do tracemalloc"""
+    return [
+        {
+            'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            'size_kb': stat.size / 1024,
+            'count': stat.count
+        }
+        for stat in snapshot.statistics('lineno')[:top_n]
+    ]
+
+def summarize_profiles(results, top_n=20):
+    """Agrega os perfis dos documentos de um lote para o relatório
+    
+    Os arquivos .prof são combinados com pstats; as alocações somam as
+    listas de cada documento.
+    """
+    profiles = [result['profile'] for result in results if isinstance(result.get('profile'), dict)]
+    if not profiles:
+        return None
+    
+    summary = {'profiled_documents': len(profiles)}
+    
+    profile_paths = [profile['profile_path'] for profile in profiles
+                     if profile.get('profile_path') and os.path.exists(profile['profile_path'])]
+    if profile_paths:
+        try:
+            summary['hotspots'] = top_hotspots(pstats.Stats(*profile_paths), top_n)
+        except Exception as e:
+            logger.error(f"Erro ao combinar perfis: {str(e)}")
+    
+    allocations = {}
+    for profile in profiles:
+        for entry in profile.get('allocations') or []:
+            total = allocations.setdefault(entry['location'], {'location': entry['location'], 'size_kb': 0.0, 'count': 0})
+            total['size_kb'] += entry['size_kb']
+            total['count'] += entry['count']
+    summary['allocations'] = sorted(allocations.values(), key=lambda entry: entry['size_kb'], reverse=True)[:top_n]
+    
+    return summary
+
+class DocumentProfiler:
+    """Perfila o processamento de documentos amostrados com cProfile e tracemalloc
+    
+    A amostragem é determinística (pelo caminho do arquivo), então a mesma
+    fração de documentos é perfilada a cada execução. Para cada documento
+    perfilado são gravados <hash>.prof (abrir com pstats ou snakeviz) e
+    <hash>.tracemalloc (tracemalloc.Snapshot.load), onde hash é o sha256 do
+    conteúdo do PDF.
+    
+    Um documento é perfilado por vez; try_profile não espera o anterior
+    terminar. O cProfile mede apenas a thread do documento (perfis gravados
+    em processos auxiliares são juntados com merge_worker_profiles); o
+    tracemalloc é global ao processo, então alocações de outras threads
+    também aparecem no snapshot.
+    """
+    
+    def __init__(self, output_dir, sample_rate=1.0, top_n=20, traceback_frames=1):
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.top_n = top_n
+        self.traceback_frames = traceback_frames
+        os.makedirs(output_dir, exist_ok=True)
+    
+    def should_profile(self, pdf_path):
+        """Indica se o documento faz parte da amostra"""
+        if self.sample_rate >= 1:
+            return True
+        if self.sample_rate <= 0:
+            return False
+        digest = hashlib.blake2b(os.path.abspath(pdf_path).encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big') / 2 ** 64 < self.sample_rate
+    
+    def profile(self, pdf_path, fn, *args, **kwargs):
+        """Executa fn(pdf_path, *args, **kwargs) sob cProfile e tracemalloc
+        
+        Retorna (resultado de fn, informações do perfil).
+        """
+        with _profile_lock:
+            return self._profile_locked(pdf_path, fn, *args, **kwargs)
+    
+    def try_profile(self, pdf_path, fn, *args, **kwargs):
+        """Como profile, mas retorna None sem executar fn se outro documento estiver sendo perfilado"""
+        if not _profile_lock.acquire(blocking=False):
+            return None
+        try:
+            return self._profile_locked(pdf_path, fn, *args, **kwargs)
+        finally:
+            _profile_lock.release()
+    
+    def worker_profile_path(self):
+        """Caminho para o perfil de uma tarefa executada em um processo auxiliar"""
+        return os.path.join(self.output_dir, f"worker_{uuid.uuid4().hex}.prof")
+    
+    def merge_worker_profiles(self, info, worker_paths):
+        """Junta ao perfil do documento os perfis gravados pelos processos auxiliares
+        
+        O arquivo .prof do documento passa a conter as funções executadas nos
+        processos auxiliares, e os hotspots são recalculados.
+        """
+        worker_paths = [path for path in worker_paths if os.path.exists(path)]
+        if not worker_paths:
+            return info
+        try:
+            stats = pstats.Stats(*worker_paths)
+            if info.get('profile_path') and os.path.exists(info['profile_path']):
+                stats.add(info['profile_path'])
+                stats.dump_stats(info['profile_path'])
+            info['hotspots'] = top_hotspots(stats, self.top_n)
+        except Exception as e:
+            logger.error(f"Erro ao juntar os perfis dos processos auxiliares: {str(e)}")
+        finally:
+            for path in worker_paths:
+                os.remove(path)
+        return info
+    
+    def _profile_locked(self, pdf_path, fn, *args, **kwargs):
+        profiler = cProfile.Profile()
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(self.traceback_frames)
+        elif hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        try:
+            profiler.enable()
+            try:
+                result = fn(pdf_path, *args, **kwargs)
+            finally:
+                profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            if started:
+                tracemalloc.stop()
+    
+        info = {'peak_memory_kb': peak / 1024}
+        try:
+            content_hash = cached_hash_file(pdf_path)
+            info['content_hash'] = content_hash
+            info['profile_path'] = os.path.join(self.output_dir, f"{content_hash}.prof")
+            info['snapshot_path'] = os.path.join(self.output_dir, f"{content_hash}.tracemalloc")
+            profiler.dump_stats(info['profile_path'])
+            snapshot.dump(info['snapshot_path'])
+        except Exception as e:
+            logger.error(f"Erro ao gravar o perfil de {pdf_path}: {str(e)}")
+        
+        info['hotspots'] = top_hotspots(pstats.Stats(profiler), self.top_n)
+        info['allocations'] = top_allocations(snapshot, self.top_n)
+        return result, info
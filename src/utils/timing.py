@@ -0,0 +1,34 @@
+import time
+from contextlib import contextmanager
+
+class StageTimer:
+    """Acumula o tempo (time.perf_counter) gasto em cada etapa de um processamento"""
+    
+    def __init__(self):
+        self.timings = {}
+        self.samples = {}
+        self._start = time.perf_counter()
+    
+    @contextmanager
+    def stage(self, name):
+        """Mede o bloco como uma ocorrência da etapa name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+    
+    def add(self, name, seconds, sample=False):
+        """Soma seconds à etapa; com sample=True guarda também a medida individual"""
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+        if sample:
+            self.samples.setdefault(name, []).append(seconds)
+    
+    def merge(self, timings):
+        """Soma os tempos de outro dicionário de etapas"""
+        for name, seconds in (timings or {}).items():
+            self.add(name, seconds)
+    
+    def elapsed(self):
+        """Tempo total desde a criação do timer"""
+        return time.perf_counter() - self._start
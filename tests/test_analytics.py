@@ -1,7 +1,9 @@
 # test_analytics.py
 import unittest
 import os
+import shutil
 import tempfile
+import threading
 import json
 from datetime import datetime, timedelta
 from src.core.analytics import DataAnalytics
@@ -17,9 +19,8 @@ class TestDataAnalytics(unittest.TestCase):
 
     def tearDown(self):
         # Limpar arquivos temporários
-        for file in os.listdir(self.temp_dir):
-            os.remove(os.path.join(self.temp_dir, file))
-        os.rmdir(self.temp_dir)
+        self.analytics.store.close()
+        shutil.rmtree(self.temp_dir)
 
     def create_test_data(self):
         # Criar alguns registros de teste
@@ -143,6 +144,123 @@ class TestDataAnalytics(unittest.TestCase):
         invoice_confidence = self.analytics.get_avg_confidence(doc_type="invoice")
         self.assertEqual(invoice_confidence, 0.85)  # Apenas uma fatura com confiança
 
+    def test_get_document_count_by_date(self):
+        counts = self.analytics.get_document_count_by_date()
+        self.assertEqual(counts['count'].tolist(), [3, 2])  # ontem, hoje
+        self.assertTrue(counts['date'].is_monotonic_increasing)
+
+    def test_get_document_count_by_type(self):
+        counts = self.analytics.get_document_count_by_type()
+        self.assertEqual(dict(zip(counts['doc_type'], counts['count'])), {'invoice': 2, 'other': 2, 'receipt': 1})
+
+    def test_frame_is_sorted_by_timestamp(self):
+        frame = self.analytics.get_frame()
+        self.assertTrue(frame.index.is_monotonic_increasing)
+        self.assertEqual(str(frame['doc_type'].dtype), 'category')
+        self.assertEqual(frame['success'].dtype, bool)
+
+    def test_frame_stays_sorted_across_refreshes(self):
+        base = datetime.now() + timedelta(days=1)
+        self.analytics.get_frame()
+        
+        # Registros mais recentes são anexados; um registro atrasado e um sem data também entram
+        for i, offset in enumerate([2, 3, -5, None, 1]):
+            timestamp = (base + timedelta(hours=offset)).isoformat() if offset is not None else "sem data"
+            self.analytics.log_processing_result({"pdf_path": f"/path/to/late_{i}.pdf", "doc_type": "invoice",
+                                                  "success": True, "timestamp": timestamp})
+            frame = self.analytics.get_frame()
+        
+        self.assertEqual(len(frame), 10)
+        dated = frame.iloc[:self.analytics._n_dated]
+        self.assertTrue(dated.index.is_monotonic_increasing)
+        self.assertEqual(self.analytics._n_dated, 9)
+        self.assertTrue(frame.index[9:].isna().all())
+        self.assertEqual(str(frame['doc_type'].dtype), 'category')
+    
+    def test_frame_and_rollups_agree_on_the_day(self):
+        # 23h30 em UTC-3 já é o dia seguinte em UTC
+        self.analytics.log_processing_result({"pdf_path": "/path/to/tz.pdf", "doc_type": "tz", "success": True,
+                                              "timestamp": "2024-03-10T23:30:00-03:00"})
+        
+        day = datetime(2024, 3, 11)
+        summary = self.analytics.get_rollup_summary(start_date=day, end_date=day + timedelta(hours=23), doc_type="tz")
+        self.assertEqual(summary['total'], 1)
+        frame = self.analytics.get_filtered_data(start_date=day, end_date=day + timedelta(hours=23), doc_type="tz")
+        self.assertEqual(len(frame), 1)
+
+    def test_get_rollup_summary(self):
+        summary = self.analytics.get_rollup_summary()
+        
+        self.assertEqual(summary['total'], 5)
+        self.assertEqual(summary['success_rate'], 80.0)
+        self.assertAlmostEqual(summary['avg_confidence'], 0.7375)
+        self.assertAlmostEqual(summary['avg_processing_time'], (1.5 + 0.8 + 2.1) / 3)
+        self.assertEqual(summary['today_count'], 2)
+        self.assertEqual(summary['by_day'].tolist(), [3, 2])
+        self.assertEqual(summary['by_type']['invoice'], 2)
+        self.assertEqual(summary['top_errors'], [('Failed to extract data', 1)])
+        
+        # Filtro por período usa dias inteiros
+        today = datetime.now()
+        summary = self.analytics.get_rollup_summary(start_date=today, doc_type="invoice")
+        self.assertEqual(summary['total'], 1)
+
+    def test_rollups_updated_on_log(self):
+        self.analytics.log_processing_result({
+            "pdf_path": "/path/to/new.pdf",
+            "doc_type": "invoice",
+            "success": False,
+            "error": "Failed to extract data"
+        })
+        
+        summary = self.analytics.get_rollup_summary(doc_type="invoice")
+        self.assertEqual(summary['total'], 3)
+        self.assertEqual(summary['top_errors'], [('Failed to extract data', 2)])
+
+    def test_error_sketch_keeps_frequent_errors(self):
+        from src.core.analytics import ErrorSketch
+        sketch = ErrorSketch(capacity=2)
+        for error in ['a', 'a', 'a', 'b', 'c', 'a', 'd']:
+            sketch.add(error)
+        
+        self.assertEqual(len(sketch.counts), 2)
+        self.assertEqual(sketch.top(1), [('a', 4)])
+
+    def test_query_cache(self):
+        first = self.analytics.get_rollup_summary(doc_type="invoice")
+        hits = self.analytics.cache_hits
+        
+        # Mesma consulta: resultado memorizado
+        self.assertIs(self.analytics.get_rollup_summary(doc_type="invoice"), first)
+        self.assertEqual(self.analytics.cache_hits, hits + 1)
+        
+        # Uma nova gravação invalida o cache
+        self.analytics.log_processing_result({"doc_type": "invoice", "success": True})
+        second = self.analytics.get_rollup_summary(doc_type="invoice")
+        self.assertIsNot(second, first)
+        self.assertEqual(second['total'], 3)
+
+    def test_query_cache_is_bounded(self):
+        self.analytics.query_cache_size = 2
+        for doc_type in ["invoice", "receipt", "other"]:
+            self.analytics.get_success_rate(doc_type=doc_type)
+        
+        self.assertEqual(len(self.analytics._query_cache), 2)
+
+    def test_dashboard_snapshot_from_thread(self):
+        snapshots = []
+        worker = threading.Thread(
+            target=lambda: snapshots.append(self.analytics.get_dashboard_snapshot(doc_type="invoice"))
+        )
+        worker.start()
+        self.analytics.log_processing_result({"doc_type": "invoice", "success": True})
+        worker.join()
+
+        snapshot = snapshots[0]
+        self.assertIn(snapshot['summary']['total'], (2, 3))
+        self.assertEqual(len(snapshot['recent']), snapshot['summary']['total'])
+        self.assertLessEqual(snapshot['data_version'], self.analytics.data_version)
+
     def test_log_processing_result(self):
         # Registrar um novo resultado
         new_result = {
@@ -152,18 +270,40 @@ class TestDataAnalytics(unittest.TestCase):
             "confidence": 0.90
         }
         
-        log_path = self.analytics.log_processing_result(new_result)
+        record_id = self.analytics.log_processing_result(new_result)
         
-        self.assertIsNotNone(log_path)
-        self.assertTrue(os.path.exists(log_path))
+        self.assertIsNotNone(record_id)
         
         # Verificar se foi adicionado aos dados
         self.assertEqual(len(self.analytics.data), 6)
         
-        # Verificar se o timestamp foi adicionado
-        with open(log_path, 'r', encoding='utf-8') as f:
-            saved_data = json.load(f)
-            self.assertIn('timestamp', saved_data)
+        # Verificar se o timestamp foi adicionado e se nenhum arquivo JSON foi criado
+        self.assertIn('timestamp', self.analytics.data[-1])
+        self.assertEqual(self.analytics.store.count(), 6)
+        self.assertFalse([f for f in os.listdir(self.temp_dir) if f.endswith('.json')])
+
+    def test_legacy_files_imported_once(self):
+        # Os arquivos JSON antigos foram movidos após a importação
+        self.assertEqual(len(os.listdir(os.path.join(self.temp_dir, 'imported'))), 4)
+        
+        self.analytics.load_data()
+        self.assertEqual(len(self.analytics.data), 5)
+        self.assertEqual(self.analytics.store.count(), 5)
+
+    def test_refresh_data_reads_only_new_rows(self):
+        # Outro processo grava no mesmo diretório de analytics
+        other = DataAnalytics(self.temp_dir)
+        other.log_batch_results([
+            {"pdf_path": "/path/to/a.pdf", "doc_type": "invoice", "success": True},
+            {"pdf_path": "/path/to/b.pdf", "doc_type": "invoice", "success": False}
+        ])
+        other.store.close()
+        
+        first_record = self.analytics.data[0]
+        self.analytics.refresh_data()
+        
+        self.assertEqual(len(self.analytics.data), 7)
+        self.assertIs(self.analytics.data[0], first_record)
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
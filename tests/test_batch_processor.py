@@ -2,8 +2,15 @@
 import unittest
 import os
 import tempfile
+import threading
+import time
+import shutil
+import cProfile
 from unittest.mock import patch, MagicMock
 from src.core.batch_processor import BatchProcessor
+from src.core.isolation import _profile_in_worker, _extract_in_worker
+from src.utils.profiling import _profile_lock
+from src.core.cancellation import CancellationToken, BatchCancelled
 
 class TestBatchProcessor(unittest.TestCase):
 
@@ -58,6 +65,26 @@ class TestBatchProcessor(unittest.TestCase):
         pdfs = self.batch_processor.find_pdfs("invalid_path")
         self.assertEqual(len(pdfs), 0)
 
+    def test_iter_pdfs_filters(self):
+        base = self.config['download_dir']
+        os.makedirs(os.path.join(base, 'sub', 'tmp'))
+        open(os.path.join(base, 'sub', 'UPPER.PDF'), 'wb').close()
+        open(os.path.join(base, 'sub', 'tmp', 'skip.pdf'), 'wb').close()
+        open(os.path.join(base, 'sub', 'notes.txt'), 'wb').close()
+        
+        # Extensão sem diferenciar maiúsculas
+        names = sorted(os.path.basename(p) for p in self.batch_processor.iter_pdfs(base))
+        self.assertEqual(names, ['UPPER.PDF', 'skip.pdf', 'test_0.pdf', 'test_1.pdf', 'test_2.pdf'])
+        
+        # Diretório excluído não é percorrido
+        names = sorted(os.path.basename(p) for p in self.batch_processor.iter_pdfs(base, exclude=['tmp']))
+        self.assertNotIn('skip.pdf', names)
+        self.assertEqual(len(names), 4)
+        
+        # Padrões de inclusão pelo caminho relativo
+        names = sorted(os.path.basename(p) for p in self.batch_processor.iter_pdfs(base, include=['sub/*']))
+        self.assertEqual(names, ['UPPER.PDF', 'skip.pdf'])
+
     @patch('src.core.extractor.PDFExtractor.extract_data')
     @patch('src.core.document_classifier.DocumentClassifier.classify_document')
     def test_process_pdf(self, mock_classify, mock_extract):
@@ -75,6 +102,26 @@ class TestBatchProcessor(unittest.TestCase):
         self.assertEqual(result['confidence'], 0.8)
         mock_classify.assert_called_once_with(pdf_path)
         mock_extract.assert_called_once()
+        
+        # Instrumentação por etapa
+        self.assertTrue(result['success'])
+        self.assertIn('classify', result['stage_timings'])
+        self.assertIn('extract', result['stage_timings'])
+        self.assertIn('export', result['stage_timings'])
+        self.assertGreaterEqual(result['processing_time'], sum(result['stage_timings'].values()) - 1e-6)
+        self.assertEqual(result['bytes_read'], os.path.getsize(pdf_path))
+
+    @patch('src.core.extractor.PDFExtractor.extract_data')
+    def test_process_pdf_failure_result(self, mock_extract):
+        mock_extract.side_effect = RuntimeError("arquivo corrompido")
+
+        pdf_path = os.path.join(self.config['download_dir'], "test_0.pdf")
+        result = self.batch_processor.process_pdf(pdf_path, "text", {}, "csv")
+
+        self.assertFalse(result['success'])
+        self.assertIsNone(result['export_path'])
+        self.assertEqual(result['error'], "arquivo corrompido")
+        self.assertIn('extract', result['stage_timings'])
 
     @patch('src.core.batch_processor.BatchProcessor.process_pdf')
     def test_process_batch(self, mock_process_pdf):
@@ -94,6 +141,515 @@ class TestBatchProcessor(unittest.TestCase):
         mock_process_pdf.assert_called()
         self.assertEqual(mock_process_pdf.call_count, 3)
 
+    @patch('src.core.batch_processor.BatchProcessor.process_pdf')
+    def test_process_downloads(self, mock_process_pdf):
+        mock_process_pdf.side_effect = lambda pdf, *args: {
+            'pdf_path': pdf, 'export_path': pdf + '.csv', 'doc_type': 'invoice', 'confidence': 0.9, 'success': True
+        }
+        pdfs = sorted(self.batch_processor.find_pdfs(self.config['download_dir']))
+        consumed = []
+        
+        def iter_downloads(urls, cancel_token=None):
+            for i, url in enumerate(urls):
+                consumed.append(url)
+                yield url, pdfs[i] if i < len(pdfs) else None
+        
+        downloader = MagicMock()
+        downloader.iter_downloads.side_effect = iter_downloads
+        urls = [f"https://example.com/nota_{i}.pdf" for i in range(4)]
+        
+        results = self.batch_processor.process_downloads(urls, 'text', downloader=downloader)
+        
+        self.assertEqual(len(consumed), 4)
+        self.assertEqual(sorted(result['pdf_path'] for result in results if result['success']), pdfs)
+        failed = [result for result in results if not result['success']]
+        self.assertEqual(len(failed), 1)
+        self.assertEqual(failed[0]['pdf_path'], urls[3])
+        self.assertEqual(failed[0]['error_class'], 'download_failed')
+
+    @patch('src.core.batch_processor.PDFDownloader')
+    @patch('src.core.batch_processor.BatchProcessor.process_pdf')
+    def test_process_downloads_reports_cancelled_urls(self, mock_process_pdf, mock_downloader_class):
+        mock_process_pdf.side_effect = lambda pdf, *args: {
+            'pdf_path': pdf, 'export_path': pdf + '.csv', 'success': True
+        }
+        pdfs = sorted(self.batch_processor.find_pdfs(self.config['download_dir']))
+        token = CancellationToken()
+        
+        def iter_downloads(urls, cancel_token=None):
+            # O lote é cancelado depois do primeiro download
+            yield urls[0], pdfs[0]
+            token.cancel()
+        
+        downloader = mock_downloader_class.return_value.__enter__.return_value
+        downloader.iter_downloads.side_effect = iter_downloads
+        urls = [f"https://example.com/nota_{i}.pdf" for i in range(3)]
+        
+        results = self.batch_processor.process_downloads(urls, 'text', cancel_token=token)
+        
+        # O downloader criado por process_downloads é fechado
+        mock_downloader_class.return_value.__exit__.assert_called_once()
+        cancelled = sorted(result['pdf_path'] for result in results if result.get('error_class') == 'cancelled')
+        self.assertEqual(cancelled, urls[1:])
+        self.assertEqual([result['pdf_path'] for result in results if result['success']], pdfs[:1])
+
+    @patch('src.core.batch_processor.BatchProcessor.process_pdf')
+    def test_process_batch_accepts_iterable(self, mock_process_pdf):
+        mock_process_pdf.side_effect = lambda pdf, *args: {
+            'pdf_path': pdf, 'export_path': pdf + '.csv', 'doc_type': 'invoice', 'confidence': 0.9, 'success': True
+        }
+        pdfs = self.batch_processor.find_pdfs(self.config['download_dir'])[:2]
+        
+        results = self.batch_processor.process_batch(iter(pdfs), 'text')
+        
+        self.assertEqual(sorted(result['pdf_path'] for result in results), sorted(pdfs))
+
+    @patch('src.core.batch_processor.BatchProcessor.process_pdf')
+    def test_process_batch_writes_metrics(self, mock_process_pdf):
+        metrics_file = os.path.join(self.temp_dir, 'metrics.prom')
+        self.batch_processor.config['metrics_file'] = metrics_file
+        mock_process_pdf.side_effect = lambda pdf, *args: {
+            'pdf_path': pdf, 'export_path': 'out.csv', 'success': True,
+            'pages_processed': 2, 'stage_timings': {'extract': 0.2}, 'processing_time': 0.3
+        }
+
+        self.batch_processor.process_batch(self.config['download_dir'], "text", None, "csv")
+
+        with open(metrics_file) as f:
+            text = f.read()
+        self.assertIn('pdf_extractor_documents_total{method="text",status="success"} 3', text)
+        self.assertIn('pdf_extractor_pages_total{method="text",status="success"} 6', text)
+        self.assertIn('pdf_extractor_stage_seconds_count{stage="extract"} 3', text)
+        self.assertIn("pdf_extractor_in_flight_jobs 0", text)
+
+    @patch('src.core.batch_processor.BatchProcessor.process_pdf')
+    def test_process_batch_stops_its_metrics_server(self, mock_process_pdf):
+        import socket
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.batch_processor.config['metrics_port'] = sock.getsockname()[1]
+        servers = []
+
+        def process_pdf(pdf, *args):
+            servers.append(self.batch_processor.metrics.server)
+            return {'pdf_path': pdf, 'export_path': 'out.csv', 'success': True}
+
+        mock_process_pdf.side_effect = process_pdf
+
+        self.batch_processor.process_batch(self.config['download_dir'], "text", None, "csv")
+
+        # O servidor fica ativo durante o lote e é encerrado ao final
+        self.assertIsNotNone(servers[0])
+        self.assertIsNone(self.batch_processor.metrics.server)
+
+        # Um servidor iniciado por quem chamou continua ativo
+        server = self.batch_processor.start_metrics_server()
+        try:
+            self.batch_processor.process_batch(self.config['download_dir'], "text", None, "csv")
+            self.assertIs(self.batch_processor.metrics.server, server)
+        finally:
+            self.batch_processor.metrics.stop_server()
+
+    @patch('src.core.batch_processor.BatchProcessor.process_pdf')
+    def test_process_batch_profiles_sampled_documents(self, mock_process_pdf):
+        self.batch_processor.config['profile_sample_rate'] = 1.0
+        self.batch_processor.config['profile_dir'] = os.path.join(self.temp_dir, 'profiles')
+        self.batch_processor.profiler = self.batch_processor.create_profiler()
+        # Um documento por vez, para que nenhum seja processado sem perfil
+        self.batch_processor.max_in_flight = 1
+        mock_process_pdf.side_effect = lambda pdf, *args: {'pdf_path': pdf, 'export_path': 'out.csv'}
+
+        results = self.batch_processor.process_batch(self.config['download_dir'], "text", None, "csv")
+
+        self.assertTrue(all('profile' in result for result in results))
+        report = self.batch_processor.generate_batch_report(results)
+        self.assertEqual(report['stats']['profiling']['profiled_documents'], 3)
+        self.assertIn('hotspots', report['stats']['profiling'])
+
+    @patch('src.core.batch_processor.count_pages')
+    @patch('src.core.extractor.PDFExtractor.extract_data')
+    @patch('src.core.document_classifier.DocumentClassifier.classify_document')
+    def test_profiled_document_runs_in_profiled_thread(self, mock_classify, mock_extract, mock_count_pages):
+        self.batch_processor.config['profile_sample_rate'] = 1.0
+        self.batch_processor.config['profile_dir'] = os.path.join(self.temp_dir, 'profiles')
+        self.batch_processor.profiler = self.batch_processor.create_profiler()
+        self.batch_processor.split_pages = 1
+        mock_classify.return_value = ("invoice", 0.8)
+        mock_count_pages.return_value = 5
+        mock_extract.return_value = {'page_1': "texto", '_metadata': {}}
+
+        pdf_path = os.path.join(self.config['download_dir'], "test_0.pdf")
+        result = self.batch_processor.profiled_process_pdf(pdf_path, "text", {}, "json")
+
+        # Sem pool nem intervalos de páginas, o cProfile da thread vê a extração
+        self.assertTrue(result['success'])
+        mock_extract.assert_called_once_with(pdf_path, "text", 'all', {})
+        self.assertIn('profile', result)
+
+    @patch('src.core.batch_processor.count_pages')
+    def test_profiled_document_keeps_isolated_pool(self, mock_count_pages):
+        self.batch_processor.config['profile_sample_rate'] = 1.0
+        self.batch_processor.config['profile_dir'] = os.path.join(self.temp_dir, 'profiles')
+        self.batch_processor.profiler = self.batch_processor.create_profiler()
+        self.batch_processor.split_pages = 1
+        mock_count_pages.return_value = 5
+
+        # Perfil que o processo auxiliar gravaria
+        worker_stats = os.path.join(self.temp_dir, 'worker.prof')
+        profiler = cProfile.Profile()
+        profiler.runcall(sorted, range(1000000), key=abs)
+        profiler.dump_stats(worker_stats)
+
+        def run(fn, *args, stage, deadline=None):
+            self.assertIs(fn, _profile_in_worker)
+            shutil.copy(worker_stats, args[0])
+            if stage == 'classify':
+                return ("invoice", 0.8)
+            return {'page_1': "texto", '_metadata': {}}
+
+        pool = MagicMock()
+        pool.run.side_effect = run
+        self.batch_processor.isolated_pool = pool
+        self.batch_processor.document_timeout = 60
+
+        pdf_path = os.path.join(self.config['download_dir'], "test_0.pdf")
+        result = self.batch_processor.profiled_process_pdf(pdf_path, "text", {}, "json")
+
+        # Classificação e extração rodam no pool, com tempo limite e sem divisão em intervalos
+        self.assertTrue(result['success'])
+        self.assertEqual([call.kwargs['stage'] for call in pool.run.call_args_list], ['classify', 'extract'])
+        self.assertTrue(all(call.kwargs['deadline'] is not None for call in pool.run.call_args_list))
+        self.assertEqual(pool.run.call_args_list[1].args[2:], (_extract_in_worker, pdf_path, "text", 'all', {}))
+
+        # Os perfis dos processos auxiliares são juntados ao do documento e removidos
+        functions = [entry['function'] for entry in result['profile']['hotspots']]
+        self.assertTrue(any('sorted' in function for function in functions))
+        self.assertEqual([name for name in os.listdir(self.config['profile_dir']) if name.startswith('worker_')], [])
+
+        # Documentos não perfilados chamam as funções do pool diretamente
+        pool.run.reset_mock(side_effect=True)
+        self.batch_processor.classify_document(pdf_path)
+        self.assertIsNot(pool.run.call_args.args[0], _profile_in_worker)
+
+    @patch('src.core.batch_processor.BatchProcessor.process_pdf')
+    def test_profiled_document_does_not_wait_for_profile_lock(self, mock_process_pdf):
+        self.batch_processor.config['profile_sample_rate'] = 1.0
+        self.batch_processor.config['profile_dir'] = os.path.join(self.temp_dir, 'profiles')
+        self.batch_processor.profiler = self.batch_processor.create_profiler()
+        mock_process_pdf.return_value = {'success': True}
+
+        pdf_path = os.path.join(self.config['download_dir'], "test_0.pdf")
+        with _profile_lock:
+            result = self.batch_processor.profiled_process_pdf(pdf_path, "text", {}, "json")
+
+        # Outro documento sendo perfilado: processa sem perfil em vez de esperar
+        self.assertNotIn('profile', result)
+        mock_process_pdf.assert_called_once_with(pdf_path, "text", {}, "json")
+
+    @patch('src.core.batch_processor.BatchProcessor.process_pdf')
+    def test_process_batch_bounded_window(self, mock_process_pdf):
+        self.batch_processor.max_in_flight = 1
+        lock = threading.Lock()
+        running = []
+        max_running = []
+
+        def fake_process(pdf, *args):
+            with lock:
+                running.append(pdf)
+                max_running.append(len(running))
+            time.sleep(0.01)
+            with lock:
+                running.remove(pdf)
+            return {'pdf_path': pdf, 'export_path': 'out.csv'}
+
+        mock_process_pdf.side_effect = fake_process
+
+        results = self.batch_processor.process_batch(self.config['download_dir'], "text", None, "csv")
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(max(max_running), 1)
+
+    @patch('src.core.batch_processor.BatchProcessor.process_pdf')
+    def test_process_batch_adaptive_concurrency(self, mock_process_pdf):
+        self.batch_processor.config.update({
+            'adaptive_concurrency': True,
+            'concurrency_min': 1,
+            'concurrency_max': 4,
+            'concurrency_weights': {'ocr': 4}
+        })
+        self.batch_processor.max_workers = 4
+        lock = threading.Lock()
+        running = []
+        max_running = []
+
+        def fake_process(pdf, *args):
+            with lock:
+                running.append(pdf)
+                max_running.append(len(running))
+            time.sleep(0.01)
+            with lock:
+                running.remove(pdf)
+            return {'pdf_path': pdf, 'export_path': 'out.csv'}
+
+        mock_process_pdf.side_effect = fake_process
+
+        # Um documento de OCR consome todo o orçamento de 4 unidades
+        results = self.batch_processor.process_batch(self.config['download_dir'], "ocr", None, "csv")
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(max(max_running), 1)
+
+    @patch('src.core.batch_processor.BatchProcessor.process_pdf')
+    def test_process_batch_cancel(self, mock_process_pdf):
+        self.batch_processor.max_in_flight = 1
+        token = CancellationToken()
+
+        def fake_process(pdf, *args):
+            token.cancel()
+            return {'pdf_path': pdf, 'export_path': 'out.csv'}
+
+        mock_process_pdf.side_effect = fake_process
+
+        results = self.batch_processor.process_batch(
+            self.config['download_dir'], "text", None, "csv", cancel_token=token
+        )
+
+        # Nenhum arquivo é submetido após o cancelamento
+        self.assertEqual(len(results), 1)
+        self.assertEqual(mock_process_pdf.call_count, 1)
+
+    @patch('src.core.extractor.PDFExtractor.extract_data')
+    def test_process_pdf_cancelled(self, mock_extract):
+        token = CancellationToken()
+        token.cancel()
+
+        pdf_path = os.path.join(self.config['download_dir'], "test_0.pdf")
+        with self.assertRaises(BatchCancelled):
+            self.batch_processor.process_pdf(pdf_path, "text", {}, "csv", cancel_token=token)
+
+        mock_extract.assert_not_called()
+
+    @patch('src.core.batch_processor.BatchProcessor.process_pdf')
+    def test_process_batch_resumes_from_journal(self, mock_process_pdf):
+        self.batch_processor.config['journal_path'] = os.path.join(self.temp_dir, 'journal.db')
+        failing = os.path.join(self.config['download_dir'], "test_2.pdf")
+
+        def fake_process(pdf, *args):
+            if pdf == failing:
+                return None
+            return {'pdf_path': pdf, 'export_path': 'out.csv'}
+
+        mock_process_pdf.side_effect = fake_process
+
+        results = self.batch_processor.process_batch(self.config['download_dir'], "text", None, "csv")
+        self.assertEqual(len(results), 2)
+        self.assertEqual(mock_process_pdf.call_count, 3)
+
+        # Nova execução: só o arquivo que falhou é repetido
+        mock_process_pdf.reset_mock()
+        self.batch_processor.process_batch(self.config['download_dir'], "text", None, "csv")
+        self.assertEqual(mock_process_pdf.call_count, 1)
+        self.assertEqual(mock_process_pdf.call_args[0][0], failing)
+
+    @patch('src.core.batch_processor.BatchProcessor.process_pdf')
+    def test_journal_waits_for_sink_commit(self, mock_process_pdf):
+        from src.core.job_journal import JobJournal
+        self.batch_processor.config['journal_path'] = os.path.join(self.temp_dir, 'journal.db')
+        self.batch_processor.config['batch_db_path'] = os.path.join(self.temp_dir, 'batch.db')
+        statuses = {}
+
+        def fake_process(pdf, method, template, export_format, sink, cancel_token):
+            export_path = sink.write(pdf, {'page_1': "texto"}, 'invoice', 0.9)
+            # Gravado no destino, mas ainda não confirmado
+            with JobJournal(self.batch_processor.config['journal_path']) as journal:
+                statuses[pdf] = journal.get(pdf)['status']
+            return {'pdf_path': pdf, 'export_path': export_path, 'success': True}
+
+        mock_process_pdf.side_effect = fake_process
+
+        results = self.batch_processor.process_batch(self.config['download_dir'], "text", None, "sql")
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(set(statuses.values()), {'running'})
+        with JobJournal(self.batch_processor.config['journal_path']) as journal:
+            self.assertEqual(journal.counts(), {'done': 3})
+            self.assertEqual(journal.get(results[0]['pdf_path'])['output_path'],
+                             self.batch_processor.config['batch_db_path'])
+
+    def test_process_journaled_defers_finish_with_sink(self):
+        journal = MagicMock()
+        pdf_path = os.path.join(self.config['download_dir'], "test_0.pdf")
+        with patch.object(self.batch_processor, 'process_pdf', return_value={'pdf_path': pdf_path, 'success': True}):
+            self.batch_processor.process_journaled(journal, pdf_path, "text", None, "sql", MagicMock(), None)
+        journal.start.assert_called_once_with(pdf_path)
+        journal.finish.assert_not_called()
+
+    @patch('src.core.batch_processor.BatchProcessor.process_pdf')
+    def test_process_batch_deduplicates(self, mock_process_pdf):
+        # Os três PDFs de teste têm o mesmo conteúdo
+        self.batch_processor.config['deduplicate'] = True
+        mock_process_pdf.side_effect = lambda pdf, *args: {'pdf_path': pdf, 'export_path': 'out.csv'}
+
+        results = self.batch_processor.process_batch(self.config['download_dir'], "text", None, "csv")
+
+        self.assertEqual(mock_process_pdf.call_count, 1)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(len({result['pdf_path'] for result in results}), 3)
+
+        report = self.batch_processor.generate_batch_report(results)
+        self.assertEqual(report['stats']['duplicates'], 2)
+
+    @patch('src.core.batch_processor.BatchProcessor.process_pdf')
+    def test_duplicates_of_failed_original_are_reported(self, mock_process_pdf):
+        from src.core.job_journal import JobJournal
+        self.batch_processor.config['deduplicate'] = True
+        self.batch_processor.config['journal_path'] = os.path.join(self.temp_dir, 'journal.db')
+        mock_process_pdf.side_effect = lambda pdf, *args: {
+            'pdf_path': pdf, 'export_path': None, 'success': False, 'error': "sem dados", 'error_class': 'no_data'
+        }
+
+        results = self.batch_processor.process_batch(self.config['download_dir'], "text", None, "csv")
+
+        self.assertEqual(mock_process_pdf.call_count, 1)
+        self.assertEqual(len(results), 3)
+        duplicates = [result for result in results if result.get('duplicate_of')]
+        self.assertEqual(len(duplicates), 2)
+        for result in duplicates:
+            self.assertFalse(result['success'])
+            self.assertEqual(result['error_class'], 'no_data')
+        with JobJournal(self.batch_processor.config['journal_path']) as journal:
+            self.assertEqual(journal.counts(), {'failed': 3})
+
+    @patch('src.core.batch_processor.BatchProcessor.process_pdf')
+    def test_unreadable_file_does_not_abort_batch(self, mock_process_pdf):
+        from src.core.concurrency import ConcurrencyController
+        self.batch_processor.config['deduplicate'] = True
+        self.batch_processor.config['schedule'] = 'longest_first'
+        sampler = MagicMock()
+        sampler.sample.return_value = {'cpu': 0.5, 'rss': None, 'available_memory': None}
+        controller = ConcurrencyController(min_limit=2, max_limit=2, sampler=sampler)
+        locked = os.path.join(self.config['download_dir'], "test_1.pdf")
+        mock_process_pdf.side_effect = lambda pdf, *args: {'pdf_path': pdf, 'export_path': 'out.csv', 'success': True}
+
+        def fake_hash(path, *args, **kwargs):
+            if path == locked:
+                raise PermissionError(13, "Permission denied", path)
+            # Conteúdos distintos para que nenhum arquivo seja duplicata
+            return path
+
+        with patch('src.core.deduplicator.cached_hash_file', side_effect=fake_hash), \
+                patch.object(self.batch_processor, 'create_concurrency_controller', return_value=controller):
+            results = self.batch_processor.process_batch(self.config['download_dir'], "text", None, "csv")
+
+        self.assertEqual(len(results), 3)
+        failed = [result for result in results if not result['success']]
+        self.assertEqual([result['pdf_path'] for result in failed], [locked])
+        self.assertEqual(failed[0]['error_class'], 'io_error')
+        self.assertEqual(controller.in_use, 0)
+
+    @patch('src.core.batch_processor.count_pages')
+    @patch('src.core.extractor.PDFExtractor.extract_data')
+    def test_extract_document_splits_large_documents(self, mock_extract, mock_count_pages):
+        self.batch_processor.split_pages = 4
+        self.batch_processor.pages_per_task = 3
+        mock_count_pages.return_value = 7
+        mock_extract.side_effect = lambda pdf, method, pages, template: dict(
+            {f'page_{p + 1}': f"texto {p + 1}" for p in pages},
+            _metadata={'extraction_method': method, 'num_pages': len(pages)}
+        )
+
+        pdf_path = os.path.join(self.config['download_dir'], "test_0.pdf")
+        result = self.batch_processor.extract_document(pdf_path, 'text')
+
+        self.assertEqual(mock_extract.call_count, 3)
+        self.assertEqual(result['page_7'], "texto 7")
+        self.assertEqual(result['_metadata']['num_pages'], 7)
+
+    @patch('src.core.batch_processor.count_pages')
+    @patch('src.core.extractor.PDFExtractor.extract_data')
+    @patch('src.core.document_classifier.DocumentClassifier.classify_document')
+    def test_process_pdf_automatic_fallback(self, mock_classify, mock_extract, mock_count_pages):
+        self.batch_processor.config['fallback_chain'] = True
+        self.batch_processor.fallback_chain = self.batch_processor.create_fallback_chain()
+        self.batch_processor.default_method = 'auto'
+        mock_classify.return_value = ("invoice", 0.8)
+        mock_count_pages.return_value = 2
+        text = "Nota fiscal número 123 emitida em 01/01/2024"
+        mock_extract.side_effect = lambda pdf, method, pages, template: (
+            {'page_1': text, 'page_2': '', '_metadata': {'extraction_method': 'text'}} if method == 'text'
+            else {'page_2': text, '_metadata': {'extraction_method': method}}
+        )
+
+        pdf_path = os.path.join(self.config['download_dir'], "test_0.pdf")
+        result = self.batch_processor.process_pdf(pdf_path, None, {}, "json")
+
+        self.assertTrue(result['success'])
+        self.assertEqual([call.args[1] for call in mock_extract.call_args_list], ['text', 'ocr'])
+        self.assertEqual(mock_extract.call_args_list[1].args[2], [1])
+
+    def test_fallback_chain_is_opt_in(self):
+        # Sem configuração, o modo automático usa só o método 'text'
+        self.assertIsNone(self.batch_processor.fallback_chain)
+        self.assertEqual(self.batch_processor.default_method, 'text')
+
+        processor = BatchProcessor(dict(self.config, fallback_chain=['text', 'ocr'], document_budget_cost=100))
+        self.assertEqual(processor.default_method, 'auto')
+        self.assertEqual(processor.fallback_chain.methods, ['text', 'ocr'])
+        self.assertEqual(processor.fallback_chain.budget_cost, 100)
+
+    @patch('src.core.batch_processor.BatchProcessor.extract_pages')
+    def test_process_pdf_timeout_result(self, mock_extract_pages):
+        from src.core.isolation import DocumentTimeout
+        mock_extract_pages.side_effect = DocumentTimeout('extract', 5)
+
+        pdf_path = os.path.join(self.config['download_dir'], "test_0.pdf")
+        result = self.batch_processor.process_pdf(pdf_path, "text", {}, "csv")
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error_class'], 'timeout')
+        self.assertEqual(result['timed_out_stage'], 'extract')
+
+        report = self.batch_processor.generate_batch_report([result])
+        self.assertEqual(report['stats']['timeouts'], 1)
+        self.assertEqual(report['stats']['failure_classes'], {'timeout': 1})
+
+    def test_stage_deadline_respects_document_deadline(self):
+        from src.core.isolation import DocumentTimeout
+        self.batch_processor.document_timeout = 10
+        self.batch_processor.stage_timeouts = {'extract': 30, 'classify': 2}
+
+        deadline = time.monotonic() + 5
+        self.assertEqual(self.batch_processor._stage_deadline('extract', deadline), deadline)
+        self.assertLess(self.batch_processor._stage_deadline('classify', deadline), deadline)
+        self.assertIsNone(self.batch_processor._stage_deadline('export', None))
+        with self.assertRaises(DocumentTimeout):
+            self.batch_processor._stage_deadline('extract', time.monotonic() - 1)
+
+    def test_isolated_pool_sized_to_callers(self):
+        self.batch_processor.config['isolate_backends'] = True
+        self.batch_processor.config['range_workers'] = 3
+        self.batch_processor.split_pages = 50
+
+        pool = self.batch_processor.create_isolated_pool(4)
+        try:
+            self.assertEqual(pool.max_workers, 12)
+        finally:
+            pool.close()
+
+    def test_mark_sink_failures(self):
+        sink = MagicMock(failed_documents={'a.pdf': "disk full"})
+        results = [
+            {'pdf_path': 'a.pdf', 'export_path': 'batch.db', 'success': True},
+            {'pdf_path': 'b.pdf', 'export_path': 'batch.db', 'success': True},
+            {'pdf_path': 'c.pdf', 'export_path': 'batch.db', 'success': True, 'duplicate_of': 'a.pdf'}
+        ]
+
+        BatchProcessor.mark_sink_failures(results, sink)
+
+        self.assertEqual([result['success'] for result in results], [False, True, False])
+        self.assertEqual(results[0]['error_class'], 'export_failed')
+        self.assertIsNone(results[2]['export_path'])
+
     def test_generate_batch_report(self):
         # Dados de teste
         results = [
@@ -131,5 +687,28 @@ class TestBatchProcessor(unittest.TestCase):
         self.assertAlmostEqual(report['stats']['success_rate'], 66.66666666666666)
         self.assertIn('details', report)
 
+    def test_generate_batch_report_stage_percentiles(self):
+        results = [
+            {
+                'pdf_path': f"test_{i}.pdf",
+                'export_path': f"test_{i}.csv",
+                'success': True,
+                'processing_time': float(i + 1),
+                'stage_timings': {'extract': float(i), 'export': 0.5},
+                'pages_processed': 2,
+                'bytes_read': 100
+            }
+            for i in range(101)
+        ]
+
+        stats = self.batch_processor.generate_batch_report(results)['stats']
+
+        self.assertEqual(stats['stage_timings']['extract']['p50'], 50.0)
+        self.assertEqual(stats['stage_timings']['extract']['p99'], 99.0)
+        self.assertEqual(stats['stage_timings']['export']['p95'], 0.5)
+        self.assertEqual(stats['stage_timings']['total']['count'], 101)
+        self.assertEqual(stats['pages_processed'], 202)
+        self.assertEqual(stats['bytes_read'], 10100)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
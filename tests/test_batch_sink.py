@@ -0,0 +1,127 @@
+# test_batch_sink.py
+import unittest
+import os
+import json
+import shutil
+import sqlite3
+import tempfile
+import pandas as pd
+from src.core.batch_sink import SQLiteBatchSink
+
+class FailingCommitConnection:
+    """Conexão que recusa o COMMIT, como um disco cheio"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, *args):
+        if sql == "COMMIT":
+            raise sqlite3.OperationalError("database or disk is full")
+        return self.conn.execute(sql, *args)
+
+    def executemany(self, sql, *args):
+        return self.conn.executemany(sql, *args)
+
+    @property
+    def in_transaction(self):
+        return self.conn.in_transaction
+
+    def close(self):
+        self.conn.close()
+
+class TestSQLiteBatchSink(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "batch.db")
+
+        self.test_data = {
+            'page_1': 'Texto da página',
+            'table_1': pd.DataFrame({'item': ['a', 'b'], 'valor': [1.5, 2.0]}),
+            'numero_nota': '12345',
+            '_metadata': {'extraction_method': 'text', 'language': 'pt', 'num_pages': 1}
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_write_documents(self):
+        with SQLiteBatchSink(self.db_path, commit_every=1) as sink:
+            for i in range(3):
+                result = sink.write(f"/docs/nota_{i}.pdf", self.test_data, 'invoice', 0.9)
+                self.assertEqual(result, self.db_path)
+
+        self.assertIsNone(sink.error)
+        self.assertEqual(sink.documents_written, 3)
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0], 3)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0], 3)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM tables").fetchone()[0], 6)
+
+            row = conn.execute("SELECT data FROM tables WHERE row_index = 1 LIMIT 1").fetchone()
+            self.assertEqual(json.loads(row[0]), {'item': 'b', 'valor': 2.0})
+
+            field = conn.execute("SELECT name, value FROM fields LIMIT 1").fetchone()
+            self.assertEqual(field, ('numero_nota', '12345'))
+
+            doc = conn.execute("SELECT doc_type, extraction_method, language FROM documents LIMIT 1").fetchone()
+            self.assertEqual(doc, ('invoice', 'text', 'pt'))
+        finally:
+            conn.close()
+
+    def test_failed_document_does_not_roll_back_others(self):
+        with SQLiteBatchSink(self.db_path) as sink:
+            sink.write("/docs/nota_1.pdf", self.test_data, 'invoice', 0.9)
+            # pdf_path é NOT NULL: só este documento falha
+            with self.assertRaises(sqlite3.IntegrityError):
+                sink.write(None, self.test_data, 'invoice', 0.9)
+            sink.write("/docs/nota_2.pdf", self.test_data, 'invoice', 0.9)
+
+        self.assertIsNone(sink.error)
+        self.assertEqual(sink.failed_documents, {})
+        self.assertEqual(sink.documents_written, 2)
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            paths = [row[0] for row in conn.execute("SELECT pdf_path FROM documents ORDER BY id")]
+            self.assertEqual(paths, ["/docs/nota_1.pdf", "/docs/nota_2.pdf"])
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM tables").fetchone()[0], 4)
+        finally:
+            conn.close()
+
+    def test_commit_failure_is_recorded_per_document(self):
+        class FailingCommitSink(SQLiteBatchSink):
+            def _connect(self):
+                return FailingCommitConnection(super()._connect())
+
+        with FailingCommitSink(self.db_path) as sink:
+            sink.write("/docs/nota_1.pdf", self.test_data, 'invoice', 0.9)
+            sink.write("/docs/nota_2.pdf", self.test_data, 'invoice', 0.9)
+
+        self.assertEqual(set(sink.failed_documents), {"/docs/nota_1.pdf", "/docs/nota_2.pdf"})
+        self.assertEqual(sink.documents_written, 0)
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0], 0)
+        finally:
+            conn.close()
+
+    def test_indexes_created(self):
+        with SQLiteBatchSink(self.db_path):
+            pass
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        finally:
+            conn.close()
+
+        self.assertIn('idx_documents_doc_type', indexes)
+        self.assertIn('idx_documents_created_at', indexes)
+
+if __name__ == "__main__":
+    unittest.main()
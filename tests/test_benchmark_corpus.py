@@ -0,0 +1,64 @@
+# test_benchmark_corpus.py
+import unittest
+import os
+import json
+import tempfile
+import shutil
+from benchmarks.corpus import generate_corpus, MANIFEST_NAME
+from benchmarks.run_benchmarks import run_stage, compare
+from src.core.scheduler import count_pages
+
+class TestBenchmarkCorpus(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+    
+    def generate(self, name):
+        return generate_corpus(
+            os.path.join(self.temp_dir, name), seed=7, page_counts=(1, 5), scan_dpis=(), table_pages=(2,)
+        )
+    
+    def test_corpus_is_deterministic(self):
+        first = self.generate('a')
+        second = self.generate('b')
+        
+        self.assertEqual(first, second)
+        for doc in first['documents']:
+            with open(os.path.join(self.temp_dir, 'a', doc['file']), 'rb') as f:
+                data_a = f.read()
+            with open(os.path.join(self.temp_dir, 'b', doc['file']), 'rb') as f:
+                data_b = f.read()
+            self.assertEqual(data_a, data_b)
+            self.assertTrue(data_a.startswith(b'%PDF-1.4'))
+            self.assertEqual(count_pages(os.path.join(self.temp_dir, 'a', doc['file'])), doc['pages'])
+    
+    def test_manifest_lists_invoice_records(self):
+        manifest = self.generate('a')
+        kinds = [doc['kind'] for doc in manifest['documents']]
+        self.assertEqual(kinds, ['invoice', 'invoice', 'tables'])
+        
+        record = manifest['documents'][1]['records'][0]
+        self.assertEqual(len(record['access_key']), 44)
+        self.assertRegex(record['issuer_document'], r'^\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}$')
+        
+        with open(os.path.join(self.temp_dir, 'a', MANIFEST_NAME), encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['params']['seed'], 7)
+    
+    def test_run_stage_and_compare(self):
+        tasks = [('ok', 2, lambda: None), ('falha', 1, lambda: 1 / 0)]
+        result = run_stage('extract', tasks, workers=2, method='text')
+        
+        self.assertEqual(result['docs'], 1)
+        self.assertEqual(result['pages'], 2)
+        self.assertEqual(result['errors'], 1)
+        self.assertIn('p95', result['latency'])
+        
+        faster = dict(result, docs_per_s=result['docs_per_s'] * 2)
+        comparison = compare({'results': [result]}, {'results': [faster]})
+        self.assertAlmostEqual(comparison[0]['docs_per_s_ratio'], 2.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+# test_concurrency.py
+import unittest
+from src.core.concurrency import ConcurrencyController, ResourceSampler
+
+GB = 1024 * 1024 * 1024
+
+class FakeSampler:
+    def __init__(self, cpu=0.5, rss=GB, available_memory=8 * GB):
+        self.values = {'cpu': cpu, 'rss': rss, 'available_memory': available_memory}
+    
+    def sample(self):
+        return dict(self.values)
+
+class TestConcurrencyController(unittest.TestCase):
+
+    def setUp(self):
+        self.sampler = FakeSampler()
+        self.controller = ConcurrencyController(
+            min_limit=1, max_limit=16, initial_limit=4, sampler=self.sampler,
+            min_available_memory=GB, max_rss=4 * GB, sample_interval=0
+        )
+    
+    def test_method_weights_share_budget(self):
+        ocr = self.controller.weight('ocr')
+        text = self.controller.weight('text')
+        self.assertGreater(ocr, text)
+        self.assertTrue(text < self.controller.weight('auto') < ocr)
+        
+        # Um OCR ocupa o orçamento inteiro de 4 unidades
+        self.assertTrue(self.controller.try_acquire(ocr))
+        self.assertFalse(self.controller.try_acquire(text))
+        self.controller.release(ocr)
+        
+        for _ in range(4):
+            self.assertTrue(self.controller.try_acquire(text))
+        self.assertFalse(self.controller.try_acquire(text))
+    
+    def test_always_admits_one_document(self):
+        self.controller.limit = 1
+        self.assertTrue(self.controller.try_acquire(self.controller.weight('ocr')))
+    
+    def test_grows_only_when_limit_blocks_work(self):
+        self.controller.try_acquire(4)
+        self.assertEqual(self.controller.update(waiting_weight=0), 4)
+        self.assertEqual(self.controller.update(waiting_weight=1), 5)
+        self.assertEqual(self.controller.update(waiting_weight=1), 5)  # há espaço livre agora
+        
+        self.controller.limit = 16
+        self.controller.in_use = 16
+        self.assertEqual(self.controller.update(waiting_weight=1), 16)
+    
+    def test_backs_off_under_pressure(self):
+        self.controller.limit = 12
+        
+        # CPU saturada: redução aditiva
+        self.sampler.values['cpu'] = 0.99
+        self.assertEqual(self.controller.update(waiting_weight=1), 11)
+        
+        # Pouca memória disponível: redução multiplicativa
+        self.sampler.values['available_memory'] = GB // 2
+        self.assertEqual(self.controller.update(), 5)
+        
+        # RSS acima do máximo
+        self.sampler.values['available_memory'] = 8 * GB
+        self.sampler.values['rss'] = 5 * GB
+        self.assertEqual(self.controller.update(), 2)
+        self.assertEqual(self.controller.update(), 1)
+        self.assertEqual(self.controller.update(), 1)
+    
+    def test_sample_interval_throttles_updates(self):
+        self.controller.sample_interval = 60
+        self.controller.in_use = 4
+        self.assertEqual(self.controller.update(waiting_weight=1), 5)
+        self.controller.in_use = 5
+        self.assertEqual(self.controller.update(waiting_weight=1), 5)
+        self.assertEqual(self.controller.update(waiting_weight=1, force=True), 6)
+    
+    def test_resource_sampler(self):
+        sample = ResourceSampler().sample()
+        self.assertEqual(set(sample), {'cpu', 'rss', 'available_memory'})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+# test_dataframe_model.py
+import unittest
+import pandas as pd
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import Qt
+from src.gui.dataframe_model import DataFrameModel, PagedTextView, page_offsets
+
+app = QApplication.instance() or QApplication([])
+
+class TestDataFrameModel(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({'valor': range(25), 'texto': [f"linha {i}" for i in range(25)]})
+        self.model = DataFrameModel(self.df, batch_size=10)
+
+    def test_rows_are_fetched_in_batches(self):
+        self.assertEqual(self.model.rowCount(), 10)
+        self.assertEqual(self.model.columnCount(), 2)
+
+        self.assertTrue(self.model.canFetchMore())
+        self.model.fetchMore()
+        self.assertEqual(self.model.rowCount(), 20)
+
+        # O último lote traz só as linhas restantes
+        self.model.fetchMore()
+        self.assertEqual(self.model.rowCount(), 25)
+        self.assertFalse(self.model.canFetchMore())
+        self.model.fetchMore()
+        self.assertEqual(self.model.rowCount(), 25)
+
+    def test_set_dataframe_resets_loaded_rows(self):
+        self.model.fetchMore()
+        self.model.set_dataframe(self.df.head(3))
+
+        self.assertEqual(self.model.rowCount(), 3)
+        self.assertFalse(self.model.canFetchMore())
+
+    def test_data_reads_cells_from_dataframe(self):
+        df = pd.DataFrame({'a': [1.5, None]})
+        model = DataFrameModel(df)
+
+        self.assertEqual(model.data(model.index(0, 0)), "1.5")
+        self.assertEqual(model.data(model.index(1, 0)), "")
+        self.assertEqual(model.headerData(0, Qt.Horizontal), "a")
+
+class TestPageOffsets(unittest.TestCase):
+
+    def test_text_without_line_breaks_is_cut_at_page_size(self):
+        self.assertEqual(page_offsets("a" * 25, 10), [0, 10, 20, 25])
+
+    def test_pages_break_at_end_of_line(self):
+        text = "aaaa\nbbbb\ncccc\n"
+        offsets = page_offsets(text, 12)
+
+        self.assertEqual(offsets, [0, 10, 15])
+        self.assertEqual(text[offsets[0]:offsets[1]], "aaaa\nbbbb\n")
+
+    def test_first_and_last_page_boundaries(self):
+        # Texto que cabe exatamente em uma página
+        self.assertEqual(page_offsets("a" * 10, 10), [0, 10])
+        self.assertEqual(page_offsets("", 10), [0, 0])
+
+        # As páginas cobrem o texto inteiro, sem sobreposição
+        text = "\n".join(f"linha {i}" for i in range(100))
+        offsets = page_offsets(text, 50)
+        self.assertEqual(offsets[0], 0)
+        self.assertEqual(offsets[-1], len(text))
+        self.assertEqual("".join(text[start:end] for start, end in zip(offsets, offsets[1:])), text)
+
+    def test_paged_text_view_navigation(self):
+        view = PagedTextView(page_size=10)
+        view.set_text("a" * 25)
+
+        self.assertEqual(view.page_count(), 3)
+        self.assertFalse(view.prev_btn.isEnabled())
+        self.assertEqual(view.text_view.toPlainText(), "a" * 10)
+
+        # Não passa da última página
+        view.show_page(5)
+        self.assertEqual(view.page_label.text(), "3/3")
+        self.assertEqual(view.text_view.toPlainText(), "a" * 5)
+        self.assertFalse(view.next_btn.isEnabled())
+
+        view.clear()
+        self.assertEqual(view.page_count(), 1)
+        self.assertEqual(view.page_label.text(), "1/1")
+
+if __name__ == "__main__":
+    unittest.main()
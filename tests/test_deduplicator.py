@@ -0,0 +1,77 @@
+# test_deduplicator.py
+import unittest
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+from src.core.deduplicator import DocumentDeduplicator, simhash, hamming_distance
+from src.core.job_journal import JobJournal
+from src.utils.file_hash import hash_file, cached_hash_file
+
+class TestDocumentDeduplicator(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_pdf(self, name, content):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def test_hash_file_mmap(self):
+        path = self.write_pdf("a.pdf", b"%PDF-1.5\n" + b"x" * 4096)
+        self.assertEqual(hash_file(path), hash_file(path, mmap_threshold=1))
+
+    def test_content_hash_is_read_once_per_file_version(self):
+        path = self.write_pdf("a.pdf", b"%PDF-1.5\nNota 1")
+        journal = JobJournal(os.path.join(self.temp_dir, "journal.db"))
+        self.addCleanup(journal.close)
+
+        with patch('src.utils.file_hash.hash_file', side_effect=hash_file) as mock_hash:
+            DocumentDeduplicator().check(path)
+            journal.start(path)
+            journal.finish(path)
+            self.assertEqual(mock_hash.call_count, 1)
+            self.assertEqual(journal.get(path)['content_hash'], hash_file(path))
+
+            # Um arquivo alterado é lido de novo
+            self.write_pdf("a.pdf", b"%PDF-1.5\nNota 2")
+            self.assertEqual(cached_hash_file(path), hash_file(path))
+            self.assertEqual(mock_hash.call_count, 2)
+
+    def test_exact_duplicates(self):
+        deduplicator = DocumentDeduplicator()
+        original = self.write_pdf("a.pdf", b"%PDF-1.5\nNota 1")
+        copy = self.write_pdf("copia de a.pdf", b"%PDF-1.5\nNota 1")
+        other = self.write_pdf("b.pdf", b"%PDF-1.5\nNota 2")
+
+        self.assertEqual(deduplicator.check(original), (None, None))
+        self.assertEqual(deduplicator.check(copy), ('duplicate', original))
+        self.assertEqual(deduplicator.check(other), (None, None))
+
+    def test_simhash_similarity(self):
+        text = "Nota fiscal eletrônica número 12345 emitida em 01/02/2024 para Empresa Exemplo Ltda valor total R$ 1.500,00"
+        similar = text.replace("12345", "12346")
+        different = "Contrato de prestação de serviços entre as partes abaixo assinadas com vigência de doze meses"
+
+        self.assertEqual(hamming_distance(simhash(text), simhash(text)), 0)
+        self.assertLess(hamming_distance(simhash(text), simhash(similar)),
+                        hamming_distance(simhash(text), simhash(different)))
+        self.assertIsNone(simhash(""))
+
+    @patch('src.core.deduplicator.first_page_text')
+    def test_near_duplicates(self, mock_first_page):
+        mock_first_page.return_value = "Nota fiscal eletrônica número 12345 valor total R$ 1.500,00"
+        deduplicator = DocumentDeduplicator(near_duplicates=True)
+        original = self.write_pdf("a.pdf", b"%PDF-1.5\n/Producer (A)")
+        resaved = self.write_pdf("b.pdf", b"%PDF-1.5\n/Producer (B)")
+
+        self.assertEqual(deduplicator.check(original), (None, None))
+        self.assertEqual(deduplicator.check(resaved), ('near_duplicate', original))
+
+if __name__ == "__main__":
+    unittest.main()
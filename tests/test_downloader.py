@@ -1,27 +1,89 @@
 # test_downloader.py
 import unittest
 import os
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import patch, MagicMock
 from src.core.downloader import PDFDownloader
 
+class PDFHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 mantém a conexão aberta entre requisições
+    protocol_version = 'HTTP/1.1'
+    
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.clients.append(self.client_address)
+            server.hits[self.path] = server.hits.get(self.path, 0) + 1
+            failures = server.failures.get(self.path, 0)
+            if failures:
+                server.failures[self.path] = failures - 1
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        
+        try:
+            self.respond(failures)
+        finally:
+            with server.lock:
+                server.active -= 1
+    
+    def respond(self, failures):
+        time.sleep(self.server.delay)
+        if failures:
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        
+        body = b"%PDF-1.5\n" + self.path.encode('utf-8') * 1000
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/pdf')
+        self.send_header('Content-Length', str(len(body)))
+        if self.server.disposition:
+            self.send_header('Content-Disposition', f'attachment; filename="{self.server.disposition}"')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
 class TestPDFDownloader(unittest.TestCase):
 
     def setUp(self):
         self.download_dir = "test_downloads"
         os.makedirs(self.download_dir, exist_ok=True)
         self.downloader = PDFDownloader(self.download_dir)
+        self.addCleanup(self.downloader.close)
 
     def tearDown(self):
         for file in os.listdir(self.download_dir):
             os.remove(os.path.join(self.download_dir, file))
         os.rmdir(self.download_dir)
 
-    @patch('requests.get')
+    def start_server(self, failures=None, delay=0, disposition=None):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), PDFHandler)
+        server.lock = threading.Lock()
+        server.delay = delay
+        server.disposition = disposition
+        server.active = 0
+        server.max_active = 0
+        server.clients = []
+        server.hits = {}
+        server.failures = dict(failures or {})
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+    @patch('requests.Session.get')
     def test_download_pdf_direct_success(self, mock_get):
         # Configurar o mock
         mock_response = MagicMock()
         mock_response.raise_for_status.return_value = None
         mock_response.iter_content.return_value = [b"PDF content"]
+        mock_response.headers = {}
         mock_get.return_value = mock_response
 
         url = "https://www.w3.org/WAI/ER/tests/xhtml/testfiles/resources/pdf/dummy.pdf"
@@ -29,9 +91,10 @@ class TestPDFDownloader(unittest.TestCase):
         
         self.assertTrue(os.path.exists(file_path))
         self.assertTrue(file_path.endswith("dummy.pdf"))
-        mock_get.assert_called_once_with(url, stream=True)
+        mock_get.assert_called_once_with(url, stream=True, timeout=self.downloader.timeout)
+        mock_response.close.assert_called_once()
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_download_pdf_direct_invalid_url(self, mock_get):
         # Configurar o mock para lançar uma exceção
         mock_get.side_effect = Exception("Connection error")
@@ -40,34 +103,128 @@ class TestPDFDownloader(unittest.TestCase):
         file_path = self.downloader.download_pdf_direct(url)
         
         self.assertIsNone(file_path)
-        mock_get.assert_called_once_with(url, stream=True)
+        mock_get.assert_called_once_with(url, stream=True, timeout=self.downloader.timeout)
+
+    def test_download_reuses_connection(self):
+        server, base_url = self.start_server()
+        
+        paths = [self.downloader.download_pdf_direct(f"{base_url}/doc_{i}.pdf") for i in range(5)]
+        
+        self.assertTrue(all(path and os.path.exists(path) for path in paths))
+        with open(paths[0], 'rb') as f:
+            self.assertTrue(f.read().startswith(b"%PDF"))
+        # Todas as requisições chegaram pela mesma conexão (mesma porta de origem)
+        self.assertEqual(len(server.clients), 5)
+        self.assertEqual(len(set(server.clients)), 1)
+
+    def test_download_retries_transient_errors(self):
+        server, base_url = self.start_server(failures={'/flaky.pdf': 2})
+        downloader = PDFDownloader(self.download_dir, backoff_factor=0)
+        self.addCleanup(downloader.close)
+        
+        file_path = downloader.download_pdf_direct(f"{base_url}/flaky.pdf")
+        
+        self.assertIsNotNone(file_path)
+        self.assertEqual(server.hits['/flaky.pdf'], 3)
+        
+        # Sem novas tentativas, o erro 503 é reportado como falha
+        server.failures['/broken.pdf'] = 1
+        downloader = PDFDownloader(self.download_dir, max_retries=0)
+        self.addCleanup(downloader.close)
+        self.assertIsNone(downloader.download_pdf_direct(f"{base_url}/broken.pdf"))
+
+    def test_download_many_limits_per_host(self):
+        server_a, url_a = self.start_server(delay=0.05)
+        server_b, url_b = self.start_server(delay=0.05)
+        urls = [f"{url_a}/a_{i}.pdf" for i in range(6)] + [f"{url_b}/b_{i}.pdf" for i in range(6)]
+        
+        results = self.downloader.download_many(urls, max_workers=6, max_per_host=2)
+        
+        self.assertEqual(set(results), set(urls))
+        self.assertTrue(all(path and os.path.exists(path) for path in results.values()))
+        self.assertLessEqual(server_a.max_active, 2)
+        self.assertLessEqual(server_b.max_active, 2)
+        # Os dois servidores foram atendidos ao mesmo tempo
+        self.assertEqual(server_a.max_active, 2)
+        self.assertEqual(server_b.max_active, 2)
+        # Nenhum arquivo temporário fica para trás
+        self.assertFalse([name for name in os.listdir(self.download_dir) if name.endswith('.part')])
+
+    def test_iter_downloads_reports_failures_and_name_collisions(self):
+        server, base_url = self.start_server(failures={'/missing/doc.pdf': 10})
+        downloader = PDFDownloader(self.download_dir, max_retries=0)
+        self.addCleanup(downloader.close)
+        urls = [f"{base_url}/one/doc.pdf", f"{base_url}/two/doc.pdf", f"{base_url}/missing/doc.pdf"]
+        
+        results = dict(downloader.iter_downloads(urls))
+        
+        self.assertIsNone(results[urls[2]])
+        names = sorted(os.path.basename(results[url]) for url in urls[:2])
+        self.assertEqual(names, ['doc.pdf', 'doc_1.pdf'])
+        with open(results[urls[1]], 'rb') as f:
+            self.assertIn(b"/two/doc.pdf", f.read())
+
+    def test_content_disposition_names_do_not_collide(self):
+        server, base_url = self.start_server(disposition="nota.pdf")
+        # Arquivo de uma execução anterior com o mesmo nome
+        with open(os.path.join(self.download_dir, "nota.pdf"), 'wb') as f:
+            f.write(b"anterior")
+        urls = [f"{base_url}/get/1", f"{base_url}/get/2", f"{base_url}/other/3"]
+        
+        results = self.downloader.download_many(urls, max_workers=3)
+        
+        paths = list(results.values())
+        self.assertEqual(len(set(paths)), 3)
+        self.assertEqual(sorted(os.path.basename(path) for path in paths), ['nota_1.pdf', 'nota_2.pdf', 'nota_3.pdf'])
+        for url, path in results.items():
+            with open(path, 'rb') as f:
+                self.assertIn(url[len(base_url):].encode('utf-8'), f.read())
+        with open(os.path.join(self.download_dir, "nota.pdf"), 'rb') as f:
+            self.assertEqual(f.read(), b"anterior")
+
+    def test_load_manifest(self):
+        text_manifest = os.path.join(self.download_dir, "urls.txt")
+        with open(text_manifest, 'w') as f:
+            f.write("# notas de janeiro\nhttps://example.com/a.pdf\n\nhttps://example.com/b.pdf\n")
+        self.assertEqual(PDFDownloader.load_manifest(text_manifest),
+                         ["https://example.com/a.pdf", "https://example.com/b.pdf"])
+        
+        json_manifest = os.path.join(self.download_dir, "urls.json")
+        with open(json_manifest, 'w') as f:
+            json.dump({'urls': [{'url': "https://example.com/c", 'filename': "c.pdf"}]}, f)
+        self.assertEqual(PDFDownloader.load_manifest(json_manifest),
+                         [{'url': "https://example.com/c", 'filename': "c.pdf"}])
 
     @patch('selenium.webdriver.Chrome')
     @patch('selenium.webdriver.chrome.service.Service')
     @patch('webdriver_manager.chrome.ChromeDriverManager')
     def test_download_pdf_with_selenium(self, mock_manager, mock_service, mock_chrome):
+        from selenium.webdriver.common.by import By
+        
         # Configurar os mocks
         mock_manager.install.return_value = "path/to/chromedriver"
         mock_driver = MagicMock()
         mock_chrome.return_value = mock_driver
         
-        # Simular download bem-sucedido
-        mock_driver.find_element_by_xpath.return_value = MagicMock()
-        
-        # Simular arquivo baixado
+        # Simular arquivo baixado ao clicar no botão
         test_file = os.path.join(self.download_dir, "test_download.pdf")
-        with open(test_file, 'w') as f:
-            f.write("Test content")
+        
+        def download():
+            with open(test_file, 'w') as f:
+                f.write("Test content")
+        
+        mock_driver.find_element.return_value.click.side_effect = download
         
         url = "https://example.com/pdf-page"
         download_button_xpath = "//button[@id='download']"
         
         file_path = self.downloader.download_pdf_with_selenium(url, download_button_xpath=download_button_xpath)
         
-        self.assertIsNotNone(file_path)
+        self.assertEqual(file_path, os.path.abspath(test_file))
         mock_chrome.assert_called_once()
         mock_driver.get.assert_called_once_with(url)
-        mock_driver.find_element_by_xpath.assert_called_once_with(download_button_xpath)
+        mock_driver.find_element.assert_called_once_with(By.XPATH, download_button_xpath)
+        mock_driver.quit.assert_called_once()
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -1,6 +1,7 @@
 # test_exporter.py
 import unittest
 import os
+import shutil
 import tempfile
 import pandas as pd
 from unittest.mock import patch, MagicMock
@@ -28,9 +29,7 @@ class TestDataExporter(unittest.TestCase):
 
     def tearDown(self):
         # Limpar arquivos temporários
-        for file in os.listdir(self.temp_dir):
-            os.remove(os.path.join(self.temp_dir, file))
-        os.rmdir(self.temp_dir)
+        shutil.rmtree(self.temp_dir)
 
     def test_export_to_csv_dataframe(self):
         filename = "test_export.csv"
@@ -73,6 +72,72 @@ class TestDataExporter(unittest.TestCase):
         self.assertIn('page_1', exported_data)
         self.assertEqual(exported_data['page_1'], 'Text content')
 
+    def test_export_to_json_does_not_mutate_input(self):
+        self.exporter.export_to_json(self.test_dict, "test_export.json", compact=True)
+        
+        self.assertIsInstance(self.test_dict['table_1'], pd.DataFrame)
+
+    def test_export_to_ndjson(self):
+        result = self.exporter.export_to_ndjson(self.test_dict, "test_export.ndjson", chunksize=1)
+        
+        self.assertIsNotNone(result)
+        
+        # Uma linha por registro da tabela e uma por página de texto
+        import json
+        with open(result, 'r', encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[0], {'_source': 'table_1', 'col1': 1, 'col2': 'x'})
+        self.assertEqual(lines[2], {'_source': 'page_1', 'content': 'Text content'})
+
+    def test_export_to_ndjson_missing_values(self):
+        import json
+        import numpy as np
+        df = pd.DataFrame({
+            'f32': pd.Series([1.5, np.nan], dtype='float32'),
+            'nullable': pd.Series([7, None], dtype='Int64'),
+            'text': pd.Series(['a', pd.NA], dtype='string'),
+            'mixed': pd.Series([np.int64(3), np.float32('nan')], dtype=object)
+        })
+        result = self.exporter.export_to_ndjson(df, "missing.ndjson")
+        
+        with open(result, 'r', encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        
+        # Valores ausentes de qualquer tipo viram null, e escalares numpy viram números
+        self.assertEqual(lines[0], {'f32': 1.5, 'nullable': 7, 'text': 'a', 'mixed': 3})
+        self.assertEqual(lines[1], {'f32': None, 'nullable': None, 'text': None, 'mixed': None})
+
+    def test_export_to_ndjson_gzip(self):
+        result = self.exporter.export_to_ndjson(self.test_df, "test_export.ndjson", compression='gzip')
+        
+        self.assertTrue(result.endswith('.gz'))
+        exported_df = pd.read_json(result, lines=True, compression='gzip')
+        pd.testing.assert_frame_equal(exported_df, self.test_df)
+
+    def test_export_to_parquet_partitioned(self):
+        result = self.exporter.export_to_parquet(self.test_dict, "doc_a.parquet", doc_type='invoice')
+        self.exporter.export_to_parquet(self.test_dict, "doc_b.parquet", doc_type='invoice')
+        
+        self.assertIsNotNone(result)
+        self.assertTrue(os.path.isdir(os.path.join(result, 'tables', 'doc_type=invoice')))
+        
+        # Os dois documentos são acrescentados ao mesmo dataset
+        tables = pd.read_parquet(os.path.join(result, 'tables'))
+        self.assertEqual(len(tables), 8)
+        self.assertEqual(set(tables['document'].astype(str)), {'doc_a', 'doc_b'})
+        
+        pages = pd.read_parquet(os.path.join(result, 'pages'))
+        self.assertEqual(list(pages['content'].unique()), ['Text content'])
+
+    def test_export_to_feather(self):
+        result = self.exporter.export_to_feather(self.test_dict, "test_export.feather")
+        
+        self.assertIsNotNone(result)
+        pd.testing.assert_frame_equal(pd.read_feather(result), self.test_dict['table_1'])
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, "test_export_pages.feather")))
+
     @patch('sqlite3.connect')
     def test_export_to_sql(self, mock_connect):
         # Configurar mock
@@ -86,6 +151,50 @@ class TestDataExporter(unittest.TestCase):
         mock_connect.assert_called_once()
         self.test_df.to_sql.assert_called_once()
 
+    def test_export_to_sql_appends_with_document_id(self):
+        from src.core.exporter import get_engine, _engine_cache
+        connection_string = f"sqlite:///{os.path.join(self.temp_dir, 'shared.db')}"
+        
+        self.exporter.export_to_sql(self.test_df, "doc_a.sql", connection_string, table_name='items')
+        self.exporter.export_to_sql(self.test_df, "doc_b.sql", connection_string, table_name='items')
+        
+        # A engine é reutilizada e a tabela não é recriada a cada documento
+        engine = get_engine(connection_string)
+        self.assertIs(engine, get_engine(connection_string))
+        exported_df = pd.read_sql_table('items', engine)
+        self.assertEqual(len(exported_df), 6)
+        self.assertEqual(sorted(exported_df['document_id'].unique()), ['doc_a', 'doc_b'])
+        engine.dispose()
+        _engine_cache.pop(connection_string, None)
+
+    def test_export_to_sql_appends_in_chunks_to_existing_table(self):
+        from sqlalchemy import create_engine
+        from src.core.exporter import get_engine, _engine_cache
+        connection_string = f"sqlite:///{os.path.join(self.temp_dir, 'existing.db')}"
+        
+        # Tabela já existente, com linhas de uma execução anterior
+        setup_engine = create_engine(connection_string)
+        pd.DataFrame({'col1': [0], 'col2': ['antigo'], 'document_id': ['doc_0']}).to_sql(
+            'items', setup_engine, index=False)
+        setup_engine.dispose()
+        
+        df = pd.DataFrame({'col1': range(5), 'col2': list('abcde')})
+        with patch('src.core.exporter.create_engine', wraps=create_engine) as mock_create_engine:
+            self.assertEqual(self.exporter.export_to_sql(df, "doc_a.sql", connection_string, table_name='items',
+                                                         chunksize=2), connection_string)
+            self.exporter.export_to_sql(df, "doc_b.sql", connection_string, table_name='items', chunksize=2)
+            
+            # Uma única engine atende as duas exportações
+            mock_create_engine.assert_called_once()
+        
+        engine = get_engine(connection_string)
+        exported_df = pd.read_sql_table('items', engine)
+        self.assertEqual(len(exported_df), 11)
+        self.assertEqual(exported_df['document_id'].value_counts().to_dict(), {'doc_a': 5, 'doc_b': 5, 'doc_0': 1})
+        self.assertEqual(exported_df.loc[exported_df['document_id'] == 'doc_b', 'col2'].tolist(), list('abcde'))
+        engine.dispose()
+        _engine_cache.pop(connection_string, None)
+
     def test_export_to_excel(self):
         filename = "test_export.xlsx"
         result = self.exporter.export_to_excel(self.test_dict, filename)
@@ -98,5 +207,64 @@ class TestDataExporter(unittest.TestCase):
         self.assertIn('table_1', imported_dfs)
         pd.testing.assert_frame_equal(imported_dfs['table_1'], self.test_dict['table_1'])
 
+    def test_export_to_excel_streaming(self):
+        result = self.exporter.export_to_excel(self.test_dict, "test_stream.xlsx", streaming=True)
+        
+        self.assertIsNotNone(result)
+        imported_dfs = pd.read_excel(result, sheet_name=None)
+        pd.testing.assert_frame_equal(imported_dfs['table_1'], self.test_dict['table_1'])
+        self.assertEqual(imported_dfs['pages']['text'].tolist(), ['Text content'])
+
+    def test_streaming_excel_splits_at_row_limit(self):
+        from src.core.exporter import StreamingExcelWriter
+        file_path = os.path.join(self.temp_dir, "batch.xlsx")
+        writer = StreamingExcelWriter(file_path, chunksize=2)
+        writer.MAX_ROWS = 3  # cabeçalho + 2 linhas por planilha
+        writer.write("/docs/doc_a.pdf", self.test_df)
+        writer.write("/docs/doc_b.pdf", self.test_df)
+        writer.close()
+        
+        imported_dfs = pd.read_excel(file_path, sheet_name=None)
+        self.assertEqual(list(imported_dfs), ['doc_a_table_1', 'doc_a_table_1~2', 'doc_b_table_1', 'doc_b_table_1~2'])
+        self.assertEqual(sum(len(df) for df in imported_dfs.values()), 6)
+
+    def test_streaming_excel_starts_new_part_after_max_sheets(self):
+        from src.core.exporter import StreamingExcelWriter
+        committed = []
+        file_path = os.path.join(self.temp_dir, "batch.xlsx")
+        writer = StreamingExcelWriter(file_path, on_commit=committed.append, max_sheets=2)
+        paths = [writer.write(f"/docs/doc_{name}.pdf", self.test_df) for name in "abc"]
+        
+        # A primeira parte é salva (e confirmada) assim que enche
+        part_2 = os.path.join(self.temp_dir, "batch_2.xlsx")
+        self.assertEqual(paths, [file_path, file_path, part_2])
+        self.assertEqual(committed, [["/docs/doc_a.pdf", "/docs/doc_b.pdf"]])
+        self.assertEqual(list(pd.read_excel(file_path, sheet_name=None)), ['doc_a_table_1', 'doc_b_table_1'])
+        
+        writer.close()
+        self.assertEqual(committed[-1], ["/docs/doc_c.pdf"])
+        self.assertEqual(list(pd.read_excel(part_2, sheet_name=None)), ['doc_c_table_1'])
+        self.assertEqual(writer.document_paths["/docs/doc_c.pdf"], part_2)
+
+    def test_streaming_excel_confirms_documents_on_close(self):
+        from src.core.exporter import StreamingExcelWriter
+        committed = []
+        writer = StreamingExcelWriter(os.path.join(self.temp_dir, "batch.xlsx"), on_commit=committed.extend)
+        writer.write("/docs/doc_a.pdf", self.test_df)
+        writer.write("/docs/doc_b.pdf", self.test_df)
+        self.assertEqual(committed, [])
+        
+        writer.close()
+        self.assertEqual(committed, ["/docs/doc_a.pdf", "/docs/doc_b.pdf"])
+        
+        # Falha ao salvar: nada é confirmado e os documentos ficam registrados
+        committed.clear()
+        writer = StreamingExcelWriter(os.path.join(self.temp_dir, "missing", "batch.xlsx"), on_commit=committed.extend)
+        writer.write("/docs/doc_a.pdf", self.test_df)
+        with self.assertRaises(Exception):
+            writer.close()
+        self.assertEqual(committed, [])
+        self.assertIn("/docs/doc_a.pdf", writer.failed_documents)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
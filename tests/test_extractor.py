@@ -79,5 +79,27 @@ class TestPDFExtractor(unittest.TestCase):
         mock_convert.assert_called_once_with(self.test_pdf_path)
         mock_image_to_string.assert_called()
 
+    def test_page_runs(self):
+        self.assertEqual(self.extractor.page_runs([7, 0, 1, 2, 9, 8]), [(0, 2), (7, 9)])
+        self.assertEqual(self.extractor.page_runs([4]), [(4, 4)])
+        self.assertEqual(self.extractor.page_runs([]), [])
+
+    @patch('src.core.extractor.pytesseract.image_to_string')
+    @patch('src.core.extractor.convert_from_path')
+    @patch('src.core.extractor.cv2.cvtColor')
+    @patch('src.core.extractor.cv2.threshold')
+    def test_extract_with_ocr_rasterizes_only_requested_pages(self, mock_threshold, mock_cvtcolor, mock_convert,
+                                                              mock_image_to_string):
+        mock_convert.side_effect = lambda path, first_page, last_page: [MagicMock()] * (last_page - first_page + 1)
+        mock_threshold.return_value = (None, "threshold_result")
+        mock_image_to_string.return_value = "OCR extracted text"
+        
+        # Páginas vazias esparsas (base 0) de um documento longo
+        result = self.extractor.extract_with_ocr(self.test_pdf_path, pages=[1, 2, 499])
+        
+        self.assertEqual([(c.kwargs['first_page'], c.kwargs['last_page']) for c in mock_convert.call_args_list],
+                         [(2, 3), (500, 500)])
+        self.assertEqual(sorted(key for key in result if key != '_metadata'), ['page_2', 'page_3', 'page_500'])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,94 @@
+# test_fallback.py
+import unittest
+from src.core.fallback import FallbackChain, empty_pages, page_number
+
+TEXT = "Nota fiscal número 123 emitida em 01/01/2024"
+
+def fake_extract(content, calls):
+    """extract_fn que devolve o conteúdo de cada método e registra as chamadas"""
+    def extract(pdf_path, method, pages, template):
+        calls.append((method, pages))
+        data = content.get(method) or {}
+        if pages != 'all':
+            data = {key: value for key, value in data.items()
+                    if page_number(key) is None or page_number(key) - 1 in pages}
+        if not data:
+            return None
+        return dict(data, _metadata={'extraction_method': method, 'num_pages': 3,
+                                     'timings': {method: 0.1}, 'pages_processed': 1})
+    return extract
+
+class TestFallbackChain(unittest.TestCase):
+
+    def test_empty_pages(self):
+        data = {'page_1': TEXT, 'page_2': '', 'page_3': '  x ', 'table_1': []}
+        self.assertEqual(empty_pages(data), [1, 2])
+    
+    def test_ocr_only_on_empty_pages(self):
+        calls = []
+        extract = fake_extract({
+            'text': {'page_1': TEXT, 'page_2': '', 'page_3': TEXT},
+            'ocr': {'page_1': 'ocr 1', 'page_2': TEXT + ' (ocr)', 'page_3': 'ocr 3'}
+        }, calls)
+        
+        result = FallbackChain(['text', 'ocr']).extract('doc.pdf', extract, num_pages=3)
+        
+        self.assertEqual(calls, [('text', 'all'), ('ocr', [1])])
+        self.assertEqual(result['page_1'], TEXT)
+        self.assertEqual(result['page_2'], TEXT + ' (ocr)')
+        metadata = result['_metadata']
+        self.assertEqual(metadata['page_methods'], {'page_1': 'text', 'page_2': 'ocr', 'page_3': 'text'})
+        self.assertEqual(metadata['extraction_method'], 'text+ocr')
+        self.assertEqual(metadata['timings'], {'text': 0.1, 'ocr': 0.1})
+        self.assertEqual(metadata['pages_processed'], 2)
+        self.assertFalse(metadata['fallback']['budget_exhausted'])
+    
+    def test_budget_limits_ocr_pages(self):
+        calls = []
+        extract = fake_extract({
+            'text': {'page_1': '', 'page_2': '', 'page_3': ''},
+            'ocr': {'page_1': TEXT, 'page_2': TEXT, 'page_3': TEXT}
+        }, calls)
+        
+        # 3 (texto) + 2 páginas de OCR a 20 unidades cada
+        chain = FallbackChain(['text', 'ocr'], budget_cost=45)
+        result = chain.extract('doc.pdf', extract, num_pages=3)
+        
+        self.assertEqual(calls[1], ('ocr', [0, 1]))
+        fallback = result['_metadata']['fallback']
+        self.assertTrue(fallback['budget_exhausted'])
+        self.assertEqual(fallback['skipped_pages'], [3])
+        self.assertEqual(result['_metadata']['page_methods']['page_3'], 'text')
+    
+    def test_tables_only_when_needed(self):
+        content = {
+            'text': {'page_1': TEXT},
+            'tables': {'table_1': [{'a': 1}]}
+        }
+        
+        calls = []
+        FallbackChain(['text', 'tables']).extract('doc.pdf', fake_extract(content, calls))
+        self.assertEqual([method for method, _ in calls], ['text'])
+        
+        calls = []
+        result = FallbackChain(['text', 'tables']).extract(
+            'doc.pdf', fake_extract(content, calls), template={'tables': [{'name': 'itens'}]}
+        )
+        self.assertEqual([method for method, _ in calls], ['text', 'tables'])
+        self.assertEqual(result['table_1'], [{'a': 1}])
+        self.assertEqual(result['_metadata']['page_methods']['table_1'], 'tables')
+    
+    def test_step_errors_continue_chain(self):
+        def extract(pdf_path, method, pages, template):
+            if method == 'text':
+                raise RuntimeError("falha no texto")
+            return {'page_1': TEXT, '_metadata': {'extraction_method': method}}
+        
+        result = FallbackChain(['text', 'ocr']).extract('doc.pdf', extract)
+        self.assertEqual(result['_metadata']['page_methods'], {'page_1': 'ocr'})
+    
+    def test_no_data(self):
+        self.assertIsNone(FallbackChain(['text']).extract('doc.pdf', lambda *args: None))
+
+if __name__ == '__main__':
+    unittest.main()
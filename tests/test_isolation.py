@@ -0,0 +1,67 @@
+# test_isolation.py
+import unittest
+import time
+from src.core.isolation import IsolatedWorkerPool, DocumentTimeout, WorkerCrashed
+
+class TestIsolatedWorkerPool(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = IsolatedWorkerPool(1)
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+    
+    def test_runs_task_in_worker(self):
+        self.assertEqual(self.pool.run(divmod, 17, 5, stage='extract', timeout=30), (3, 2))
+    
+    def test_worker_errors_are_raised(self):
+        with self.assertRaises(RuntimeError) as context:
+            self.pool.run(int, 'abc', stage='extract', timeout=30)
+        self.assertIn('ValueError', str(context.exception))
+    
+    def test_timeout_kills_and_replaces_worker(self):
+        replaced = self.pool.replaced
+        start = time.monotonic()
+        with self.assertRaises(DocumentTimeout) as context:
+            self.pool.run(time.sleep, 30, stage='extract', timeout=0.5)
+        
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertEqual(context.exception.stage, 'extract')
+        self.assertEqual(self.pool.replaced, replaced + 1)
+        
+        # O processo substituto atende as próximas tarefas
+        self.assertEqual(self.pool.run(divmod, 9, 2, timeout=30), (4, 1))
+    
+    def test_crashed_worker_is_replaced(self):
+        import os
+        with self.assertRaises(WorkerCrashed):
+            self.pool.run(os._exit, 3, stage='classify', timeout=30)
+        self.assertEqual(self.pool.run(divmod, 1, 1, timeout=30), (1, 0))
+
+class TestIsolatedWorkerPoolWaiting(unittest.TestCase):
+    
+    def test_waiting_for_a_worker_counts_against_the_deadline(self):
+        import threading
+        with IsolatedWorkerPool(1) as pool:
+            busy = threading.Thread(target=pool.run, args=(time.sleep, 3), kwargs={'timeout': 30})
+            busy.start()
+            time.sleep(0.5)
+            
+            start = time.monotonic()
+            with self.assertRaises(DocumentTimeout):
+                pool.run(divmod, 1, 1, stage='extract', deadline=time.monotonic() + 0.5)
+            self.assertLess(time.monotonic() - start, 2)
+            # O processo ocupado não é encerrado
+            self.assertEqual(pool.replaced, 0)
+            busy.join()
+    
+    def test_workers_start_on_demand(self):
+        with IsolatedWorkerPool(4) as pool:
+            self.assertEqual(pool._started, 0)
+            self.assertEqual(pool.run(divmod, 7, 2, timeout=30), (3, 1))
+            self.assertEqual(pool._started, 1)
+
+if __name__ == "__main__":
+    unittest.main()
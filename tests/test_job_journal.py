@@ -0,0 +1,70 @@
+# test_job_journal.py
+import unittest
+import os
+import shutil
+import tempfile
+from src.core.job_journal import JobJournal
+
+class TestJobJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.journal = JobJournal(os.path.join(self.temp_dir, "journal.db"), max_attempts=2)
+
+        self.pdf_path = os.path.join(self.temp_dir, "doc.pdf")
+        with open(self.pdf_path, "wb") as f:
+            f.write(b"%PDF-1.5\nTest content")
+
+    def tearDown(self):
+        self.journal.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_done_files_are_skipped(self):
+        self.assertTrue(self.journal.should_process(self.pdf_path))
+
+        self.journal.start(self.pdf_path)
+        self.journal.finish(self.pdf_path, "/exports/doc.csv")
+
+        job = self.journal.get(self.pdf_path)
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['output_path'], "/exports/doc.csv")
+        self.assertIsNotNone(job['content_hash'])
+        self.assertFalse(self.journal.should_process(self.pdf_path))
+
+    def test_touched_file_with_same_content_is_skipped(self):
+        self.journal.start(self.pdf_path)
+        self.journal.finish(self.pdf_path)
+
+        stat = os.stat(self.pdf_path)
+        os.utime(self.pdf_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertFalse(self.journal.should_process(self.pdf_path))
+
+        with open(self.pdf_path, "ab") as f:
+            f.write(b"\nnovo conteudo")
+        self.assertTrue(self.journal.should_process(self.pdf_path))
+
+    def test_failed_files_retried_up_to_limit(self):
+        for _ in range(2):
+            self.assertTrue(self.journal.should_process(self.pdf_path))
+            self.journal.start(self.pdf_path)
+            self.journal.fail(self.pdf_path, "erro")
+
+        self.assertEqual(self.journal.get(self.pdf_path)['attempts'], 2)
+        self.assertFalse(self.journal.should_process(self.pdf_path))
+
+    def test_running_jobs_resumed(self):
+        # Simula uma queda durante o processamento
+        self.journal.start(self.pdf_path)
+        self.assertTrue(self.journal.should_process(self.pdf_path))
+
+    def test_release_does_not_count_attempt(self):
+        self.journal.start(self.pdf_path)
+        self.journal.release(self.pdf_path)
+
+        job = self.journal.get(self.pdf_path)
+        self.assertEqual(job['status'], 'pending')
+        self.assertEqual(job['attempts'], 0)
+        self.assertEqual(self.journal.counts(), {'pending': 1})
+
+if __name__ == "__main__":
+    unittest.main()
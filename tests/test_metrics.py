@@ -0,0 +1,80 @@
+# test_metrics.py
+import unittest
+import os
+import tempfile
+import urllib.request
+from src.utils.metrics import MetricsRegistry
+
+class TestMetrics(unittest.TestCase):
+    
+    def setUp(self):
+        self.registry = MetricsRegistry()
+    
+    def tearDown(self):
+        self.registry.stop_server()
+    
+    def test_counter_and_gauge(self):
+        counter = self.registry.counter('docs_total', "Documentos", ('method', 'status'))
+        counter.inc(method='text', status='success')
+        counter.inc(2, method='text', status='success')
+        counter.inc(method='ocr', status='failed')
+        
+        gauge = self.registry.gauge('in_flight', "Em andamento")
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+        
+        ratio = self.registry.gauge('hit_ratio', "Acertos", ('cache',))
+        ratio.set_function(lambda: 0.25, cache='dedup')
+        
+        self.assertEqual(counter.get(method='text', status='success'), 3)
+        self.assertEqual(gauge.get(), 1)
+        self.assertEqual(ratio.get(cache='dedup'), 0.25)
+        
+        text = self.registry.render()
+        self.assertIn("# TYPE docs_total counter", text)
+        self.assertIn('docs_total{method="text",status="success"} 3', text)
+        self.assertIn('docs_total{method="ocr",status="failed"} 1', text)
+        self.assertIn("in_flight 1", text)
+        self.assertIn('hit_ratio{cache="dedup"} 0.25', text)
+        
+        # Rótulos incorretos e contadores negativos são rejeitados
+        with self.assertRaises(ValueError):
+            counter.inc(method='text')
+        with self.assertRaises(ValueError):
+            counter.inc(-1, method='text', status='success')
+    
+    def test_histogram_buckets(self):
+        histogram = self.registry.histogram('stage_seconds', "Etapas", ('stage',), buckets=(0.1, 1))
+        for value in (0.05, 0.5, 0.7, 3):
+            histogram.observe(value, stage='extract')
+        
+        text = self.registry.render()
+        self.assertIn('stage_seconds_bucket{stage="extract",le="0.1"} 1', text)
+        self.assertIn('stage_seconds_bucket{stage="extract",le="1"} 3', text)
+        self.assertIn('stage_seconds_bucket{stage="extract",le="+Inf"} 4', text)
+        self.assertIn('stage_seconds_count{stage="extract"} 4', text)
+        self.assertEqual(histogram.get(stage='extract')[0], 4)
+    
+    def test_registry_reuses_metrics(self):
+        first = self.registry.counter('docs_total', "Documentos")
+        self.assertIs(self.registry.counter('docs_total', "Documentos"), first)
+        with self.assertRaises(ValueError):
+            self.registry.gauge('docs_total', "Documentos")
+    
+    def test_http_server_and_file(self):
+        self.registry.counter('docs_total', "Documentos").inc()
+        server = self.registry.start_server(0)
+        port = server.server_address[1]
+        
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            self.assertTrue(response.headers['Content-Type'].startswith('text/plain'))
+            self.assertIn("docs_total 1", response.read().decode('utf-8'))
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = self.registry.write(os.path.join(temp_dir, 'metrics.prom'))
+            with open(path, encoding='utf-8') as f:
+                self.assertIn("docs_total 1", f.read())
+
+if __name__ == "__main__":
+    unittest.main()
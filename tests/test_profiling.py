@@ -0,0 +1,86 @@
+# test_profiling.py
+import unittest
+import os
+import tempfile
+import shutil
+import tracemalloc
+import cProfile
+import pstats
+from src.utils.profiling import DocumentProfiler, summarize_profiles, top_hotspots, _profile_lock
+from src.utils.file_hash import hash_file
+
+def slow_function(pdf_path, size):
+    data = [str(i) * 10 for i in range(size)]
+    return {'pdf_path': pdf_path, 'items': len(data)}
+
+class TestDocumentProfiler(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.pdf_path = os.path.join(self.temp_dir, 'doc.pdf')
+        with open(self.pdf_path, 'wb') as f:
+            f.write(b"%PDF-1.5\nTest content")
+        self.profiler = DocumentProfiler(os.path.join(self.temp_dir, 'profiles'), top_n=5)
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+    
+    def test_profile_writes_files_named_by_hash(self):
+        result, info = self.profiler.profile(self.pdf_path, slow_function, 20000)
+        
+        self.assertEqual(result['items'], 20000)
+        content_hash = hash_file(self.pdf_path)
+        self.assertEqual(info['content_hash'], content_hash)
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, 'profiles', f"{content_hash}.prof")))
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, 'profiles', f"{content_hash}.tracemalloc")))
+        self.assertLessEqual(len(info['hotspots']), 5)
+        self.assertTrue(any('slow_function' in entry['function'] for entry in info['hotspots']))
+        self.assertTrue(info['allocations'])
+        self.assertGreater(info['peak_memory_kb'], 0)
+        self.assertFalse(tracemalloc.is_tracing())
+    
+    def test_sampling_is_deterministic(self):
+        self.profiler.sample_rate = 0.5
+        paths = [os.path.join(self.temp_dir, f"doc_{i}.pdf") for i in range(200)]
+        sampled = [path for path in paths if self.profiler.should_profile(path)]
+        
+        self.assertEqual(sampled, [path for path in paths if self.profiler.should_profile(path)])
+        self.assertTrue(60 < len(sampled) < 140)
+        
+        self.profiler.sample_rate = 0
+        self.assertFalse(self.profiler.should_profile(paths[0]))
+    
+    def test_summarize_profiles(self):
+        _, info = self.profiler.profile(self.pdf_path, slow_function, 1000)
+        results = [{'pdf_path': self.pdf_path, 'profile': info}, {'pdf_path': 'outro.pdf'}]
+        
+        summary = summarize_profiles(results, top_n=3)
+        
+        self.assertEqual(summary['profiled_documents'], 1)
+        self.assertEqual(len(summary['hotspots']), 3)
+        self.assertIsNone(summarize_profiles([{'pdf_path': 'outro.pdf'}]))
+    
+    def test_try_profile_does_not_wait_for_lock(self):
+        with _profile_lock:
+            self.assertIsNone(self.profiler.try_profile(self.pdf_path, slow_function, 10))
+        
+        result, info = self.profiler.try_profile(self.pdf_path, slow_function, 10)
+        self.assertEqual(result['items'], 10)
+    
+    def test_merge_worker_profiles(self):
+        _, info = self.profiler.profile(self.pdf_path, slow_function, 1000)
+        worker_path = self.profiler.worker_profile_path()
+        profiler = cProfile.Profile()
+        profiler.runcall(sorted, range(100))
+        profiler.dump_stats(worker_path)
+        
+        info = self.profiler.merge_worker_profiles(info, [worker_path])
+        
+        # O perfil do documento passa a incluir as funções do processo auxiliar
+        functions = [entry['function'] for entry in top_hotspots(pstats.Stats(info['profile_path']), 50)]
+        self.assertTrue(any('sorted' in function for function in functions))
+        self.assertTrue(any('slow_function' in function for function in functions))
+        self.assertFalse(os.path.exists(worker_path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+# test_scheduler.py
+import unittest
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+from src.core.scheduler import (_scan, count_pages, estimate_cost, iter_longest_first,
+                                split_page_ranges, merge_extractions)
+
+def make_pdf(num_pages, images=0):
+    """Monta um PDF mínimo com a árvore de páginas descomprimida"""
+    kids = ' '.join(f"{i + 3} 0 R" for i in range(num_pages))
+    body = [
+        "1 0 obj << /Type /Catalog /Pages 2 0 R >> endobj",
+        f"2 0 obj << /Type /Pages /Kids [{kids}] /Count {num_pages} >> endobj"
+    ]
+    for i in range(num_pages):
+        body.append(f"{i + 3} 0 obj << /Type /Page /Parent 2 0 R >> endobj")
+    for i in range(images):
+        body.append(f"{num_pages + i + 3} 0 obj << /Type /XObject /Subtype /Image /Width 10 /Height 10 >> endobj")
+    return ("%PDF-1.4\n" + "\n".join(body) + "\ntrailer << /Root 1 0 R >>\n%%EOF").encode('latin-1')
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_pdf(self, name, content):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def test_count_pages(self):
+        self.assertEqual(count_pages(self.write_pdf("a.pdf", make_pdf(7))), 7)
+
+    def test_count_pages_reads_the_trailer(self):
+        from PyPDF2 import PdfWriter
+        writer = PdfWriter()
+        for _ in range(12):
+            writer.add_blank_page(width=100, height=100)
+        path = os.path.join(self.temp_dir, "xref.pdf")
+        with open(path, "wb") as f:
+            writer.write(f)
+
+        # A contagem vem da xref: o arquivo não é percorrido
+        with patch('src.core.scheduler._scan_file') as mock_scan:
+            self.assertEqual(count_pages(path), 12)
+            self.assertEqual(estimate_cost(path)['pages'], 12)
+            mock_scan.assert_not_called()
+
+    def test_count_pages_falls_back_to_scan_without_xref(self):
+        # make_pdf não tem tabela xref
+        self.assertEqual(count_pages(self.write_pdf("broken.pdf", make_pdf(6))), 6)
+
+    def test_count_pages_is_cached_until_the_file_changes(self):
+        path = self.write_pdf("cached.pdf", make_pdf(3))
+        with patch('src.core.scheduler.PyPDF2.PdfReader') as mock_reader:
+            mock_reader.return_value.trailer = {'/Root': {'/Pages': {'/Count': 3}}}
+            self.assertEqual(count_pages(path), 3)
+            self.assertEqual(count_pages(path), 3)
+            self.assertEqual(mock_reader.call_count, 1)
+
+        self.write_pdf("cached.pdf", make_pdf(5))
+        self.assertEqual(count_pages(path), 5)
+
+    def test_scan_counts_all_objects_in_one_pass(self):
+        # /Count do nó raiz, objetos /Page, imagens e fontes
+        self.assertEqual(_scan(self.write_pdf("mixed.pdf", make_pdf(4, images=2))), (4, 4, 2, 0))
+
+    def test_estimate_cost(self):
+        text_pdf = self.write_pdf("text.pdf", make_pdf(10))
+        scanned_pdf = self.write_pdf("scan.pdf", make_pdf(10, images=10))
+
+        text_cost = estimate_cost(text_pdf, 'text')
+        self.assertEqual(text_cost['pages'], 10)
+        self.assertEqual(text_cost['image_ratio'], 0.0)
+
+        scan_cost = estimate_cost(scanned_pdf, 'text')
+        self.assertEqual(scan_cost['image_ratio'], 1.0)
+        self.assertGreater(scan_cost['cost'], text_cost['cost'])
+        self.assertGreater(estimate_cost(text_pdf, 'ocr')['cost'], text_cost['cost'])
+
+    def test_estimate_cost_auto(self):
+        text_pdf = self.write_pdf("text.pdf", make_pdf(10))
+        scanned_pdf = self.write_pdf("scan.pdf", make_pdf(10, images=10))
+
+        # Sem imagens, o modo automático custa o mesmo que o texto
+        self.assertAlmostEqual(estimate_cost(text_pdf, 'auto')['cost'], estimate_cost(text_pdf, 'text')['cost'])
+        # Digitalizações recebem o peso do OCR que a cadeia aplicará
+        self.assertGreater(estimate_cost(scanned_pdf, 'auto')['cost'], 5 * estimate_cost(scanned_pdf, 'text')['cost'])
+
+    def test_iter_longest_first(self):
+        costs = {'a': 1, 'b': 5, 'c': 3, 'd': 4}
+        self.assertEqual(list(iter_longest_first(costs, costs.get)), ['b', 'd', 'c', 'a'])
+        # Com lookahead, a ordem é decidida dentro da janela
+        self.assertEqual(list(iter_longest_first(['a', 'b', 'c', 'd'], costs.get, lookahead=2)), ['b', 'c', 'd', 'a'])
+
+    def test_split_and_merge(self):
+        ranges = split_page_ranges(5, 2)
+        self.assertEqual(ranges, [[0, 1], [2, 3], [4]])
+
+        parts = [
+            {'page_1': 'a', 'page_2': 'b', 'table_1': 't1', '_metadata': {'num_pages': 2, 'num_tables': 1}},
+            {'page_3': 'c', 'page_4': 'd', 'table_1': 't2', '_metadata': {'num_pages': 2, 'num_tables': 1}},
+            {'page_5': 'e', '_metadata': {'num_pages': 1, 'num_tables': 0}}
+        ]
+        merged = merge_extractions(parts, num_pages=5)
+        self.assertEqual([merged[f'page_{i}'] for i in range(1, 6)], ['a', 'b', 'c', 'd', 'e'])
+        self.assertEqual((merged['table_1'], merged['table_2']), ('t1', 't2'))
+        self.assertEqual(merged['_metadata']['num_pages'], 5)
+        self.assertEqual(merged['_metadata']['num_tables'], 2)
+
+if __name__ == "__main__":
+    unittest.main()
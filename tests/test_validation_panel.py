@@ -0,0 +1,31 @@
+# test_validation_panel.py
+import unittest
+import pandas as pd
+from PyQt5.QtWidgets import QApplication
+from src.gui.validation_panel import ValidationPanel
+
+app = QApplication.instance() or QApplication([])
+
+class TestValidationPanel(unittest.TestCase):
+
+    def setUp(self):
+        self.panel = ValidationPanel()
+        self.panel.text_pager.page_size = 10
+
+    def test_text_is_shown_in_pages(self):
+        self.panel.set_data({'page_1': "a" * 25, '_metadata': {}})
+
+        self.assertIs(self.panel.data_stack.currentWidget(), self.panel.text_pager)
+        self.assertEqual(self.panel.text_pager.page_count(), 3)
+        self.assertEqual(self.panel.text_pager.text_view.toPlainText(), "a" * 10)
+        self.assertEqual(self.panel.data_model.rowCount(), 0)
+
+    def test_tables_are_shown_in_table_view(self):
+        self.panel.set_data({'page_1': "texto", 'table_1': pd.DataFrame({'a': [1, 2]})})
+        self.panel.show_selected_data(1)
+
+        self.assertIs(self.panel.data_stack.currentWidget(), self.panel.data_view)
+        self.assertEqual(self.panel.data_model.rowCount(), 2)
+
+if __name__ == "__main__":
+    unittest.main()